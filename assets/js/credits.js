@@ -42,6 +42,19 @@ async function fetchDataAndInitialize() {
     }
 }
 
+async function refreshReseller(resellerId) {
+    try {
+        const response = await fetch(`${API_BASE}/resellers/${resellerId}`);
+        if (!response.ok) return;
+        const reseller = await response.json();
+        const index = allResellers.findIndex(r => r.user_id === resellerId);
+        if (index >= 0) allResellers[index] = reseller;
+        populateResellerDropdown();
+    } catch (error) {
+        console.error('Error refreshing reseller:', error);
+    }
+}
+
 function populateResellerDropdown() {
     const select = document.getElementById('reseller-select');
     if (!select) return;
@@ -119,8 +132,8 @@ async function handleDistributeCredits(e) {
         alert('Credits distributed successfully!');
         form.reset();
 
-        // Refresh data to update balances
-        await fetchDataAndInitialize();
+        // Only the reseller's balance changed; refresh that one record
+        await refreshReseller(payload.from_reseller_id);
 
         // Reset specific UI elements
         document.getElementById('business-user-select').disabled = true;
@@ -0,0 +1,148 @@
+"""Hot-table footprint before and after archiving a year of messages.
+
+Generates a year of history, archives every month outside a 3-month
+retention window and compares rows, database size (after VACUUM), archive
+size and the latency of the dashboard reads. A full NDJSON export is taken
+before and after and must match row for row: archived months are still
+served. Then usage logs are written into an archived month, one of them while
+that month's file is being rewritten: none may be deleted without reaching
+the file.
+
+Usage: python bench/archive.py [messages]
+"""
+import json
+import os
+import sys
+import tempfile
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+workdir = tempfile.mkdtemp(prefix="wa_bench_archive_")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "bench.db")
+os.environ["ARCHIVE_DIR"] = os.path.join(workdir, "archive")
+
+from sqlalchemy import func, select, text
+
+from common import Timer
+from datagen import Scale, generate
+
+import database, models
+from crud import archive as crud_archive
+from crud import export as crud_export
+from crud import projections
+import services.archive as archive_service
+from services.archive import ARCHIVE_DIR, archive_partitions, archived_rows
+from services.export import stream_rows
+
+RETENTION_MONTHS = 3
+PAGES = 200
+
+
+def database_bytes():
+    with database.engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+    return os.path.getsize(os.path.join(workdir, "bench.db"))
+
+
+def archive_bytes():
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(ARCHIVE_DIR) for name in names)
+
+
+def measure(user_ids):
+    with database.SessionLocal() as db:
+        rows = {name: db.execute(select(func.count()).select_from(model)).scalar()
+                for name, model in (("messages", models.Message), ("usage_logs", models.UsageLog))}
+        with Timer() as pages:
+            for i in range(PAGES):
+                projections.list_messages(db, user_ids[i % len(user_ids)], limit=50)
+    exported = []
+    with Timer() as export:
+        # Same reader /export/messages passes in
+        archived = lambda keys, chunk_size: archived_rows("messages", keys, chunk_size=chunk_size)
+        for chunk in stream_rows(crud_export.messages_statement(), "ndjson", archived=archived):
+            exported.append(chunk)
+    return {
+        "rows": rows,
+        "database_bytes": database_bytes(),
+        "page_ms": round(pages.elapsed / PAGES * 1000, 3),
+        "full_export_s": round(export.elapsed, 3),
+    }, "".join(exported)
+
+
+def add_usage_logs(user_id: str, times) -> list:
+    rows = [{"usage_id": str(uuid.uuid4()), "user_id": user_id, "credits_deducted": 1.0, "balance_after": 0.0,
+             "timestamp": at} for at in times]
+    with database.SessionLocal() as db:
+        db.execute(models.UsageLog.__table__.insert(), rows)
+        db.commit()
+    return [row["usage_id"] for row in rows]
+
+
+def late_rows_check(user_id: str) -> dict:
+    """Rows landing in an archived month, one mid-month while its file is rewritten."""
+    with database.SessionLocal() as db:
+        month = crud_archive.list_partitions(db, "usage_logs")[0].period_start
+    ids = add_usage_logs(user_id, [month + timedelta(days=2), month + timedelta(days=20)])
+    write = archive_service._write_partition
+
+    def write_then_insert(db, table_name, period_start, *args):
+        written = write(db, table_name, period_start, *args)
+        if table_name == "usage_logs" and period_start == month and len(ids) == 2:
+            # Inside the written key range, and after it
+            ids.extend(add_usage_logs(user_id, [month + timedelta(days=10), month + timedelta(days=25)]))
+        return written
+
+    def placement():
+        with database.SessionLocal() as db:
+            hot = set(db.execute(select(models.UsageLog.usage_id).where(models.UsageLog.usage_id.in_(ids))).scalars())
+        archived = [usage_id for batch in archived_rows("usage_logs", ["usage_id"]) for (usage_id,) in batch if usage_id in ids]
+        return hot, archived
+
+    with mock.patch.object(archive_service, "_write_partition", write_then_insert):
+        archive_partitions(database.SessionLocal, RETENTION_MONTHS)
+    hot, archived = placement()
+    none_lost = all(usage_id in hot or usage_id in archived for usage_id in ids)
+    archive_partitions(database.SessionLocal, RETENTION_MONTHS)
+    hot_after, archived_after = placement()
+    return {
+        "late_rows_not_lost": none_lost,
+        "late_rows_archived_once": not hot_after and sorted(archived_after) == sorted(ids),
+    }
+
+
+def main(messages: int = 200_000):
+    models.Base.metadata.create_all(bind=database.engine)
+    generate(database.SessionLocal, Scale(10, 20, 1, 1, messages, 2, days=365))
+    with database.SessionLocal() as db:
+        user_ids = db.execute(select(models.BusinessUser.user_id)).scalars().all()
+
+    before, export_before = measure(user_ids)
+    with Timer() as run:
+        report = archive_partitions(database.SessionLocal, RETENTION_MONTHS)
+    moved = report["messages"]["rows"] + report["usage_logs"]["rows"]
+    after, export_after = measure(user_ids)
+    checks = late_rows_check(user_ids[0])
+
+    print(json.dumps({
+        "retention_months": RETENTION_MONTHS,
+        "before": before,
+        "after": after,
+        "archived": {
+            "months": report["messages"]["months"],
+            "rows": moved,
+            "seconds": round(run.elapsed, 3),
+            "rows_per_s": round(moved / run.elapsed),
+            "archive_bytes": archive_bytes(),
+            "archive_bytes_per_row": round(archive_bytes() / moved, 1),
+            "database_bytes_freed": before["database_bytes"] - after["database_bytes"],
+        },
+        "export_unchanged": export_before == export_after,
+        **checks,
+    }, indent=2))
+    if export_before != export_after or not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,144 @@
+"""Sync (threadpool) vs async hot routes under concurrent load.
+
+Runs the app in-process twice, ASYNC_ROUTES off and on, each against its own
+freshly seeded SQLite file (or BENCH_DATABASE_URL). N concurrent clients share
+one httpx.AsyncClient over ASGITransport and each issue a fixed mix of requests:
+session validation, message and credit-history pages, sends and distributions.
+
+Each mode gets a wall-clock budget (BENCH_DEADLINE seconds, default 120);
+requests still pending when it runs out are reported as "unfinished". With the
+default connection pool the sync mode stalls once the threadpool (40 workers)
+outgrows it: handlers hold threads waiting for connections that only free up
+when a dependency teardown gets a thread of its own.
+
+Usage: python bench/async_load.py [clients] [requests_per_client]
+"""
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+DEADLINE = float(os.environ.get("BENCH_DEADLINE", "120"))
+
+MIX = [
+    ("validate", 40),
+    ("messages", 30),
+    ("history", 15),
+    ("send", 10),
+    ("distribute", 5),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_mode(clients: int, per_client: int):
+    # Child process: DATABASE_URL / ASYNC_ROUTES are read when main is imported
+    import httpx
+    from sqlalchemy import insert
+
+    from common import seed_business_user
+
+    import database, models
+    import main
+
+    models.Base.metadata.create_all(bind=database.engine)
+    with database.SessionLocal() as db:
+        reseller_id, user_id = seed_business_user(db, credits=1_000_000, reseller_credits=1_000_000)
+        device = models.LinkedDevice(user_id=user_id, device_name="bench")
+        db.add(device)
+        db.flush()
+        tokens = [f"bench-{i}" for i in range(200)]
+        db.execute(insert(models.DeviceSession), [
+            {"device_id": device.device_id, "session_token": token, "is_valid": "true",
+             "expires_at": datetime.utcnow() + timedelta(days=1)} for token in tokens
+        ])
+        start = datetime(2026, 1, 1)
+        db.execute(insert(models.Message), [
+            {"message_id": str(uuid.uuid4()), "user_id": user_id, "mode": "official", "sender_number": "1",
+             "receiver_number": str(i), "body_inline": "Hello", "status": "sent", "credits_used": 1.0,
+             "sent_at": start + timedelta(seconds=i)} for i in range(5_000)
+        ])
+        db.commit()
+
+    requests = {
+        "validate": lambda c: c.get("/sessions/validate", params={"token": random.choice(tokens)}),
+        "messages": lambda c: c.get("/messages", params={"user_id": user_id, "limit": 20}),
+        "history": lambda c: c.get("/credits/history", params={"business_user_id": user_id, "limit": 20}),
+        "send": lambda c: c.post("/messages/send", json={
+            "user_id": user_id, "mode": "official", "sender_number": "1", "receiver_number": "2",
+            "message_type": "text", "message_body": "Hello"}),
+        "distribute": lambda c: c.post("/credits/distribute", json={
+            "from_reseller_id": reseller_id, "to_business_user_id": user_id, "credits": 1}),
+    }
+    kinds = [kind for kind, weight in MIX for _ in range(weight)]
+    latencies = {kind: [] for kind, _ in MIX}
+    errors = {}
+
+    async def client(c, rng):
+        for _ in range(per_client):
+            kind = rng.choice(kinds)
+            began = time.perf_counter()
+            response = await requests[kind](c)
+            latencies[kind].append((time.perf_counter() - began) * 1000)
+            if response.status_code >= 400:
+                errors[f"{kind} {response.status_code}"] = errors.get(f"{kind} {response.status_code}", 0) + 1
+
+    async def drive():
+        transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+            began = time.perf_counter()
+            tasks = [asyncio.ensure_future(client(c, random.Random(i))) for i in range(clients)]
+            await asyncio.wait(tasks, timeout=DEADLINE)
+            elapsed = time.perf_counter() - began
+            for task in tasks:
+                task.cancel()
+            return elapsed
+
+    elapsed = asyncio.run(drive())
+    everything = [ms for values in latencies.values() for ms in values] or [0.0]
+    completed = sum(len(values) for values in latencies.values())
+    return {
+        "async_routes": database.ASYNC_ROUTES,
+        "requests": completed,
+        "unfinished": clients * per_client - completed,
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(completed / elapsed, 1),
+        "p50_ms": round(percentile(everything, 50), 2),
+        "p95_ms": round(percentile(everything, 95), 2),
+        "p99_ms": round(percentile(everything, 99), 2),
+        "p95_ms_by_route": {kind: round(percentile(values, 95), 2) for kind, values in latencies.items() if values},
+        "errors": errors,
+    }
+
+
+def main_bench(clients: int = 500, per_client: int = 20):
+    results = []
+    for async_routes in ("false", "true"):
+        url = os.environ.get("BENCH_DATABASE_URL") or \
+            "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="wa_bench_"), "bench.db")
+        env = {**os.environ, "DATABASE_URL": url, "ASYNC_ROUTES": async_routes}
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", str(clients), str(per_client)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    print(json.dumps({"clients": clients, "requests_per_client": per_client, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        print(json.dumps(run_mode(int(sys.argv[2]), int(sys.argv[3]))), flush=True)
+        # Stalled threadpool workers would otherwise keep the process alive
+        os._exit(0)
+    else:
+        main_bench(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,79 @@
+"""Rows per second: business users created one by one vs the CSV import.
+
+The one-by-one path calls the create_business_user handler per row (reseller
+lookup, duplicate check, insert, commit each time); the import path runs
+BusinessUserImportService over a generated CSV where ~2% of rows repeat an
+earlier email, ~1% collide with existing users and ~1% are invalid.
+
+Usage: python bench/business_user_import.py [rows] [single_rows]
+"""
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+
+# main binds its engines at import; keep them off the development database
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="wa_import_"), "main.db"))
+
+from common import Timer, make_session_factory, seed_business_user
+
+import models, schemas
+from main import create_business_user
+from services.imports import BusinessUserImportService
+
+COLUMNS = ["name", "username", "email", "password", "phone", "business_name", "country"]
+
+
+def build_csv(count: int, existing_email: str) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for i in range(count):
+        email, username = f"customer{i}@import.local", f"customer_{i}"
+        if i % 50 == 49:
+            email = f"customer{i - 1}@import.local"  # repeats the previous row
+        elif i % 100 == 33:
+            email = existing_email
+        elif i % 100 == 66:
+            email = "not-an-email"
+        writer.writerow([f"Customer {i}", username, email, "secret", f"+91{i:010d}", f"Shop {i}", "IN"])
+    return buffer.getvalue().encode()
+
+
+def main(count: int = 20_000, single_count: int = 1_000):
+    _, SessionLocal = make_session_factory()
+    with SessionLocal() as db:
+        reseller_id, user_id = seed_business_user(db, credits=0)
+        existing_email = db.get(models.BusinessUser, user_id).email
+
+    with Timer() as single:
+        for i in range(single_count):
+            with SessionLocal() as db:
+                create_business_user(schemas.BusinessUserCreate(
+                    parent_reseller_id=reseller_id,
+                    profile={"name": f"Single {i}", "username": f"single_{i}", "email": f"single{i}@import.local",
+                             "password": "secret", "phone": f"+91{i:010d}"},
+                    business={"business_name": f"Shop {i}"}, address={"country": "IN"},
+                ), db)
+
+    payload = build_csv(count, existing_email)
+    with Timer() as imported:
+        with SessionLocal() as db:
+            report = BusinessUserImportService(db).import_csv(io.BytesIO(payload), reseller_id)
+
+    print(json.dumps({
+        "single_rows": single_count,
+        "single_rows_per_sec": round(single_count / single.elapsed, 1),
+        "import_rows": report["rows"],
+        "imported": report["imported"],
+        "rejected": report["rejected"],
+        "import_rows_per_sec": round(report["rows"] / imported.elapsed, 1),
+        "import_seconds": round(imported.elapsed, 2),
+        "speedup": round((report["rows"] / imported.elapsed) / (single_count / single.elapsed), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
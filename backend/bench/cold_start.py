@@ -0,0 +1,103 @@
+"""Worker cold start against a large database: import, lifespan startup, first request.
+
+Seeds messages and usage_logs (default 1,000,000 rows each), applies migrations
+once, then starts fresh interpreters that import main and run the app lifespan.
+Each worker is timed for the import, the schema step (the migration version check,
+versus the create_all every worker used to run at import) and the first request.
+
+Usage: python bench/cold_start.py [rows] [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+CHILD = r"""
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+import database, migrations, models
+from fastapi.testclient import TestClient
+
+# Each schema step opens its own first connection, as a fresh worker would
+database.engine.dispose()
+check_started = time.perf_counter()
+migrations.run_migrations(database.engine)
+version_check = time.perf_counter() - check_started
+
+database.engine.dispose()
+check_started = time.perf_counter()
+models.Base.metadata.create_all(bind=database.engine)
+create_all = time.perf_counter() - check_started
+
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    client.get("/messages", params={"limit": 20})
+    first = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "version_check_s": version_check,
+    "create_all_s": create_all,
+    "lifespan_startup_s": ready - check_started - create_all,
+    "first_request_s": first - ready,
+    "ready_total_s": ready - started - create_all,
+}))
+"""
+
+
+def seed(url: str, rows: int, chunk: int = 50_000):
+    from sqlalchemy import insert
+
+    from common import make_session_factory, seed_business_user
+
+    import models
+
+    _, SessionLocal = make_session_factory(url)
+    start = datetime(2025, 1, 1)
+    with SessionLocal() as db:
+        _, user_id = seed_business_user(db, credits=0)
+        for offset in range(0, rows, chunk):
+            batch = range(offset, min(offset + chunk, rows))
+            ids = [str(uuid.uuid4()) for _ in batch]
+            db.execute(insert(models.Message), [
+                {"message_id": ids[n], "user_id": user_id, "mode": "official", "sender_number": "1",
+                 "receiver_number": str(i), "body_inline": "Hello", "status": "sent", "credits_used": 1.0,
+                 "sent_at": start + timedelta(seconds=i)} for n, i in enumerate(batch)
+            ])
+            db.execute(insert(models.UsageLog), [
+                {"usage_id": str(uuid.uuid4()), "user_id": user_id, "message_id": ids[n], "credits_deducted": 1.0,
+                 "balance_after": 0.0, "timestamp": start + timedelta(seconds=i)} for n, i in enumerate(batch)
+            ])
+            db.commit()
+
+
+def main_bench(rows: int = 1_000_000, runs: int = 5):
+    url = os.environ.get("BENCH_DATABASE_URL") or \
+        "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="wa_bench_"), "bench.db")
+    seed(url, rows)
+    env = {**os.environ, "DATABASE_URL": url}
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "migrations.py"], cwd=backend, env=env, check=True, capture_output=True)
+
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", CHILD], cwd=backend, env=env,
+                             check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+
+    median = {key: round(statistics.median(s[key] for s in samples) * 1000, 2) for key in samples[0]}
+    print(json.dumps({
+        "rows_per_table": rows,
+        "runs": runs,
+        "median_ms": {key[:-2] + "_ms": value for key, value in median.items()},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main_bench(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,56 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite file (or BENCH_DATABASE_URL) so the
+development database is never touched.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+
+
+def make_session_factory(url: str = None):
+    if url is None:
+        url = os.environ.get("BENCH_DATABASE_URL")
+    if url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="wa_bench_"), "bench.db")
+        url = f"sqlite:///{path}"
+    connect_args = {"check_same_thread": False, "timeout": 30} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def seed_business_user(db, credits: float, reseller_credits: float = 0.0, suffix: str = ""):
+    reseller = models.MasterUser(
+        name="Bench Reseller", username=f"bench_reseller{suffix}", email=f"reseller{suffix}@bench.local",
+        password_hash="hashed_bench", total_credits_micro=models.to_micro(reseller_credits),
+        available_credits_micro=models.to_micro(reseller_credits),
+    )
+    db.add(reseller)
+    db.flush()
+    user = models.BusinessUser(
+        parent_reseller_id=reseller.user_id, name="Bench Business", username=f"bench_business{suffix}",
+        email=f"business{suffix}@bench.local", password_hash="hashed_bench",
+        credits_allocated_micro=models.to_micro(credits), credits_remaining_micro=models.to_micro(credits),
+    )
+    db.add(user)
+    db.commit()
+    return reseller.user_id, user.user_id
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
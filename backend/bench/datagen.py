@@ -0,0 +1,226 @@
+"""Seeded, bulk-inserted test data at configurable scale.
+
+resellers -> business users -> devices/sessions, plus messages, usage logs and
+credit transactions spread over a time window. Wallets, the reseller_stats
+rollup and usage_aggregates are written consistent with the generated history,
+so every endpoint sees the same numbers it would after real traffic.
+
+Usage: python bench/datagen.py [scale]   (scale: a SCALES key; prints the row counts)
+Set BENCH_DATABASE_URL to generate into a specific database.
+"""
+import json
+import random
+import sys
+import uuid
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from common import Timer, make_session_factory
+
+import models
+from services.messages import message_cost
+from services.usage import GRANULARITIES, bucket_start
+
+
+@dataclass
+class Scale:
+    resellers: int
+    business_users_per_reseller: int
+    devices_per_user: int
+    sessions_per_device: int
+    messages: int
+    credit_transactions_per_user: int
+    days: int = 30
+    seed: int = 2026
+
+
+SCALES = {
+    "tiny": Scale(2, 5, 1, 2, 2_000, 2),
+    "small": Scale(10, 20, 1, 2, 100_000, 5),
+    "medium": Scale(50, 40, 2, 2, 1_000_000, 10),
+    "large": Scale(200, 50, 2, 3, 5_000_000, 20),
+}
+
+CHUNK = 20_000
+BODIES = [
+    "Your order {n} has shipped and will arrive tomorrow.",
+    "Hi! Your appointment is confirmed for {n}:00.",
+    "OTP {n} is valid for 10 minutes. Do not share it.",
+    "Thanks for your payment of Rs. {n}.",
+]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _bulk(db, model, rows):
+    for offset in range(0, len(rows), CHUNK):
+        db.execute(insert(model), rows[offset:offset + CHUNK])
+
+
+def generate(SessionLocal, scale: Scale):
+    """Fill an empty, migrated database. Returns the manifest used by the load driver."""
+    rng = random.Random(scale.seed)
+    end = datetime.utcnow().replace(microsecond=0)
+    start = end - timedelta(days=scale.days)
+    window = int((end - start).total_seconds())
+
+    resellers, users = [], []
+    for r in range(scale.resellers):
+        reseller_id = _uuid(rng)
+        resellers.append(reseller_id)
+        for b in range(scale.business_users_per_reseller):
+            users.append({
+                "user_id": _uuid(rng), "parent_reseller_id": reseller_id,
+                "mode": "official" if rng.random() < 0.7 else "unofficial",
+                "name": f"Business {r}-{b}", "username": f"business_{r}_{b}", "email": f"business_{r}_{b}@bench.local",
+            })
+
+    with SessionLocal() as db:
+        # Credit history: every user receives its allocation in a few transactions
+        transactions, allocated = [], defaultdict(int)
+        for user in users:
+            for _ in range(scale.credit_transactions_per_user):
+                amount = rng.randint(1_000, 50_000)
+                allocated[user["user_id"]] += models.to_micro(amount)
+                transactions.append({
+                    "distribution_id": _uuid(rng), "from_reseller_id": user["parent_reseller_id"],
+                    "to_business_user_id": user["user_id"], "credits_shared": float(amount),
+                    "shared_at": start + timedelta(seconds=rng.randrange(window)),
+                })
+        _bulk(db, models.CreditTransaction, transactions)
+
+        # Messages + usage logs, streamed in chunks; wallets and aggregates tallied on the way
+        used = defaultdict(int)
+        aggregates = defaultdict(lambda: [0, 0])
+        parent = {user["user_id"]: user["parent_reseller_id"] for user in users}
+        for offset in range(0, scale.messages, CHUNK):
+            messages, logs = [], []
+            for n in range(offset, min(offset + CHUNK, scale.messages)):
+                user = users[rng.randrange(len(users))]
+                user_id, mode = user["user_id"], user["mode"]
+                cost = message_cost(mode)
+                sent_at = start + timedelta(seconds=rng.randrange(window))
+                message_id = _uuid(rng)
+                micro = models.to_micro(cost)
+                used[user_id] += micro
+                messages.append({
+                    "message_id": message_id, "user_id": user_id, "mode": mode,
+                    "sender_number": "+910000000000", "receiver_number": f"+91{rng.randrange(10**10):010d}",
+                    "message_type": "text", "body_inline": rng.choice(BODIES).format(n=n % 10_000),
+                    "status": "sent", "credits_used": cost, "sent_at": sent_at,
+                })
+                logs.append({
+                    "usage_id": _uuid(rng), "user_id": user_id, "message_id": message_id, "credits_deducted": cost,
+                    "balance_after": models.from_micro(allocated[user_id] - used[user_id]), "timestamp": sent_at,
+                })
+                for granularity in GRANULARITIES:
+                    bucket = bucket_start(sent_at, granularity)
+                    for scope, owner in (("user", user_id), ("reseller", parent[user_id])):
+                        total = aggregates[(scope, owner, granularity, bucket, mode)]
+                        total[0] += 1
+                        total[1] += micro
+            _bulk(db, models.Message, messages)
+            _bulk(db, models.UsageLog, logs)
+            db.commit()
+
+        _bulk(db, models.UsageAggregate, [
+            {"scope": scope, "owner_id": owner, "granularity": granularity, "bucket_start": bucket, "mode": mode,
+             "message_type": "text", "message_count": count, "credits_deducted_micro": credits}
+            for (scope, owner, granularity, bucket, mode), (count, credits) in aggregates.items()
+        ])
+
+        # Wallets consistent with the history above
+        distributed, consumed = defaultdict(int), defaultdict(int)
+        for user in users:
+            distributed[user["parent_reseller_id"]] += allocated[user["user_id"]]
+            consumed[user["parent_reseller_id"]] += used[user["user_id"]]
+        _bulk(db, models.MasterUser, [
+            {
+                "user_id": reseller_id, "name": f"Reseller {r}", "username": f"reseller_{r}",
+                "email": f"reseller_{r}@bench.local", "password_hash": "hashed_bench", "business_name": f"Reseller {r} Pvt Ltd",
+                "business_description": "Bulk messaging reseller. " * 20, "country": "IN",
+                "total_credits_micro": distributed[reseller_id] * 2, "available_credits_micro": distributed[reseller_id],
+                "created_at": start,
+            }
+            for r, reseller_id in enumerate(resellers)
+        ])
+        _bulk(db, models.BusinessUser, [
+            {
+                "user_id": user["user_id"], "parent_reseller_id": user["parent_reseller_id"], "whatsapp_mode": user["mode"],
+                "name": user["name"], "username": user["username"], "email": user["email"], "password_hash": "hashed_bench",
+                "business_description": "Retail business. " * 20, "country": "IN",
+                "credits_allocated_micro": allocated[user["user_id"]], "credits_used_micro": used[user["user_id"]],
+                "credits_remaining_micro": allocated[user["user_id"]] - used[user["user_id"]], "created_at": start,
+            }
+            for user in users
+        ])
+        _bulk(db, models.ResellerStats, [
+            {
+                "reseller_id": reseller_id, "business_user_count": scale.business_users_per_reseller,
+                "credits_distributed_micro": distributed[reseller_id], "credits_used_micro": consumed[reseller_id],
+            }
+            for reseller_id in resellers
+        ])
+
+        # Devices and their sessions (some expired, some revoked)
+        devices, sessions = [], []
+        for user in users:
+            for d in range(scale.devices_per_user):
+                device_id = _uuid(rng)
+                devices.append({
+                    "device_id": device_id, "user_id": user["user_id"], "device_name": f"Phone {d}",
+                    "session_status": "connected", "last_active": end - timedelta(seconds=rng.randrange(window)),
+                })
+                for _ in range(scale.sessions_per_device):
+                    roll = rng.random()
+                    sessions.append({
+                        "session_id": _uuid(rng), "device_id": device_id, "session_token": _uuid(rng),
+                        "is_valid": "false" if roll < 0.05 else "true", "created_at": end - timedelta(days=1),
+                        "expires_at": end - timedelta(hours=1) if roll > 0.9 else end + timedelta(days=7),
+                    })
+        _bulk(db, models.LinkedDevice, devices)
+        _bulk(db, models.DeviceSession, sessions)
+        db.commit()
+
+    return load_manifest(SessionLocal)
+
+
+def load_manifest(SessionLocal, sample: int = 1_000):
+    """Ids the load driver picks from; works on any populated database."""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        users = db.execute(
+            select(models.BusinessUser.user_id, models.BusinessUser.parent_reseller_id).limit(sample)
+        ).all()
+        tokens = db.execute(
+            select(models.DeviceSession.session_token)
+            .where(models.DeviceSession.is_valid == "true", models.DeviceSession.expires_at > now)
+            .limit(sample)
+        ).scalars().all()
+        window = db.execute(select(func.min(models.Message.sent_at), func.max(models.Message.sent_at))).one()
+    return {
+        "business_users": [{"user_id": u, "reseller_id": r} for u, r in users],
+        "resellers": sorted({r for _, r in users}),
+        "tokens": list(tokens),
+        "window": [value.isoformat() if value else None for value in window],
+    }
+
+
+def count_rows(SessionLocal):
+    tables = [models.MasterUser, models.BusinessUser, models.LinkedDevice, models.DeviceSession,
+              models.CreditTransaction, models.Message, models.UsageLog, models.UsageAggregate]
+    with SessionLocal() as db:
+        return {model.__tablename__: db.query(func.count()).select_from(model).scalar() for model in tables}
+
+
+if __name__ == "__main__":
+    scale = SCALES[sys.argv[1] if len(sys.argv) > 1 else "small"]
+    _, SessionLocal = make_session_factory()
+    with Timer() as t:
+        generate(SessionLocal, scale)
+    print(json.dumps({"scale": asdict(scale), "seconds": round(t.elapsed, 2), "rows": count_rows(SessionLocal)}, indent=2))
@@ -0,0 +1,78 @@
+"""Distributions per second: N calls to CreditService.distribute vs one distribute_bulk.
+
+Both paths top up the same N business users of one reseller; the bulk path is
+one ownership query, one reseller debit, one executemany UPDATE/INSERT and one
+commit. Balances are checked afterwards so the speedup is not bought with a
+lost credit, and an unknown reseller must get 404 like single distribute.
+
+Usage: python bench/distribute_bulk.py [users]
+"""
+import json
+import sys
+
+from fastapi import HTTPException
+from sqlalchemy import func, insert
+
+from common import Timer, make_session_factory, seed_business_user
+
+import models, schemas
+from services.credits import CreditService
+
+
+def main(count: int = 5000):
+    _, SessionLocal = make_session_factory()
+    with SessionLocal() as db:
+        reseller_id, _ = seed_business_user(db, credits=0, reseller_credits=count * 10)
+        db.execute(insert(models.ResellerStats), [{"reseller_id": reseller_id}])
+        db.execute(insert(models.BusinessUser), [
+            {"user_id": f"user-{i}", "parent_reseller_id": reseller_id, "name": f"Customer {i}",
+             "username": f"customer_{i}", "email": f"customer{i}@bench.local", "password_hash": "hashed_bench"}
+            for i in range(count)
+        ])
+        db.commit()
+    user_ids = [f"user-{i}" for i in range(count)]
+
+    # Single path: one request (session + commit) per business user
+    with Timer() as single:
+        for user_id in user_ids:
+            with SessionLocal() as db:
+                CreditService(db).distribute(schemas.CreditDistributionCreate(
+                    from_reseller_id=reseller_id, to_business_user_id=user_id, credits=2))
+
+    with Timer() as bulk:
+        with SessionLocal() as db:
+            CreditService(db).distribute_bulk(schemas.CreditBulkDistributionCreate(
+                from_reseller_id=reseller_id,
+                items=[{"business_user_id": user_id, "credits": 3} for user_id in user_ids]))
+
+    with SessionLocal() as db:
+        reseller = db.get(models.MasterUser, reseller_id)
+        allocated = db.query(func.sum(models.BusinessUser.credits_allocated_micro)).scalar()
+        transactions = db.query(func.count(models.CreditTransaction.distribution_id)).scalar()
+    conserved = reseller.used_credits_micro == allocated == models.to_micro(count * 5)
+
+    with SessionLocal() as db:
+        try:
+            CreditService(db).distribute_bulk(schemas.CreditBulkDistributionCreate(
+                from_reseller_id="no-such-reseller", items=[{"business_user_id": user_ids[0], "credits": 1}]))
+            unknown_reseller = None
+        except HTTPException as e:
+            unknown_reseller = (e.status_code, e.detail)
+    unknown_reseller_404 = unknown_reseller == (404, "Reseller not found")
+
+    print(json.dumps({
+        "business_users": count,
+        "single_per_sec": round(count / single.elapsed, 1),
+        "single_seconds": round(single.elapsed, 2),
+        "bulk_per_sec": round(count / bulk.elapsed, 1),
+        "bulk_seconds": round(bulk.elapsed, 3),
+        "speedup": round(single.elapsed / bulk.elapsed, 1),
+        "transactions": transactions,
+        "credits_conserved": conserved,
+        "unknown_reseller_404": unknown_reseller_404,
+    }, indent=2))
+    return conserved and unknown_reseller_404
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(*(int(arg) for arg in sys.argv[1:2])) else 1)
@@ -0,0 +1,95 @@
+"""Idempotency-Key check: a key's work runs at most once, and only under a claim.
+
+Drives IdempotencyStore.run with a real credit distribution and forces the
+races the happy path never hits: a claim that loses on the primary key and
+then finds no row (the winner rolled back, or a purge removed it), a key that
+keeps losing that way, and a claim row that disappears before the response is
+stored. Every credit must be accounted for afterwards. Exits non-zero on a
+failed check.
+
+Usage: python bench/idempotency.py
+Set BENCH_DATABASE_URL to run against PostgreSQL.
+"""
+import json
+import sys
+from unittest import mock
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from common import make_session_factory, seed_business_user
+
+import models, schemas
+from crud import idempotency as crud_idempotency
+from services.credits import CreditService
+from services.idempotency import IdempotencyStore
+
+SCOPE = "POST /credits/distribute"
+
+
+def lost_race(times: int):
+    """claim() that fails on the primary key `times` times, as if a concurrent request won and then vanished."""
+    real = crud_idempotency.claim
+    calls = {"n": 0}
+
+    def claim(*args, **kwargs):
+        calls["n"] += 1
+        if calls["n"] <= times:
+            raise IntegrityError("INSERT INTO idempotency_keys", {}, Exception("UNIQUE constraint failed"))
+        return real(*args, **kwargs)
+    return mock.patch.object(crud_idempotency, "claim", claim)
+
+
+def main():
+    _, SessionLocal = make_session_factory()
+    with SessionLocal() as db:
+        reseller_id, user_id = seed_business_user(db, credits=0, reseller_credits=100)
+    share = schemas.CreditDistributionCreate(from_reseller_id=reseller_id, to_business_user_id=user_id, credits=1)
+    store = IdempotencyStore()
+    executed = []
+
+    def attempt(key: str, during_work=None):
+        with SessionLocal() as db:
+            def work():
+                executed.append(key)
+                tx = CreditService(db).distribute(share, commit=False)
+                if during_work:
+                    during_work(db)
+                return schemas.CreditTransactionRead.model_validate(tx)
+            try:
+                return store.run(db, SCOPE, key, share, work).status_code
+            except HTTPException as e:
+                return e.status_code
+
+    def purge_claim(db):
+        crud_idempotency.delete_key(db, SCOPE, "purged")
+
+    first, replay = attempt("plain"), attempt("plain")
+    with lost_race(1):
+        reclaimed = attempt("vanished-once")
+    store.clear()
+    reclaimed_replay = attempt("vanished-once")
+    with lost_race(10):
+        gave_up = attempt("vanished-always")
+    purged = attempt("purged", purge_claim)
+
+    with SessionLocal() as db:
+        keys = {row.idempotency_key: row.status_code for row in db.query(models.IdempotencyKey)}
+        reseller = db.get(models.MasterUser, reseller_id)
+        transactions = db.query(models.CreditTransaction).count()
+
+    checks = {
+        "replay_not_rerun": (first, replay) == (200, 200) and executed.count("plain") == 1,
+        "claim_retried_after_vanished_row": reclaimed == 200 and keys.get("vanished-once") == 200,
+        "retried_claim_replays": reclaimed_replay == 200 and executed.count("vanished-once") == 1,
+        "no_work_without_claim": gave_up == 409 and "vanished-always" not in executed and "vanished-always" not in keys,
+        "lost_claim_rolls_back": purged == 409 and "purged" not in keys,
+        "one_debit_per_stored_key": transactions == 2 and reseller.available_credits_micro == models.to_micro(98),
+    }
+    print(json.dumps({"statuses": {"first": first, "replay": replay, "reclaimed": reclaimed, "gave_up": gave_up, "purged": purged},
+                      "stats": store.stats(), "checks": checks}, indent=2))
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,90 @@
+"""Bytes per message with bodies inline vs content-addressed in message_bodies.
+
+Each workload is sent through MessageService.send_batch twice into fresh
+databases: once with every body kept on its row (the previous layout, forced by
+raising models.MESSAGE_BODY_INLINE_MAX) and once as shipped. Size is the pages
+of messages + message_bodies and their indexes (SQLite dbstat, after VACUUM),
+divided by the number of messages.
+
+Usage: python bench/message_bodies.py [messages] [batch_size]
+"""
+import json
+import sys
+
+from sqlalchemy import text
+
+from common import Timer, make_session_factory, seed_business_user
+
+import models, schemas
+from services.message_bodies import body_store
+from services.messages import MessageService
+
+TEMPLATE = (
+    "Dear customer, your monthly statement is ready. The amount due is payable by the 15th; "
+    "pay from the app or reply HELP to talk to us. Ignore this message if you have already paid. "
+    "Thank you for banking with us - Team Acme."
+)
+
+WORKLOADS = {
+    # One campaign body to every recipient: the case this layout is for
+    "template": lambda i: TEMPLATE,
+    # A long body that differs per recipient: nothing to share, hash is pure overhead
+    "personalized": lambda i: f"Hi customer {i}, your order #{i:08d} has shipped and arrives in 2-3 days. Track it in the app.",
+    # Short bodies stay inline in both layouts
+    "otp": lambda i: f"OTP {i % 1_000_000:06d} is valid for 10 minutes.",
+}
+
+
+def stored_bytes(engine):
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+        rows = conn.execute(text(
+            "SELECT s.tbl_name, SUM(d.pgsize) FROM dbstat d JOIN sqlite_schema s ON s.name = d.name "
+            "WHERE s.tbl_name IN ('messages', 'message_bodies') GROUP BY s.tbl_name"
+        )).all()
+    return dict(rows)
+
+
+def run(body, count: int, batch_size: int, inline: bool):
+    engine, SessionLocal = make_session_factory()
+    with SessionLocal() as db:
+        _, user_id = seed_business_user(db, credits=count * 2)
+    items = [
+        schemas.MessageCreate(user_id=user_id, message_type="template", sender_number="+910000000000",
+                              receiver_number=f"+91{i:010d}", message_body=body(i))
+        for i in range(count)
+    ]
+    inline_max = models.MESSAGE_BODY_INLINE_MAX
+    models.MESSAGE_BODY_INLINE_MAX = sys.maxsize if inline else inline_max
+    body_store.clear()
+    try:
+        with Timer() as timer:
+            for i in range(0, count, batch_size):
+                with SessionLocal() as db:
+                    MessageService(db).send_batch(schemas.MessageBatchCreate(user_id=user_id, messages=items[i:i + batch_size]))
+    finally:
+        models.MESSAGE_BODY_INLINE_MAX = inline_max
+    sizes = stored_bytes(engine)
+    return {
+        "bytes_per_message": round(sum(sizes.values()) / count, 1),
+        "message_bodies_bytes": sizes.get("message_bodies", 0),
+        "msgs_per_sec": round(count / timer.elapsed),
+    }
+
+
+def main(count: int = 50_000, batch_size: int = 1000):
+    report = {"messages": count, "batch_size": batch_size}
+    for name, body in WORKLOADS.items():
+        inline = run(body, count, batch_size, inline=True)
+        deduped = run(body, count, batch_size, inline=False)
+        report[name] = {
+            "inline": inline,
+            "content_addressed": deduped,
+            "size_ratio": round(deduped["bytes_per_message"] / inline["bytes_per_message"], 3),
+        }
+    report["body_cache"] = body_store.stats()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
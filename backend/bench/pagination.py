@@ -0,0 +1,100 @@
+"""OFFSET vs keyset (cursor) page latency, from page 1 to the last page.
+
+Also checks the page limits: limit 0 is rejected rather than answered with an
+empty page and a cursor past a row, and walking with limit 1 visits every row
+once, in order. Exits non-zero when a check fails.
+
+Usage: python bench/pagination.py [rows] [page_size]
+"""
+import json
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import insert
+
+from common import Timer, make_session_factory, seed_business_user
+
+import models
+from pagination import encode_cursor, keyset_paginate
+
+
+def seed_messages(db, user_id: str, rows: int, chunk: int = 50_000):
+    start = datetime(2026, 1, 1)
+    for offset in range(0, rows, chunk):
+        db.execute(insert(models.Message), [
+            {
+                "message_id": str(uuid.uuid4()), "user_id": user_id, "mode": "official",
+                "sender_number": "+910000000000", "receiver_number": f"+91{i:010d}",
+                "body_inline": "Hello", "status": "sent", "credits_used": 1.0,
+                "sent_at": start + timedelta(seconds=i),
+            }
+            for i in range(offset, min(offset + chunk, rows))
+        ])
+        db.commit()
+
+
+def time_page(fn, repeat: int = 5):
+    best = None
+    for _ in range(repeat):
+        with Timer() as t:
+            fn()
+        best = t.elapsed if best is None else min(best, t.elapsed)
+    return round(best * 1000, 3)
+
+
+def check_limits(query, walk: int = 20):
+    try:
+        keyset_paginate(query(), models.Message.sent_at, models.Message.message_id, 0, 0)
+        rejects_zero = False
+    except HTTPException as e:
+        rejects_zero = e.status_code == 400
+    expected = [m.message_id for m in query().order_by(models.Message.sent_at.desc(), models.Message.message_id.desc())
+                .limit(walk).all()]
+    seen, cursor = [], None
+    while len(seen) < walk:
+        page, cursor = keyset_paginate(query(), models.Message.sent_at, models.Message.message_id, 0, 1, cursor)
+        seen.extend(m.message_id for m in page)
+        if cursor is None:
+            break
+    return {"limit_0_rejected": rejects_zero, "limit_1_walk_in_order": seen == expected}
+
+
+def main(rows: int = 1_000_000, page_size: int = 100):
+    _, SessionLocal = make_session_factory()
+    with SessionLocal() as db:
+        _, user_id = seed_business_user(db, credits=0)
+        seed_messages(db, user_id, rows)
+
+    last_page = rows // page_size
+    pages = [p for p in (1, 10, 100, 1_000, 10_000, 100_000) if p <= last_page]
+    results = []
+    with SessionLocal() as db:
+        def query():
+            return db.query(models.Message).filter(models.Message.user_id == user_id)
+
+        for page in pages:
+            skip = (page - 1) * page_size
+            cursor = None
+            if skip:
+                # Cursor a client would hold after reading the previous page (not timed)
+                boundary = (query().order_by(models.Message.sent_at.desc(), models.Message.message_id.desc())
+                            .offset(skip - 1).first())
+                cursor = encode_cursor(boundary.sent_at, boundary.message_id)
+            results.append({
+                "page": page,
+                "offset_ms": time_page(lambda: keyset_paginate(query(), models.Message.sent_at,
+                                                               models.Message.message_id, skip, page_size)),
+                "cursor_ms": time_page(lambda: keyset_paginate(query(), models.Message.sent_at,
+                                                               models.Message.message_id, 0, page_size, cursor)),
+            })
+
+        checks = check_limits(query)
+
+    print(json.dumps({"rows": rows, "page_size": page_size, "pages": results, "checks": checks}, indent=2))
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(*(int(arg) for arg in sys.argv[1:3])) else 1)
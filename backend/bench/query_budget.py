@@ -0,0 +1,160 @@
+"""Per-endpoint query budget: fails when an endpoint issues more SQL than it used to.
+
+Seeds the tiny datagen dataset (several users per reseller, many messages per
+user, so a per-row query inside a loop shows up as a higher count) and calls each
+endpoint inside profiling.assert_max_queries(BUDGETS[endpoint]). Budgets are the
+current statement counts: lowering one is welcome, raising one needs a reason.
+
+Exits non-zero on any overrun, so it can gate changes locally.
+
+Usage: python bench/query_budget.py [-v]   (-v prints every endpoint's statements)
+"""
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="wa_budget_"), "budget.db")
+os.environ.pop("DATABASE_READ_URL", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import database
+import main
+from datagen import SCALES, generate
+from migrations import run_migrations
+from profiling import assert_max_queries
+from services.idempotency import idempotency_store
+
+# Statements per call, counted on the write and read engines
+BUDGETS = {
+    "POST /resellers": 5,
+    "GET /resellers": 1,
+    "GET /resellers/{id}": 1,
+    "POST /business-users": 5,
+    "GET /business-users?reseller_id": 1,
+    "GET /business-users/{id}": 1,
+    "POST /business-users/import": 5,
+    "POST /credits/distribute": 7,
+    "POST /credits/distribute-bulk": 5,
+    "GET /credits/history?reseller_id": 1,
+    "POST /messages/send": 7,
+    "POST /messages/send (Idempotency-Key)": 9,
+    "POST /messages/send (replay)": 1,
+    "POST /messages/send-batch": 5,
+    "POST /messages/send-batch (template)": 6,
+    "POST /templates": 4,
+    "POST /messages/send-batch (stored template)": 7,
+    "POST /messages/send-batch (stored template, cached)": 6,
+    "GET /messages?user_id": 1,
+    "GET /messages/{id}": 1,
+    "GET /usage/logs?user_id": 1,
+    "GET /usage/summary?reseller_id": 1,
+    "GET /analytics/reseller/{id}": 3,
+    "POST /devices/connect": 2,
+    "POST /sessions": 3,
+    "GET /sessions/validate": 1,
+    "DELETE /devices/{id}": 3,
+}
+
+verbose = "-v" in sys.argv
+results = []
+
+
+def call(client, label: str, method: str, path: str, **kwargs):
+    try:
+        with assert_max_queries(BUDGETS[label]) as log:
+            response = client.request(method, path, **kwargs)
+        results.append((label, log.count, None))
+    except AssertionError as e:
+        response = None
+        results.append((label, None, str(e)))
+    if verbose and response is not None:
+        print(f"{label}:\n{log.describe()}")
+    return response
+
+
+def exercise(client, manifest):
+    rid = manifest["resellers"][0]
+    uid = next(u["user_id"] for u in manifest["business_users"] if u["reseller_id"] == rid)
+    profile = lambda name: {"name": name, "username": name, "email": f"{name}@budget.local", "password": "x"}
+
+    call(client, "POST /resellers", "POST", "/resellers", json={
+        "profile": profile("reseller"), "business": {}, "address": {}, "bank": {},
+        "wallet": {"total_credits": 1000, "available_credits": 1000}})
+    call(client, "GET /resellers", "GET", "/resellers")
+    call(client, "GET /resellers/{id}", "GET", f"/resellers/{rid}")
+    call(client, "POST /business-users", "POST", "/business-users", json={
+        "parent_reseller_id": rid, "profile": profile("business"), "business": {}, "address": {}})
+    call(client, "GET /business-users?reseller_id", "GET", "/business-users", params={"reseller_id": rid})
+    call(client, "GET /business-users/{id}", "GET", f"/business-users/{uid}")
+    # 3 rows, one chunk: reseller lookup, one IN per unique column, one INSERT, one rollup UPDATE
+    rows = "".join(f"Imported {i},imported_{i},imported{i}@budget.local,x\n" for i in range(3))
+    call(client, "POST /business-users/import", "POST", "/business-users/import", data={"parent_reseller_id": rid},
+         files={"file": ("users.csv", ("name,username,email,password\n" + rows).encode(), "text/csv")})
+
+    call(client, "POST /credits/distribute", "POST", "/credits/distribute",
+         json={"from_reseller_id": rid, "to_business_user_id": uid, "credits": 5})
+    # Same statement count for any number of recipients
+    owned = [u["user_id"] for u in manifest["business_users"] if u["reseller_id"] == rid]
+    call(client, "POST /credits/distribute-bulk", "POST", "/credits/distribute-bulk",
+         json={"from_reseller_id": rid, "items": [{"business_user_id": user_id, "credits": 1} for user_id in owned]})
+    call(client, "GET /credits/history?reseller_id", "GET", "/credits/history", params={"reseller_id": rid})
+
+    message = {"user_id": uid, "sender_number": "+910000000000", "receiver_number": "+911111111111", "message_body": "hi"}
+    sent = call(client, "POST /messages/send", "POST", "/messages/send", json=message)
+    keyed = {"headers": {"Idempotency-Key": "budget"}, "json": message}
+    call(client, "POST /messages/send (Idempotency-Key)", "POST", "/messages/send", **keyed)
+    idempotency_store.clear()
+    call(client, "POST /messages/send (replay)", "POST", "/messages/send", **keyed)
+    call(client, "POST /messages/send-batch", "POST", "/messages/send-batch", json={"user_id": uid, "messages": [message] * 20})
+    # A long shared body adds one message_bodies insert, and none once it is known
+    template = {**message, "message_type": "template", "message_body": "Your invoice is ready. " * 5}
+    call(client, "POST /messages/send-batch (template)", "POST", "/messages/send-batch", json={"user_id": uid, "messages": [template] * 20})
+    call(client, "POST /messages/send-batch", "POST", "/messages/send-batch", json={"user_id": uid, "messages": [template] * 20})
+    # A stored template costs a version check per batch, plus one read to compile it the first time
+    call(client, "POST /templates", "POST", "/templates/", json={"user_id": uid, "name": "budget", "body": "Hi {{name}}, your code is {{code}}"})
+    stored = [{**message, "message_body": None, "template_name": "budget", "variables": {"name": f"n{i}", "code": i}} for i in range(20)]
+    call(client, "POST /messages/send-batch (stored template)", "POST", "/messages/send-batch", json={"user_id": uid, "messages": stored})
+    call(client, "POST /messages/send-batch (stored template, cached)", "POST", "/messages/send-batch", json={"user_id": uid, "messages": stored})
+    call(client, "GET /messages?user_id", "GET", "/messages", params={"user_id": uid})
+    if sent is not None:
+        call(client, "GET /messages/{id}", "GET", f"/messages/{sent.json()['message_id']}")
+    call(client, "GET /usage/logs?user_id", "GET", "/usage/logs", params={"user_id": uid})
+    start, end = manifest["window"]
+    call(client, "GET /usage/summary?reseller_id", "GET", "/usage/summary",
+         params={"reseller_id": rid, "from": start, "to": end})
+    call(client, "GET /analytics/reseller/{id}", "GET", f"/analytics/reseller/{rid}")
+
+    device = call(client, "POST /devices/connect", "POST", "/devices/connect", json={"user_id": uid, "device_name": "phone"})
+    if device is not None:
+        device_id = device.json()["device_id"]
+        session = call(client, "POST /sessions", "POST", "/sessions", json={"device_id": device_id})
+        if session is not None:
+            call(client, "GET /sessions/validate", "GET", "/sessions/validate", params={"token": session.json()["session_token"]})
+        call(client, "DELETE /devices/{id}", "DELETE", f"/devices/{device_id}")
+
+
+def main_check():
+    run_migrations(database.engine)
+    manifest = generate(database.SessionLocal, SCALES["tiny"])
+    # No lifespan: background workers would add their statements to the endpoint being counted
+    exercise(TestClient(main.app), manifest)
+
+    failures = 0
+    for label, count, error in results:
+        if error:
+            failures += 1
+            print(f"[FAIL] {label}: {error}")
+        else:
+            print(f"[ok]   {label}: {count}/{BUDGETS[label]}")
+    missing = set(BUDGETS) - {label for label, _, _ in results}
+    for label in sorted(missing):
+        print(f"[skip] {label}: not exercised")
+    print(f"\n{len(results)} endpoints, {failures} over budget")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main_check() else 1)
@@ -0,0 +1,226 @@
+"""Query-plan regression check: every endpoint's SQL must be served by an index.
+
+Drives each endpoint through the real app, captures the statements it issues
+and runs EXPLAIN on them. A statement fails when it reads a table without an
+index (SQLite "SCAN <table>", or any SCAN under a WHERE clause; PostgreSQL
+"Seq Scan" with seqscan disabled) or
+sorts its whole result (SQLite "USE TEMP B-TREE FOR ORDER BY"), unless the
+endpoint is an unfiltered listing listed in ALLOWED_SCANS.
+
+Exits non-zero on any regression, so it can gate changes locally.
+
+Usage: python bench/query_plans.py
+Set BENCH_DATABASE_URL to a PostgreSQL URL to check PostgreSQL plans.
+"""
+import os
+import re
+import sys
+import tempfile
+from collections import defaultdict
+from datetime import datetime
+
+if "BENCH_DATABASE_URL" in os.environ:
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+else:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="wa_plans_"), "plans.db")
+os.environ["ARCHIVE_DIR"] = tempfile.mkdtemp(prefix="wa_plans_archive_")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import database, models
+import main
+from crud import dispatch as crud_dispatch
+
+# Unfiltered listings read the table in storage order under a LIMIT; that is expected
+ALLOWED_SCANS = {
+    "GET /resellers": {"master_users"},
+    "GET /business-users": {"business_users"},
+}
+
+captured = defaultdict(list)
+current = {"endpoint": None}
+
+
+@event.listens_for(database.engine, "before_cursor_execute")
+def capture(conn, cursor, statement, parameters, context, executemany):
+    verb = statement.lstrip().split(None, 1)[0].upper()
+    if current["endpoint"] and verb in ("SELECT", "UPDATE", "DELETE") and not executemany:
+        captured[current["endpoint"]].append((statement, parameters))
+
+
+def call(client, method: str, path: str, label: str = None, **kwargs):
+    current["endpoint"] = label or f"{method} {re.sub(r'/[0-9a-f-]{36}', '/{id}', path.split('?')[0])}"
+    try:
+        response = client.request(method, path, **kwargs)
+        assert response.status_code < 500, (path, response.text)
+        return response
+    finally:
+        current["endpoint"] = None
+
+
+def paged(client, path: str, filters: dict):
+    """First page and the cursor page of a keyset-paginated listing."""
+    label = f"GET {path}" + "".join(f"?{key}" for key in filters)
+    first = call(client, "GET", path, label, params={**filters, "limit": 1})
+    call(client, "GET", path, label + " (cursor)", params={**filters, "limit": 1, "cursor": first.headers["x-next-cursor"]})
+
+
+def exercise(client):
+    profile = lambda name: {"name": name, "username": name, "email": f"{name}@plans.local", "password": "x"}
+    reseller = call(client, "POST", "/resellers", json={
+        "profile": profile("reseller"), "business": {}, "address": {}, "bank": {},
+        "wallet": {"total_credits": 1000, "available_credits": 1000}}).json()
+    rid = reseller["user_id"]
+    call(client, "GET", "/resellers")
+    call(client, "GET", f"/resellers/{rid}")
+
+    user = call(client, "POST", "/business-users", json={
+        "parent_reseller_id": rid, "profile": profile("business"), "business": {}, "address": {}}).json()
+    uid = user["user_id"]
+    call(client, "GET", "/business-users")
+    call(client, "GET", f"/business-users?reseller_id={rid}", "GET /business-users?reseller_id")
+    call(client, "GET", f"/business-users/{uid}")
+    call(client, "POST", "/business-users/import", data={"parent_reseller_id": rid}, files={
+        "file": ("users.csv", b"name,username,email,password\nImported,imported,imported@plans.local,x\n", "text/csv")})
+
+    for _ in range(2):
+        call(client, "POST", "/credits/distribute", json={"from_reseller_id": rid, "to_business_user_id": uid, "credits": 250})
+    call(client, "POST", "/credits/distribute-bulk", json={"from_reseller_id": rid, "items": [{"business_user_id": uid, "credits": 1}]})
+    paged(client, "/credits/history", {})
+    paged(client, "/credits/history", {"reseller_id": rid})
+    paged(client, "/credits/history", {"business_user_id": uid})
+
+    message = {"user_id": uid, "sender_number": "+910000000000", "receiver_number": "+911111111111", "message_body": "hi"}
+    sent = call(client, "POST", "/messages/send", json=message).json()
+    for _ in range(2):
+        call(client, "POST", "/messages/send", "POST /messages/send (Idempotency-Key)", json=message, headers={"Idempotency-Key": "plans"})
+    main.idempotency_store.clear()
+    call(client, "POST", "/messages/send", "POST /messages/send (replay from table)", json=message, headers={"Idempotency-Key": "plans"})
+    call(client, "POST", "/messages/send-batch", json={"user_id": uid, "messages": [message] * 3})
+    template = {**message, "message_type": "template", "message_body": "Your invoice is ready. " * 5}
+    call(client, "POST", "/messages/send-batch", "POST /messages/send-batch (template)", json={"user_id": uid, "messages": [template] * 3})
+    stored = call(client, "POST", "/templates/", json={"user_id": uid, "name": "plans", "body": "Hi {{name}}"}).json()
+    call(client, "GET", "/templates/", params={"user_id": uid})
+    stored_message = {**message, "message_body": None, "template_name": "plans", "variables": {"name": "x"}}
+    for _ in range(2):
+        call(client, "POST", "/messages/send-batch", "POST /messages/send-batch (stored template)", json={"user_id": uid, "messages": [stored_message] * 3})
+    call(client, "PUT", f"/templates/{stored['template_id']}", json={"body": "Hello {{name}}"})
+    hold = call(client, "POST", "/credits/holds", json={"user_id": uid, "credits": 10}).json()
+    call(client, "POST", "/messages/send-batch", "POST /messages/send-batch (hold)",
+         json={"user_id": uid, "hold_id": hold["hold_id"], "messages": [message] * 2})
+    call(client, "GET", f"/credits/holds/{hold['hold_id']}")
+    for path in ("/messages", "/usage/logs"):
+        paged(client, path, {})
+        paged(client, path, {"user_id": uid})
+    call(client, "GET", f"/messages/{sent['message_id']}")
+    window = {"from": "2026-01-01T00:00:00", "to": "2027-01-01T00:00:00"}
+    for path in ("/export/messages", "/export/usage"):
+        call(client, "GET", path)
+        call(client, "GET", path, f"GET {path}?user_id&from&to", params={**window, "user_id": uid, "format": "csv"})
+    call(client, "GET", "/export/credits")
+    call(client, "GET", "/export/credits", "GET /export/credits?reseller_id&from&to", params={**window, "reseller_id": rid})
+    call(client, "GET", "/export/credits", "GET /export/credits?business_user_id", params={"business_user_id": uid})
+
+    current["endpoint"] = "dispatcher"
+    main.dispatcher.drain()
+    current["endpoint"] = "hold settlement"
+    main.settle_credit_holds()
+    current["endpoint"] = "startup recovery"
+    with database.SessionLocal() as db:
+        crud_dispatch.requeue_expired(db, datetime.utcnow())
+        db.rollback()
+    current["endpoint"] = None
+    call(client, "POST", f"/credits/holds/{hold['hold_id']}/release")
+    call(client, "PUT", f"/rate-limits/{uid}", json={"rate_per_second": 1, "burst": 1})
+
+    device = call(client, "POST", "/devices/connect", json={"user_id": uid, "device_name": "phone"}).json()
+    call(client, "GET", "/devices")
+    call(client, "GET", f"/devices?user_id={uid}", "GET /devices?user_id")
+    session = call(client, "POST", "/sessions", json={"device_id": device["device_id"]}).json()
+    call(client, "GET", f"/sessions/validate?token={session['session_token']}", "GET /sessions/validate")
+
+    call(client, "GET", f"/analytics/reseller/{rid}")
+    window = {"from": "2026-01-01T00:00:00", "to": "2027-01-01T00:00:00"}
+    call(client, "GET", "/usage/summary", "GET /usage/summary?user_id", params={**window, "user_id": uid})
+    call(client, "GET", "/usage/summary", "GET /usage/summary?reseller_id",
+         params={**window, "reseller_id": rid, "granularity": "hour"})
+    call(client, "POST", "/whatsapp/official/config", json={
+        "user_id": uid, "business_number": "1", "waba_id": "w", "phone_number_id": "p", "access_token": "t"})
+    call(client, "GET", f"/whatsapp/official/{uid}")
+    call(client, "DELETE", f"/devices/{device['device_id']}")
+    current["endpoint"] = "session sweeper"
+    main.sweep_sessions()
+    current["endpoint"] = "idempotency purger"
+    main.purge_idempotency_keys()
+    # Last: a zero-month window archives everything, then the exports read it back
+    current["endpoint"] = "archiver"
+    main.archive_partitions(database.SessionLocal, retention_months=0)
+    current["endpoint"] = None
+    call(client, "GET", "/export/archive")
+    call(client, "GET", "/export/messages", "GET /export/messages (archived)", params={"user_id": uid})
+    current["endpoint"] = None
+
+
+def sqlite_problems(conn, statement, parameters, allowed):
+    plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    # A WHERE inside a scalar subquery (e.g. Message.message_body's lookup) does not filter the outer scan
+    outer = re.sub(r"\(SELECT [^()]*\)", "", statement)
+    filtered = re.search(r"\bWHERE\b", outer) is not None
+    problems = []
+    for row in plan:
+        detail = row[-1]
+        scan = re.match(r"SCAN (\w+)( USING .*)?$", detail)
+        # Walking an index in order is fine for an unfiltered ORDER BY ... LIMIT;
+        # under a WHERE it means the filter had no usable index
+        if scan and scan.group(1) != "CONSTANT" and scan.group(1) not in allowed and (filtered or not scan.group(2)):
+            problems.append(detail)
+        if "USE TEMP B-TREE FOR ORDER BY" in detail:
+            problems.append(detail)
+    return problems, [row[-1] for row in plan]
+
+
+def postgres_problems(conn, statement, parameters, allowed):
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    plan = conn.exec_driver_sql("EXPLAIN " + statement, parameters).fetchall()
+    lines = [row[0] for row in plan]
+    problems = []
+    for line in lines:
+        seq = re.search(r"Seq Scan on (\w+)", line)
+        if seq and seq.group(1) not in allowed:
+            problems.append(line.strip())
+    return problems, lines
+
+
+def main_check():
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+    # No lifespan: background workers would interleave their statements with
+    # the endpoint being captured. The dispatcher and settler are driven inline.
+    exercise(TestClient(main.app))
+
+    explain = sqlite_problems if database.engine.dialect.name == "sqlite" else postgres_problems
+    failures = 0
+    with database.engine.connect() as conn:
+        for endpoint, statements in captured.items():
+            seen = set()
+            for statement, parameters in statements:
+                if statement in seen:
+                    continue
+                seen.add(statement)
+                problems, plan = explain(conn, statement, parameters, ALLOWED_SCANS.get(endpoint, set()))
+                status = "FAIL" if problems else "ok"
+                print(f"[{status}] {endpoint}: {' '.join(statement.split())[:110]}")
+                for line in problems:
+                    print(f"         {line}")
+                failures += bool(problems)
+        conn.rollback()
+
+    print(f"\n{sum(len(s) for s in captured.values())} statements from {len(captured)} endpoints, {failures} regressions")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main_check() else 1)
@@ -0,0 +1,81 @@
+"""Read/write routing check with two SQLite files standing in for primary and replica.
+
+Writes go through the API to the primary; reads are served from the replica file,
+so a write is invisible to the read endpoints until the replica is refreshed
+(here with SQLite's backup API). Also prints the SQLite pragmas each engine runs with.
+
+Usage: python bench/read_routing.py
+Set BENCH_DATABASE_URL / BENCH_DATABASE_READ_URL to use other databases (for example
+a local PostgreSQL and a second database on it); the refresh step is SQLite-only.
+"""
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+
+workdir = tempfile.mkdtemp(prefix="wa_routing_")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL") or f"sqlite:///{workdir}/primary.db"
+os.environ["DATABASE_READ_URL"] = os.environ.get("BENCH_DATABASE_READ_URL") or f"sqlite:///{workdir}/replica.db"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import database
+import main
+from migrations import run_migrations
+
+
+def refresh_replica():
+    primary = sqlite3.connect(database.engine.url.database)
+    replica = sqlite3.connect(database.read_engine.url.database)
+    database.read_engine.dispose()
+    primary.backup(replica)
+    primary.close()
+    replica.close()
+
+
+def pragmas(engine):
+    with engine.connect() as conn:
+        return {name: conn.execute(text(f"PRAGMA {name}")).scalar()
+                for name in ("journal_mode", "busy_timeout", "synchronous")}
+
+
+def main_check():
+    assert database.READ_REPLICA, "DATABASE_READ_URL must differ from DATABASE_URL"
+    # No lifespan here, so migrate both files explicitly
+    run_migrations(database.engine)
+    run_migrations(database.read_engine)
+    client = TestClient(main.app)
+    reseller = client.post("/resellers", json={
+        "profile": {"name": "Routing", "username": "routing", "email": "routing@bench.local", "password": "x"},
+        "business": {}, "address": {}, "bank": {}, "wallet": {"total_credits": 10, "available_credits": 10},
+    }).json()
+
+    before = client.get(f"/resellers/{reseller['user_id']}").status_code
+    listed_before = len(client.get("/resellers").json())
+    sqlite = database.engine.url.get_backend_name() == "sqlite"
+    if sqlite:
+        refresh_replica()
+    after = client.get(f"/resellers/{reseller['user_id']}").status_code
+    listed_after = len(client.get("/resellers").json())
+
+    report = {
+        "primary": str(database.engine.url),
+        "replica": str(database.read_engine.url),
+        "read_before_refresh": before,
+        "read_after_refresh": after,
+        "listed_before_refresh": listed_before,
+        "listed_after_refresh": listed_after,
+    }
+    if sqlite:
+        report["pragmas"] = {"primary": pragmas(database.engine), "replica": pragmas(database.read_engine)}
+    print(json.dumps(report, indent=2))
+    if before != 404 or (sqlite and after != 200):
+        sys.exit("reads are not routed to the read engine")
+
+
+if __name__ == "__main__":
+    main_check()
@@ -0,0 +1,51 @@
+"""Messages per second: N calls to /messages/send vs /messages/send-batch.
+
+Usage: python bench/send_batch.py [messages] [batch_size]
+"""
+import json
+import sys
+
+from common import Timer, make_session_factory, seed_business_user
+
+import schemas
+from services.messages import MessageService
+
+
+def build(user_id: str, count: int):
+    return [
+        schemas.MessageCreate(
+            user_id=user_id, sender_number="+910000000000", receiver_number=f"+91{i:010d}",
+            message_body=f"Hello customer {i}",
+        )
+        for i in range(count)
+    ]
+
+
+def main(count: int = 5000, batch_size: int = 1000):
+    _, SessionLocal = make_session_factory()
+    with SessionLocal() as db:
+        _, user_id = seed_business_user(db, credits=count * 2)
+    items = build(user_id, count)
+
+    # Single-send path: one session (request) per message, as the endpoint does
+    with Timer() as single:
+        for item in items:
+            with SessionLocal() as db:
+                MessageService(db).send(item)
+
+    with Timer() as batched:
+        for i in range(0, count, batch_size):
+            with SessionLocal() as db:
+                MessageService(db).send_batch(schemas.MessageBatchCreate(user_id=user_id, messages=items[i:i + batch_size]))
+
+    print(json.dumps({
+        "messages": count,
+        "batch_size": batch_size,
+        "single_msgs_per_sec": round(count / single.elapsed, 1),
+        "batch_msgs_per_sec": round(count / batched.elapsed, 1),
+        "speedup": round(single.elapsed / batched.elapsed, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
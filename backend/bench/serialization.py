@@ -0,0 +1,130 @@
+"""Per-row cost of the list endpoints: ORM + map_db_* + response_model validation
+versus column projection + FastJSONResponse.
+
+Both paths run the same query shape against the same rows and produce the same
+JSON (checked). Times are best-of-N for one page, reported per row.
+
+Usage: python bench/serialization.py [page_size] [repeat]
+"""
+import json
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+# main binds database.engine at import; point it at the bench database first
+_url = os.environ.get("BENCH_DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="wa_bench_"), "bench.db")
+os.environ["DATABASE_URL"] = _url
+
+from common import Timer, make_session_factory, seed_business_user
+
+_, SessionLocal = make_session_factory(_url)
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+import models, schemas
+import main
+from crud import projections
+from responses import FastJSONResponse
+
+DESCRIPTION = "Wholesale distributor of packaged goods. " * 50
+
+
+def seed(db, rows: int):
+    reseller_id, user_id = seed_business_user(db, credits=1000)
+    db.execute(insert(models.MasterUser), [
+        {
+            "user_id": str(uuid.uuid4()), "name": f"Reseller {i}", "username": f"r{i}", "email": f"r{i}@bench.local",
+            "phone": "+910000000000", "password_hash": "hashed_bench", "business_name": "Bench Co",
+            "business_description": DESCRIPTION, "full_address": "1 Bench Street", "country": "IN",
+            "bank_name": "Bench Bank", "total_credits_micro": 5_000_000, "available_credits_micro": 4_000_000,
+            "used_credits_micro": 1_000_000,
+        }
+        for i in range(rows)
+    ])
+    db.execute(insert(models.BusinessUser), [
+        {
+            "user_id": str(uuid.uuid4()), "parent_reseller_id": reseller_id, "name": f"Business {i}",
+            "username": f"b{i}", "email": f"b{i}@bench.local", "password_hash": "hashed_bench",
+            "business_description": DESCRIPTION, "credits_allocated_micro": 2_500_000,
+            "credits_remaining_micro": 2_500_000,
+        }
+        for i in range(rows)
+    ])
+    start = datetime(2026, 1, 1)
+    db.execute(insert(models.Message), [
+        {
+            "message_id": str(uuid.uuid4()), "user_id": user_id, "mode": "official",
+            "sender_number": "+910000000000", "receiver_number": f"+91{i:010d}",
+            "body_inline": "Your order has shipped and will arrive tomorrow. " * 4, "status": "sent",
+            "credits_used": 1.0, "sent_at": start + timedelta(seconds=i),
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+
+
+def legacy_resellers(db, limit):
+    users = db.query(models.MasterUser).limit(limit).all()
+    return [main.map_db_to_schema(u) for u in users]
+
+
+def legacy_business_users(db, limit):
+    users = db.query(models.BusinessUser).limit(limit).all()
+    return [main.map_db_business_to_schema(u) for u in users]
+
+
+def legacy_messages(db, limit):
+    query = db.query(models.Message)
+    msgs, _ = main.keyset_paginate(query, models.Message.sent_at, models.Message.message_id, 0, limit)
+    return [main.map_db_message_to_schema(m) for m in msgs]
+
+
+CASES = [
+    ("/resellers", List[schemas.ResellerRead], legacy_resellers,
+     lambda db, limit: projections.list_resellers(db, 0, limit)),
+    ("/business-users", List[schemas.BusinessUserRead], legacy_business_users,
+     lambda db, limit: projections.list_business_users(db, None, 0, limit)),
+    ("/messages", List[schemas.MessageRead], legacy_messages,
+     lambda db, limit: projections.list_messages(db, None, 0, limit)[0]),
+]
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        with Timer() as t:
+            body = fn()
+        best = t.elapsed if best is None else min(best, t.elapsed)
+    return best, body
+
+
+def main_bench(page_size: int = 1000, repeat: int = 20):
+    with SessionLocal() as db:
+        seed(db, page_size)
+
+    results = []
+    for path, response_type, legacy, fast in CASES:
+        adapter = TypeAdapter(response_type)
+        with SessionLocal() as db:
+            # What FastAPI does with a response_model: validate, then dump to JSON
+            before, legacy_body = best_of(
+                lambda: adapter.dump_json(adapter.validate_python(legacy(db, page_size))), repeat)
+            db.expunge_all()
+            after, fast_body = best_of(lambda: FastJSONResponse(fast(db, page_size)).body, repeat)
+        assert json.loads(legacy_body) == json.loads(fast_body), f"{path}: payloads differ"
+        results.append({
+            "endpoint": path,
+            "before_us_per_row": round(before / page_size * 1e6, 2),
+            "after_us_per_row": round(after / page_size * 1e6, 2),
+            "speedup": round(before / after, 2),
+        })
+
+    print(json.dumps({"page_size": page_size, "repeat": repeat, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main_bench(*(int(arg) for arg in sys.argv[1:3]))
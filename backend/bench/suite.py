@@ -0,0 +1,202 @@
+"""End-to-end load benchmark: seeded data + the real app driven by concurrent async clients.
+
+Generates a dataset (bench/datagen.py), then drives the app in-process through
+httpx.AsyncClient over ASGITransport. Each scenario runs on its own, as
+`requests` calls spread over `clients` concurrent clients, and reports
+p50/p95/p99/mean latency, throughput and error counts. Reads run before writes
+so every read scenario sees the same data.
+
+Results are JSON (stdout, or --out FILE); --compare OLD.json adds the relative
+change of each latency/throughput figure against an earlier run.
+
+Usage:
+  python bench/suite.py [--scale small] [--clients 50] [--requests 2000]
+                        [--only list_messages,send] [--out run.json] [--compare previous.json]
+Set BENCH_DATABASE_URL together with --skip-seed to reuse an already generated database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--scale", default="small")
+parser.add_argument("--clients", type=int, default=50)
+parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+parser.add_argument("--only", default="", help="comma-separated scenario names")
+parser.add_argument("--skip-seed", action="store_true", help="reuse the data already in BENCH_DATABASE_URL")
+parser.add_argument("--out")
+parser.add_argument("--compare")
+args = parser.parse_args()
+
+# main binds its engines at import; point them at the bench database first
+if "BENCH_DATABASE_URL" in os.environ:
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+else:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="wa_suite_"), "suite.db")
+os.environ.pop("DATABASE_READ_URL", None)
+
+from common import Timer
+from datagen import SCALES, count_rows, generate, load_manifest
+
+import httpx
+
+import database
+import main
+from migrations import run_migrations
+
+
+def scenarios(manifest):
+    users, resellers, tokens = manifest["business_users"], manifest["resellers"], manifest["tokens"]
+    start, end = manifest["window"]
+
+    def message(user_id, rng):
+        return {"user_id": user_id, "mode": "official", "sender_number": "+910000000000",
+                "receiver_number": f"+91{rng.randrange(10**10):010d}", "message_type": "text",
+                "message_body": "Benchmark message"}
+
+    def send(client, rng):
+        return client.post("/messages/send", json=message(rng.choice(users)["user_id"], rng))
+
+    def send_batch(client, rng):
+        user_id = rng.choice(users)["user_id"]
+        return client.post("/messages/send-batch", json={
+            "user_id": user_id, "messages": [message(user_id, rng) for _ in range(50)]})
+
+    def distribute(client, rng):
+        user = rng.choice(users)
+        return client.post("/credits/distribute", json={
+            "from_reseller_id": user["reseller_id"], "to_business_user_id": user["user_id"], "credits": 1})
+
+    return {
+        # Reads
+        "list_resellers": lambda c, rng: c.get("/resellers", params={"limit": 100}),
+        "list_business_users": lambda c, rng: c.get("/business-users", params={"reseller_id": rng.choice(resellers)}),
+        "list_messages": lambda c, rng: c.get("/messages", params={"user_id": rng.choice(users)["user_id"]}),
+        "list_usage_logs": lambda c, rng: c.get("/usage/logs", params={"user_id": rng.choice(users)["user_id"]}),
+        "credit_history": lambda c, rng: c.get("/credits/history", params={"reseller_id": rng.choice(resellers)}),
+        "analytics": lambda c, rng: c.get(f"/analytics/reseller/{rng.choice(resellers)}"),
+        "usage_summary": lambda c, rng: c.get("/usage/summary", params={
+            "reseller_id": rng.choice(resellers), "from": start, "to": end, "granularity": "day"}),
+        "validate": lambda c, rng: c.get("/sessions/validate", params={"token": rng.choice(tokens)}),
+        # Writes
+        "send": send,
+        "send_batch": send_batch,
+        "distribute": distribute,
+    }
+
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_scenario(client, call, clients: int, total: int, seed: int):
+    latencies, errors = [], {}
+    remaining = iter(range(total))
+
+    async def worker(rng):
+        for _ in remaining:
+            began = time.perf_counter()
+            response = await call(client, rng)
+            latencies.append((time.perf_counter() - began) * 1000)
+            if response.status_code >= 400:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(seed + i)) for i in range(clients)))
+    elapsed = time.perf_counter() - began
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "throughput_rps": round(len(ordered) / elapsed, 1),
+        "p50_ms": round(percentile(ordered, 50), 2),
+        "p95_ms": round(percentile(ordered, 95), 2),
+        "p99_ms": round(percentile(ordered, 99), 2),
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "errors": errors,
+    }
+
+
+async def drive(manifest, selected):
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for index, (name, call) in enumerate(selected.items()):
+            results[name] = await run_scenario(client, call, args.clients, args.requests, seed=index * 1000)
+            print(f"{name}: {results[name]['p95_ms']} ms p95, {results[name]['throughput_rps']} rps", file=sys.stderr)
+    return results
+
+
+def compare(current, previous):
+    changes = {}
+    for name, result in current.items():
+        before = previous.get("results", {}).get(name)
+        if not before:
+            continue
+        changes[name] = {
+            key: f"{(result[key] - before[key]) / before[key] * 100:+.1f}%"
+            for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps") if before.get(key)
+        }
+    return changes
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main_bench():
+    run_migrations(database.engine)
+    seed_seconds = None
+    if not args.skip_seed:
+        with Timer() as t:
+            manifest = generate(database.SessionLocal, SCALES[args.scale])
+        seed_seconds = round(t.elapsed, 2)
+    else:
+        manifest = load_manifest(database.SessionLocal)
+
+    # No lifespan: the dispatcher and sweepers stay off so scenarios measure the request path only
+    available = scenarios(manifest)
+    wanted = [name for name in args.only.split(",") if name] or list(available)
+    unknown = set(wanted) - set(available)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    rows = count_rows(database.SessionLocal)  # as seeded, before the write scenarios add to it
+    results = asyncio.run(drive(manifest, {name: available[name] for name in wanted}))
+
+    report = {
+        "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "database": database.engine.dialect.name,
+        "async_routes": database.ASYNC_ROUTES,
+        "scale": args.scale if not args.skip_seed else None,
+        "seed_seconds": seed_seconds,
+        "rows": rows,
+        "clients": args.clients,
+        "requests_per_scenario": args.requests,
+        "results": results,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report["change_vs_previous"] = compare(results, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,87 @@
+"""Template renders per second, and what stored templates cost on /messages/send-batch.
+
+Render: the compiled form (one format_map per recipient) against re.sub over the
+raw body on every render, the naive way to do per-recipient substitution.
+Send: the same messages through MessageService.send_batch with bodies rendered
+client-side (literal message_body) and from a stored template.
+
+Usage: python bench/templates.py [renders] [messages] [batch_size]
+"""
+import json
+import sys
+
+from common import Timer, make_session_factory, seed_business_user
+
+import schemas
+from services.messages import MessageService
+from services.templates import PLACEHOLDER, CompiledTemplate, TemplateService, template_cache
+
+BODY = (
+    "Hi {{name}}, your order {{order_id}} of Rs {{amount}} has shipped and arrives by {{date}}. "
+    "Track it at https://acme.example/t/{{order_id}} or reply HELP. - Team Acme"
+)
+
+
+def variables(i: int) -> dict:
+    return {"name": f"Customer {i}", "order_id": f"AC{i:08d}", "amount": 499 + i % 1000, "date": "12 Nov"}
+
+
+def naive_render(body: str, values: dict) -> str:
+    return PLACEHOLDER.sub(lambda m: str(values[m.group(1)]), body)
+
+
+def bench_render(count: int):
+    values = [variables(i) for i in range(count)]
+    with Timer() as naive:
+        expected = [naive_render(BODY, v) for v in values]
+    compiled = CompiledTemplate(BODY)
+    with Timer() as fast:
+        rendered = [compiled.render(v) for v in values]
+    assert rendered == expected
+    return {
+        "renders": count,
+        "naive_per_sec": round(count / naive.elapsed),
+        "compiled_per_sec": round(count / fast.elapsed),
+        "speedup": round(naive.elapsed / fast.elapsed, 2),
+    }
+
+
+def send(SessionLocal, user_id: str, items: list, batch_size: int):
+    with Timer() as timer:
+        for i in range(0, len(items), batch_size):
+            with SessionLocal() as db:
+                MessageService(db).send_batch(schemas.MessageBatchCreate(user_id=user_id, messages=items[i:i + batch_size]))
+    return round(len(items) / timer.elapsed)
+
+
+def bench_send(count: int, batch_size: int):
+    _, SessionLocal = make_session_factory()
+    with SessionLocal() as db:
+        _, user_id = seed_business_user(db, credits=count * 3)
+        TemplateService(db).create(schemas.MessageTemplateCreate(user_id=user_id, name="shipped", body=BODY))
+    compiled = CompiledTemplate(BODY)
+    base = {"user_id": user_id, "sender_number": "+910000000000"}
+    literal = [
+        schemas.MessageCreate(**base, receiver_number=f"+91{i:010d}", message_body=compiled.render(variables(i)))
+        for i in range(count)
+    ]
+    stored = [
+        schemas.MessageCreate(**base, receiver_number=f"+91{i:010d}", template_name="shipped", variables=variables(i))
+        for i in range(count)
+    ]
+    template_cache.clear()
+    return {
+        "messages": count,
+        "batch_size": batch_size,
+        "literal_msgs_per_sec": send(SessionLocal, user_id, literal, batch_size),
+        "stored_template_msgs_per_sec": send(SessionLocal, user_id, stored, batch_size),
+        "template_cache": template_cache.stats(),
+    }
+
+
+def main(renders: int = 200_000, count: int = 20_000, batch_size: int = 1000):
+    print(json.dumps({"render": bench_render(renders), "send_batch": bench_send(count, batch_size)}, indent=2))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
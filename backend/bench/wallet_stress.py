@@ -0,0 +1,101 @@
+"""Concurrency stress check for the wallet: no credits lost or double-spent.
+
+64 concurrent senders hammer one business user's wallet (and 64 concurrent
+distributions hammer one reseller) with more demand than the balance covers.
+Afterwards every credit must be accounted for. Exits non-zero on a mismatch.
+
+Usage: python bench/wallet_stress.py [senders] [attempts_per_sender]
+Set BENCH_DATABASE_URL to run against PostgreSQL.
+"""
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from common import Timer, make_session_factory, seed_business_user
+
+import models, schemas
+from services.credits import CreditService
+from services.messages import MessageService
+
+
+def run(worker, senders: int, attempts: int):
+    def loop(_):
+        ok = rejected = 0
+        for _ in range(attempts):
+            try:
+                worker()
+                ok += 1
+            except HTTPException as e:
+                if e.status_code != 400:
+                    raise
+                rejected += 1
+        return ok, rejected
+
+    with ThreadPoolExecutor(max_workers=senders) as pool:
+        outcomes = list(pool.map(loop, range(senders)))
+    return sum(o for o, _ in outcomes), sum(r for _, r in outcomes)
+
+
+def main(senders: int = 64, attempts: int = 20):
+    _, SessionLocal = make_session_factory()
+    demand = senders * attempts
+    budget = demand // 2  # only half of the attempts can be paid for
+
+    with SessionLocal() as db:
+        reseller_id, user_id = seed_business_user(db, credits=budget, reseller_credits=budget)
+        _, target_id = seed_business_user(db, credits=0, suffix="_target")
+        db.query(models.BusinessUser).filter(models.BusinessUser.user_id == target_id).update(
+            {"parent_reseller_id": reseller_id})
+        db.commit()
+
+    msg = schemas.MessageCreate(user_id=user_id, sender_number="+910000000000", receiver_number="+911111111111",
+                                message_body="stress")
+    share = schemas.CreditDistributionCreate(from_reseller_id=reseller_id, to_business_user_id=target_id, credits=1)
+
+    def send():
+        with SessionLocal() as db:
+            MessageService(db).send(msg)
+
+    def distribute():
+        with SessionLocal() as db:
+            CreditService(db).distribute(share)
+
+    with Timer() as send_timer:
+        sent, send_rejected = run(send, senders, attempts)
+    with Timer() as share_timer:
+        shared, share_rejected = run(distribute, senders, attempts)
+
+    with SessionLocal() as db:
+        user = db.get(models.BusinessUser, user_id)
+        reseller = db.get(models.MasterUser, reseller_id)
+        target = db.get(models.BusinessUser, target_id)
+        messages = db.query(models.Message).filter(models.Message.user_id == user_id).count()
+        logs = db.query(models.UsageLog).filter(models.UsageLog.user_id == user_id).count()
+        transactions = db.query(models.CreditTransaction).count()
+
+        checks = {
+            "sends_match_budget": sent == budget,
+            "wallet_drained_exactly": user.credits_remaining_micro == 0,
+            "used_equals_sent": user.credits_used_micro == models.to_micro(sent),
+            "one_message_per_debit": messages == sent and logs == sent,
+            "distributions_match_budget": shared == budget,
+            "reseller_drained_exactly": reseller.available_credits_micro == 0,
+            "target_received_all": target.credits_remaining_micro == models.to_micro(shared),
+            "one_transaction_per_debit": transactions == shared,
+        }
+
+    print(json.dumps({
+        "senders": senders,
+        "attempts": demand,
+        "budget": budget,
+        "send": {"ok": sent, "rejected": send_rejected, "seconds": round(send_timer.elapsed, 2)},
+        "distribute": {"ok": shared, "rejected": share_rejected, "seconds": round(share_timer.elapsed, 2)},
+        "checks": checks,
+    }, indent=2))
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(*(int(arg) for arg in sys.argv[1:3])) else 1)
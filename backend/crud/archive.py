@@ -0,0 +1,75 @@
+from datetime import datetime
+from sqlalchemy import delete, exists, func, insert, inspect, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+import models
+
+# Archived tables are addressed by model and (time column, id column) name,
+# so one set of statements serves messages and usage_logs
+
+def list_partitions(db: Session, table_name: str = None, start: datetime = None, end: datetime = None):
+    """Archived months, oldest first; `start`/`end` keep those overlapping [start, end)."""
+    Partition = models.ArchivedPartition
+    stmt = select(Partition)
+    if table_name:
+        stmt = stmt.where(Partition.table_name == table_name)
+    if start is not None:
+        stmt = stmt.where(Partition.period_end > start)
+    if end is not None:
+        stmt = stmt.where(Partition.period_start < end)
+    return db.execute(stmt.order_by(Partition.table_name, Partition.period_start)).scalars().all()
+
+def get_partition(db: Session, table_name: str, period_start: datetime):
+    return db.get(models.ArchivedPartition, (table_name, period_start))
+
+def record_partition(db: Session, table_name: str, period_start: datetime, period_end: datetime,
+                     path: str, row_count: int, size_bytes: int):
+    values = {"path": path, "row_count": row_count, "size_bytes": size_bytes, "archived_at": datetime.utcnow()}
+    Partition = models.ArchivedPartition
+    if get_partition(db, table_name, period_start) is None:
+        db.execute(insert(Partition).values(table_name=table_name, period_start=period_start, period_end=period_end, **values))
+    else:
+        db.execute(
+            update(Partition)
+            .where(Partition.table_name == table_name, Partition.period_start == period_start)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+def oldest_before(db: Session, model, time_key: str, before: datetime):
+    # MIN over the leading column of the time index is a single probe
+    time_col = getattr(model, time_key)
+    return db.execute(select(func.min(time_col)).where(time_col < before)).scalar()
+
+def in_flight_messages(db: Session, start: datetime, end: datetime) -> bool:
+    """True if a message in [start, end) is still owned by the dispatcher or an active hold."""
+    Message = models.Message
+    active_hold = select(models.CreditHold.hold_id).where(models.CreditHold.status == "active")
+    return db.execute(select(exists().where(
+        Message.sent_at >= start, Message.sent_at < end,
+        or_(Message.status.in_(("queued", "sending")), Message.hold_id.in_(active_hold)),
+    ))).scalar()
+
+def month_rows(db: Session, model, time_key: str, id_key: str, start: datetime, end: datetime, chunk_size: int):
+    """Every mapped attribute of the rows in [start, end) in (time, id) order, fetched in chunks.
+
+    Mapped attributes rather than table columns, so derived ones such as
+    Message.message_body are archived resolved.
+    """
+    time_col = getattr(model, time_key)
+    columns = [getattr(model, attr.key).label(attr.key) for attr in inspect(model).column_attrs]
+    stmt = select(*columns).where(time_col >= start, time_col < end).order_by(time_col, getattr(model, id_key))
+    result = db.execute(stmt, execution_options={"yield_per": chunk_size})
+    keys = list(result.keys())
+    for rows in result.partitions():
+        for row in rows:
+            yield dict(zip(keys, row))
+
+def delete_key_range(db: Session, model, time_key: str, id_key: str, first: tuple, last: tuple) -> int:
+    """Delete the rows whose (time, id) lies in [first, last]. Caller commits."""
+    table = model.__table__
+    time_col, id_col = table.c[time_key], table.c[id_key]
+    key = tuple_(time_col, id_col)
+    # The plain time range lets the time index bound the scan; the row values trim its ends
+    return db.execute(delete(table).where(
+        time_col >= first[0], time_col <= last[0], key >= tuple_(*first), key <= tuple_(*last),
+    )).rowcount
@@ -0,0 +1,22 @@
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+import models
+
+def taken_emails(db: Session, emails) -> set:
+    # One IN query per chunk (served by the unique index) instead of a lookup per row
+    if not emails:
+        return set()
+    return set(db.execute(
+        select(models.BusinessUser.email).where(models.BusinessUser.email.in_(list(emails)))
+    ).scalars())
+
+def taken_usernames(db: Session, usernames) -> set:
+    if not usernames:
+        return set()
+    return set(db.execute(
+        select(models.BusinessUser.username).where(models.BusinessUser.username.in_(list(usernames)))
+    ).scalars())
+
+def bulk_insert_business_users(db: Session, rows: list):
+    if rows:
+        db.execute(insert(models.BusinessUser), rows)
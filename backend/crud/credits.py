@@ -1,5 +1,7 @@
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
-from .. import models, schemas
+import models, schemas
+from pagination import keyset_paginate
 
 def get_reseller(db: Session, user_id: str):
     return db.query(models.MasterUser).filter(models.MasterUser.user_id == user_id).first()
@@ -7,6 +9,16 @@ def get_reseller(db: Session, user_id: str):
 def get_business_user(db: Session, user_id: str):
     return db.query(models.BusinessUser).filter(models.BusinessUser.user_id == user_id).first()
 
+def get_parent_resellers(db: Session, user_ids):
+    """{business_user_id: parent_reseller_id} for the ids that exist, in one IN query."""
+    if not user_ids:
+        return {}
+    rows = db.execute(
+        select(models.BusinessUser.user_id, models.BusinessUser.parent_reseller_id)
+        .where(models.BusinessUser.user_id.in_(list(user_ids)))
+    )
+    return dict(rows.all())
+
 def create_transaction(db: Session, tx_data: schemas.CreditDistributionCreate):
     db_tx = models.CreditTransaction(
         from_reseller_id=tx_data.from_reseller_id,
@@ -16,10 +28,14 @@ def create_transaction(db: Session, tx_data: schemas.CreditDistributionCreate):
     db.add(db_tx)
     return db_tx
 
-def get_history(db: Session, reseller_id: str = None, business_user_id: str = None, skip: int = 0, limit: int = 100):
+def bulk_insert_transactions(db: Session, rows: list):
+    if rows:
+        db.execute(insert(models.CreditTransaction), rows)
+
+def get_history(db: Session, reseller_id: str = None, business_user_id: str = None, skip: int = 0, limit: int = 100, cursor: str = None):
     query = db.query(models.CreditTransaction)
     if reseller_id:
         query = query.filter(models.CreditTransaction.from_reseller_id == reseller_id)
     if business_user_id:
         query = query.filter(models.CreditTransaction.to_business_user_id == business_user_id)
-    return query.order_by(models.CreditTransaction.shared_at.desc()).offset(skip).limit(limit).all()
+    return keyset_paginate(query, models.CreditTransaction.shared_at, models.CreditTransaction.distribution_id, skip, limit, cursor)
@@ -0,0 +1,97 @@
+from datetime import datetime
+import uuid
+from sqlalchemy import bindparam, or_, update
+from sqlalchemy.orm import Session
+import models
+from crud import wallet as crud_wallet
+from crud import reseller_stats as crud_reseller_stats
+
+def claim_queued(db: Session, limit: int):
+    # SKIP LOCKED lets several dispatcher processes share the queue on PostgreSQL;
+    # the conditional UPDATE below is what makes the claim safe on SQLite. Rows
+    # another process claimed in between are not returned by it.
+    now = datetime.utcnow()
+    candidates = (
+        db.query(models.Message)
+        .filter(
+            models.Message.status == "queued",
+            or_(models.Message.not_before.is_(None), models.Message.not_before <= now),
+        )
+        .order_by(models.Message.sent_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not candidates:
+        return []
+    won = set(db.execute(
+        update(models.Message)
+        .where(models.Message.message_id.in_([msg.message_id for msg in candidates]), models.Message.status == "queued")
+        .values(status="sending", claimed_at=now)
+        .returning(models.Message.message_id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+    return [
+        {
+            "message_id": msg.message_id,
+            "user_id": msg.user_id,
+            "mode": msg.mode,
+            "sender_number": msg.sender_number,
+            "receiver_number": msg.receiver_number,
+            "message_type": msg.message_type,
+            "template_name": msg.template_name,
+            "message_body": msg.message_body,
+            "credits_used": msg.credits_used,
+            "hold_id": msg.hold_id,
+            "sent_at": msg.sent_at,
+        }
+        for msg in candidates if msg.message_id in won
+    ]
+
+def mark_status(db: Session, message_ids: list, status: str):
+    if message_ids:
+        db.execute(
+            update(models.Message)
+            .where(models.Message.message_id.in_(message_ids))
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+
+def defer(db: Session, deferrals: list):
+    # Rate-limited messages go back to the queue until their sender has capacity:
+    # [(message_id, not_before)], one executemany UPDATE
+    if deferrals:
+        db.execute(
+            update(models.Message.__table__)
+            .where(models.Message.__table__.c.message_id == bindparam("d_message_id"))
+            .values(status="queued", claimed_at=None, not_before=bindparam("d_not_before")),
+            [{"d_message_id": message_id, "d_not_before": not_before} for message_id, not_before in deferrals],
+        )
+
+def requeue_expired(db: Session, claimed_before: datetime):
+    # Rows left in "sending" by a crashed or stopped process go back to the queue.
+    # A live process finishes its batches well inside the lease, so its rows are not
+    # touched; rows without a lease predate claimed_at and count as abandoned.
+    result = db.execute(
+        update(models.Message)
+        .where(
+            models.Message.status == "sending",
+            or_(models.Message.claimed_at.is_(None), models.Message.claimed_at < claimed_before),
+        )
+        .values(status="queued", claimed_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def refund(db: Session, user_id: str, message_id: str, cost: float):
+    balance = crud_wallet.refund_business_user(db, user_id, models.to_micro(cost))
+    if balance is not None:
+        crud_reseller_stats.add_usage(db, user_id, -models.to_micro(cost))
+        db.add(models.UsageLog(
+            usage_id=str(uuid.uuid4()),
+            user_id=user_id,
+            message_id=message_id,
+            credits_deducted=-cost,
+            balance_after=models.from_micro(balance),
+            timestamp=datetime.utcnow(),
+        ))
@@ -0,0 +1,66 @@
+from datetime import datetime
+from sqlalchemy import select
+import models
+
+# Column projections for exports: plain rows, no ORM identity map, so memory stays flat
+MESSAGE_COLUMNS = (
+    models.Message.message_id,
+    models.Message.user_id,
+    models.Message.mode,
+    models.Message.sender_number,
+    models.Message.receiver_number,
+    models.Message.message_type,
+    models.Message.template_name,
+    models.Message.message_body,
+    models.Message.status,
+    models.Message.credits_used,
+    models.Message.hold_id,
+    models.Message.sent_at,
+)
+
+USAGE_COLUMNS = (
+    models.UsageLog.usage_id,
+    models.UsageLog.user_id,
+    models.UsageLog.message_id,
+    models.UsageLog.credits_deducted,
+    models.UsageLog.balance_after,
+    models.UsageLog.timestamp,
+)
+
+CREDIT_COLUMNS = (
+    models.CreditTransaction.distribution_id,
+    models.CreditTransaction.from_reseller_id,
+    models.CreditTransaction.to_business_user_id,
+    models.CreditTransaction.credits_shared,
+    models.CreditTransaction.shared_at,
+)
+
+def _time_window(stmt, time_col, start: datetime = None, end: datetime = None):
+    if start is not None:
+        stmt = stmt.where(time_col >= start)
+    if end is not None:
+        stmt = stmt.where(time_col < end)
+    return stmt
+
+def messages_statement(user_id: str = None, start: datetime = None, end: datetime = None):
+    stmt = select(*MESSAGE_COLUMNS)
+    if user_id:
+        stmt = stmt.where(models.Message.user_id == user_id)
+    stmt = _time_window(stmt, models.Message.sent_at, start, end)
+    return stmt.order_by(models.Message.sent_at, models.Message.message_id)
+
+def usage_statement(user_id: str = None, start: datetime = None, end: datetime = None):
+    stmt = select(*USAGE_COLUMNS)
+    if user_id:
+        stmt = stmt.where(models.UsageLog.user_id == user_id)
+    stmt = _time_window(stmt, models.UsageLog.timestamp, start, end)
+    return stmt.order_by(models.UsageLog.timestamp, models.UsageLog.usage_id)
+
+def credits_statement(reseller_id: str = None, business_user_id: str = None, start: datetime = None, end: datetime = None):
+    stmt = select(*CREDIT_COLUMNS)
+    if reseller_id:
+        stmt = stmt.where(models.CreditTransaction.from_reseller_id == reseller_id)
+    if business_user_id:
+        stmt = stmt.where(models.CreditTransaction.to_business_user_id == business_user_id)
+    stmt = _time_window(stmt, models.CreditTransaction.shared_at, start, end)
+    return stmt.order_by(models.CreditTransaction.shared_at, models.CreditTransaction.distribution_id)
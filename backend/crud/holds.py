@@ -0,0 +1,82 @@
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+import models
+
+def get_business_user(db: Session, user_id: str):
+    return db.query(models.BusinessUser).filter(models.BusinessUser.user_id == user_id).first()
+
+def create_hold(db: Session, user_id: str, reserved: int, campaign_name: str = None):
+    db_hold = models.CreditHold(user_id=user_id, reserved_micro=reserved, consumed_micro=0, settled_micro=0,
+                                campaign_name=campaign_name, status="active")
+    db.add(db_hold)
+    return db_hold
+
+def get_hold(db: Session, hold_id: str):
+    return db.query(models.CreditHold).filter(models.CreditHold.hold_id == hold_id).first()
+
+def draw(db: Session, hold_id: str, user_id: str, amount: int):
+    """consumed += amount if the active hold still covers it. Returns the credits left, or None."""
+    CreditHold = models.CreditHold
+    return db.execute(
+        update(CreditHold)
+        .where(
+            CreditHold.hold_id == hold_id,
+            CreditHold.user_id == user_id,
+            CreditHold.status == "active",
+            CreditHold.reserved_micro - CreditHold.consumed_micro >= amount,
+        )
+        .values(consumed_micro=CreditHold.consumed_micro + amount)
+        .returning(CreditHold.reserved_micro - CreditHold.consumed_micro)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+def give_back(db: Session, hold_id: str, amount: int) -> bool:
+    """Return credits for a message that was not delivered. False if the hold is no longer active."""
+    CreditHold = models.CreditHold
+    return db.execute(
+        update(CreditHold)
+        .where(CreditHold.hold_id == hold_id, CreditHold.status == "active")
+        .values(consumed_micro=CreditHold.consumed_micro - amount)
+        .returning(CreditHold.hold_id)
+        .execution_options(synchronize_session=False)
+    ).scalar() is not None
+
+def unsettled_holds(db: Session):
+    CreditHold = models.CreditHold
+    return db.execute(
+        select(CreditHold.hold_id, CreditHold.user_id, CreditHold.consumed_micro, CreditHold.settled_micro)
+        .where(CreditHold.status == "active", CreditHold.consumed_micro != CreditHold.settled_micro)
+    ).all()
+
+def claim_settlement(db: Session, hold_id: str, settled: int, consumed: int) -> bool:
+    # Compare-and-set on settled_micro: of two processes settling the same hold,
+    # only the one whose UPDATE matches books the wallet
+    CreditHold = models.CreditHold
+    result = db.execute(
+        update(CreditHold)
+        .where(CreditHold.hold_id == hold_id, CreditHold.status == "active", CreditHold.settled_micro == settled)
+        .values(settled_micro=consumed, settled_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def close_hold(db: Session, hold_id: str):
+    """Stop further draws. Returns (user_id, reserved, consumed, settled) as of closing, or None if not active."""
+    CreditHold = models.CreditHold
+    now = datetime.utcnow()
+    return db.execute(
+        update(CreditHold)
+        .where(CreditHold.hold_id == hold_id, CreditHold.status == "active")
+        .values(status="released", released_at=now, settled_at=now)
+        .returning(CreditHold.user_id, CreditHold.reserved_micro, CreditHold.consumed_micro, CreditHold.settled_micro)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+def mark_settled(db: Session, hold_id: str, settled: int):
+    db.execute(
+        update(models.CreditHold)
+        .where(models.CreditHold.hold_id == hold_id)
+        .values(settled_micro=settled)
+        .execution_options(synchronize_session=False)
+    )
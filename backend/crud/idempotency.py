@@ -0,0 +1,50 @@
+from datetime import datetime
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+import models
+
+def get_key(db: Session, scope: str, key: str):
+    return db.execute(
+        select(models.IdempotencyKey).where(
+            models.IdempotencyKey.scope == scope, models.IdempotencyKey.idempotency_key == key
+        )
+    ).scalars().first()
+
+def claim(db: Session, scope: str, key: str, request_hash: str, expires_at: datetime):
+    """Insert the key row now, inside the caller's transaction. A concurrent
+    claim of the same key fails on the primary key (IntegrityError)."""
+    db.execute(insert(models.IdempotencyKey).values(
+        scope=scope, idempotency_key=key, request_hash=request_hash,
+        created_at=datetime.utcnow(), expires_at=expires_at,
+    ))
+
+def delete_key(db: Session, scope: str, key: str):
+    db.execute(
+        delete(models.IdempotencyKey)
+        .where(models.IdempotencyKey.scope == scope, models.IdempotencyKey.idempotency_key == key)
+        .execution_options(synchronize_session=False)
+    )
+
+def store_response(db: Session, scope: str, key: str, status_code: int, body: str) -> bool:
+    """Write the response onto the claimed row; False when the row is not there."""
+    result = db.execute(
+        update(models.IdempotencyKey)
+        .where(models.IdempotencyKey.scope == scope, models.IdempotencyKey.idempotency_key == key)
+        .values(status_code=status_code, response_body=body)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def delete_expired(db: Session, now: datetime, limit: int) -> int:
+    """Delete about `limit` expired keys, oldest first (ties on expires_at go together). Caller commits."""
+    Key = models.IdempotencyKey
+    # The composite key rules out `pk IN (subquery)`; bound the batch by the
+    # expiry of its last row instead, walking ix_idempotency_keys_expires_at
+    batch = select(Key.expires_at).where(Key.expires_at < now).order_by(Key.expires_at).limit(limit).subquery()
+    cutoff = select(func.max(batch.c.expires_at)).scalar_subquery()
+    result = db.execute(
+        delete(Key)
+        .where(Key.expires_at < now, Key.expires_at <= cutoff)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
@@ -0,0 +1,13 @@
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+import models
+
+def insert_missing(db: Session, bodies: dict):
+    """Insert {body_hash: body}; hashes already stored are left alone. Caller commits."""
+    if not bodies:
+        return
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    now = datetime.utcnow()
+    stmt = dialect.insert(models.MessageBody).on_conflict_do_nothing(index_elements=["body_hash"])
+    db.execute(stmt, [{"body_hash": body_hash, "body": body, "created_at": now} for body_hash, body in bodies.items()])
@@ -0,0 +1,15 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+import models
+
+def get_business_user(db: Session, user_id: str):
+    return db.query(models.BusinessUser).filter(models.BusinessUser.user_id == user_id).first()
+
+def bulk_insert_messages(db: Session, rows: list):
+    # Single executemany INSERT instead of one ORM flush per row
+    if rows:
+        db.execute(insert(models.Message), rows)
+
+def bulk_insert_usage_logs(db: Session, rows: list):
+    if rows:
+        db.execute(insert(models.UsageLog), rows)
@@ -0,0 +1,143 @@
+from sqlalchemy.orm import Session
+import models
+from pagination import keyset_paginate
+
+# Column-projected reads for the list endpoints. Rows come back as tuples, are
+# shaped into the *Read layout directly and returned via FastJSONResponse.
+
+RESELLER_COLUMNS = (
+    models.MasterUser.user_id,
+    models.MasterUser.role,
+    models.MasterUser.status,
+    models.MasterUser.created_at,
+    models.MasterUser.name,
+    models.MasterUser.username,
+    models.MasterUser.email,
+    models.MasterUser.phone,
+    models.MasterUser.business_name,
+    models.MasterUser.business_description,
+    models.MasterUser.erp_system,
+    models.MasterUser.gstin,
+    models.MasterUser.full_address,
+    models.MasterUser.pincode,
+    models.MasterUser.country,
+    models.MasterUser.bank_name,
+    models.MasterUser.total_credits_micro,
+    models.MasterUser.available_credits_micro,
+    models.MasterUser.used_credits_micro,
+)
+
+BUSINESS_USER_COLUMNS = (
+    models.BusinessUser.user_id,
+    models.BusinessUser.parent_reseller_id,
+    models.BusinessUser.role,
+    models.BusinessUser.status,
+    models.BusinessUser.whatsapp_mode,
+    models.BusinessUser.created_at,
+    models.BusinessUser.name,
+    models.BusinessUser.username,
+    models.BusinessUser.email,
+    models.BusinessUser.phone,
+    models.BusinessUser.business_name,
+    models.BusinessUser.business_description,
+    models.BusinessUser.erp_system,
+    models.BusinessUser.gstin,
+    models.BusinessUser.full_address,
+    models.BusinessUser.pincode,
+    models.BusinessUser.country,
+    models.BusinessUser.credits_allocated_micro,
+    models.BusinessUser.credits_used_micro,
+    models.BusinessUser.credits_remaining_micro,
+    models.BusinessUser.credits_held_micro,
+)
+
+MESSAGE_COLUMNS = (
+    models.Message.message_id,
+    models.Message.user_id,
+    models.Message.mode,
+    models.Message.sender_number,
+    models.Message.receiver_number,
+    models.Message.message_type,
+    models.Message.template_name,
+    models.Message.message_body,
+    models.Message.status,
+    models.Message.credits_used,
+    models.Message.sent_at,
+)
+MESSAGE_FIELDS = tuple(column.key for column in MESSAGE_COLUMNS)
+
+def list_resellers(db: Session, skip: int = 0, limit: int = 100):
+    rows = db.query(*RESELLER_COLUMNS).offset(skip).limit(limit).all()
+    return [reseller_row(row) for row in rows]
+
+def list_business_users(db: Session, reseller_id: str = None, skip: int = 0, limit: int = 100):
+    query = db.query(*BUSINESS_USER_COLUMNS)
+    if reseller_id:
+        query = query.filter(models.BusinessUser.parent_reseller_id == reseller_id)
+    rows = query.offset(skip).limit(limit).all()
+    return [business_user_row(row) for row in rows]
+
+def list_messages(db: Session, user_id: str = None, skip: int = 0, limit: int = 100, cursor: str = None):
+    query = db.query(*MESSAGE_COLUMNS)
+    if user_id:
+        query = query.filter(models.Message.user_id == user_id)
+    rows, next_cursor = keyset_paginate(query, models.Message.sent_at, models.Message.message_id, skip, limit, cursor)
+    return [message_row(row) for row in rows], next_cursor
+
+def reseller_row(row):
+    (user_id, role, status, created_at, name, username, email, phone,
+     business_name, business_description, erp_system, gstin,
+     full_address, pincode, country, bank_name,
+     total_micro, available_micro, used_micro) = row
+    return {
+        "user_id": user_id,
+        "role": role,
+        "status": status,
+        "profile": {"name": name, "username": username, "email": email, "phone": phone},
+        "business": {
+            "business_name": business_name,
+            "business_description": business_description,
+            "erp_system": erp_system,
+            "gstin": gstin,
+        },
+        "address": {"full_address": full_address, "pincode": pincode, "country": country},
+        "bank": {"bank_name": bank_name},
+        "wallet": {
+            "total_credits": models.from_micro(total_micro),
+            "available_credits": models.from_micro(available_micro),
+            "used_credits": models.from_micro(used_micro),
+        },
+        "created_at": created_at,
+    }
+
+def business_user_row(row):
+    (user_id, parent_reseller_id, role, status, whatsapp_mode, created_at,
+     name, username, email, phone,
+     business_name, business_description, erp_system, gstin,
+     full_address, pincode, country,
+     allocated_micro, used_micro, remaining_micro, held_micro) = row
+    return {
+        "user_id": user_id,
+        "parent_reseller_id": parent_reseller_id,
+        "role": role,
+        "status": status,
+        "whatsapp_mode": whatsapp_mode,
+        "profile": {"name": name, "username": username, "email": email, "phone": phone},
+        "business": {
+            "business_name": business_name,
+            "business_description": business_description,
+            "erp_system": erp_system,
+            "gstin": gstin,
+        },
+        "address": {"full_address": full_address, "pincode": pincode, "country": country},
+        "wallet": {
+            "credits_allocated": models.from_micro(allocated_micro),
+            "credits_used": models.from_micro(used_micro),
+            "credits_remaining": models.from_micro(remaining_micro),
+            "credits_held": models.from_micro(held_micro),
+        },
+        "created_at": created_at,
+    }
+
+def message_row(row):
+    return dict(zip(MESSAGE_FIELDS, row))
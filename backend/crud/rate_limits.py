@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy.orm import Session
+import models
+
+def get_business_user(db: Session, user_id: str):
+    return db.query(models.BusinessUser).filter(models.BusinessUser.user_id == user_id).first()
+
+def upsert_override(db: Session, user_id: str, rate_per_second: float, burst: int):
+    db_override = db.query(models.RateLimitOverride).filter(models.RateLimitOverride.user_id == user_id).first()
+    if db_override is None:
+        db_override = models.RateLimitOverride(user_id=user_id)
+        db.add(db_override)
+    db_override.rate_per_second = rate_per_second
+    db_override.burst = burst
+    db_override.updated_at = datetime.utcnow()
+    return db_override
@@ -0,0 +1,79 @@
+"""Incrementally maintained per-reseller rollup (reseller_stats).
+
+Writers adjust the counters with relative UPDATEs inside their own
+transaction. The definitions match the aggregates over business_users, so a
+missing row can always be rebuilt from the source tables (backfill).
+"""
+from datetime import datetime
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+import models
+
+def create_stats(db: Session, reseller_id: str):
+    db_stats = models.ResellerStats(reseller_id=reseller_id)
+    db.add(db_stats)
+    return db_stats
+
+def _adjust(db: Session, where, **deltas):
+    Stats = models.ResellerStats
+    values = {name: getattr(Stats, name) + delta for name, delta in deltas.items()}
+    values["updated_at"] = datetime.utcnow()
+    db.execute(update(Stats).where(where).values(**values).execution_options(synchronize_session=False))
+
+def add_business_users(db: Session, reseller_id: str, count: int = 1, allocated: int = 0, used: int = 0):
+    _adjust(db, models.ResellerStats.reseller_id == reseller_id,
+            business_user_count=count, credits_distributed_micro=allocated, credits_used_micro=used)
+
+def add_distributed(db: Session, reseller_id: str, amount: int):
+    _adjust(db, models.ResellerStats.reseller_id == reseller_id, credits_distributed_micro=amount)
+
+def add_usage(db: Session, business_user_id: str, amount: int):
+    # Resolves the parent reseller in the same statement; amount < 0 for refunds
+    parent = (
+        select(models.BusinessUser.parent_reseller_id)
+        .where(models.BusinessUser.user_id == business_user_id)
+        .scalar_subquery()
+    )
+    _adjust(db, models.ResellerStats.reseller_id == parent, credits_used_micro=amount)
+
+def get_stats(db: Session, reseller_id: str):
+    return db.query(models.ResellerStats).filter(models.ResellerStats.reseller_id == reseller_id).first()
+
+def backfill(db: Session, reseller_id: str):
+    """Build the rollup row from business_users (resellers created before the rollup existed).
+
+    Concurrent first reads may both get here: the insert skips an existing row,
+    and the row that won is returned.
+    """
+    BusinessUser = models.BusinessUser
+    count, allocated, used = db.query(
+        func.count(BusinessUser.user_id),
+        func.coalesce(func.sum(BusinessUser.credits_allocated_micro), 0),
+        func.coalesce(func.sum(BusinessUser.credits_used_micro), 0),
+    ).filter(BusinessUser.parent_reseller_id == reseller_id).one()
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    db.execute(
+        dialect.insert(models.ResellerStats)
+        .values(reseller_id=reseller_id, business_user_count=count, credits_distributed_micro=allocated, credits_used_micro=used)
+        .on_conflict_do_nothing(index_elements=["reseller_id"])
+    )
+    return get_stats(db, reseller_id)
+
+def get_business_user_stats(db: Session, reseller_id: str, skip: int = 0, limit: int = 100):
+    # Only the columns the dashboard shows, walked via ix_business_users_reseller
+    BusinessUser = models.BusinessUser
+    return (
+        db.query(
+            BusinessUser.user_id,
+            BusinessUser.name,
+            BusinessUser.credits_allocated_micro,
+            BusinessUser.credits_used_micro,
+            BusinessUser.credits_remaining_micro,
+        )
+        .filter(BusinessUser.parent_reseller_id == reseller_id)
+        .order_by(BusinessUser.user_id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
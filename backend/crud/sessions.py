@@ -0,0 +1,25 @@
+from datetime import datetime
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import models
+
+async def get_session_by_token(db: AsyncSession, token: str):
+    result = await db.execute(select(models.DeviceSession).where(models.DeviceSession.session_token == token))
+    return result.scalars().first()
+
+def delete_dead_sessions(db: Session, now: datetime, limit: int) -> int:
+    """Delete up to `limit` expired or invalidated sessions. Caller commits."""
+    # One indexed probe per condition; an OR across both would scan the table
+    deleted = 0
+    for condition in (models.DeviceSession.expires_at < now, models.DeviceSession.is_valid == "false"):
+        if deleted >= limit:
+            break
+        ids = select(models.DeviceSession.session_id).where(condition).limit(limit - deleted).scalar_subquery()
+        result = db.execute(
+            delete(models.DeviceSession)
+            .where(models.DeviceSession.session_id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        deleted += result.rowcount
+    return deleted
@@ -0,0 +1,67 @@
+from datetime import datetime
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+import models
+
+def get_business_user(db: Session, user_id: str):
+    return db.query(models.BusinessUser).filter(models.BusinessUser.user_id == user_id).first()
+
+def get_template(db: Session, template_id: str):
+    return db.get(models.MessageTemplate, template_id)
+
+def get_template_by_name(db: Session, user_id: str, name: str):
+    return db.execute(
+        select(models.MessageTemplate).where(models.MessageTemplate.user_id == user_id, models.MessageTemplate.name == name)
+    ).scalars().first()
+
+def list_templates(db: Session, user_id: str, skip: int = 0, limit: int = 100):
+    return db.execute(
+        select(models.MessageTemplate)
+        .where(models.MessageTemplate.user_id == user_id)
+        .order_by(models.MessageTemplate.name)
+        .offset(skip).limit(limit)
+    ).scalars().all()
+
+def create_template(db: Session, user_id: str, name: str, body: str):
+    now = datetime.utcnow()
+    db_template = models.MessageTemplate(user_id=user_id, name=name, body=body, version=1, created_at=now, updated_at=now)
+    db.add(db_template)
+    return db_template
+
+def update_body(db: Session, template_id: str, body: str):
+    # version is bumped in SQL so concurrent edits each get their own number
+    Template = models.MessageTemplate
+    db.execute(
+        update(Template)
+        .where(Template.template_id == template_id)
+        .values(body=body, version=Template.version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+def delete_template(db: Session, template_id: str):
+    db.execute(
+        delete(models.MessageTemplate)
+        .where(models.MessageTemplate.template_id == template_id)
+        .execution_options(synchronize_session=False)
+    )
+
+def versions(db: Session, user_id: str, names) -> dict:
+    """{name: (template_id, version)} for the user's templates among `names`, in one query.
+
+    The id is part of the answer because a name deleted and created again starts
+    over at version 1 under a new template_id.
+    """
+    Template = models.MessageTemplate
+    rows = db.execute(
+        select(Template.name, Template.template_id, Template.version)
+        .where(Template.user_id == user_id, Template.name.in_(list(names)))
+    ).all()
+    return {name: (template_id, version) for name, template_id, version in rows}
+
+def bodies(db: Session, user_id: str, names) -> list:
+    """(name, template_id, version, body) for the user's templates among `names`."""
+    Template = models.MessageTemplate
+    return db.execute(
+        select(Template.name, Template.template_id, Template.version, Template.body)
+        .where(Template.user_id == user_id, Template.name.in_(list(names)))
+    ).all()
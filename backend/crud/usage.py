@@ -0,0 +1,39 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+import models
+
+_KEY = ["scope", "owner_id", "granularity", "bucket_start", "mode", "message_type"]
+
+def get_parent_reseller_id(db: Session, user_id: str):
+    return db.query(models.BusinessUser.parent_reseller_id).filter(models.BusinessUser.user_id == user_id).scalar()
+
+def upsert_aggregates(db: Session, rows: list):
+    """Add counts into usage_aggregates with INSERT ... ON CONFLICT DO UPDATE (one executemany)."""
+    if not rows:
+        return
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    table = models.UsageAggregate.__table__
+    stmt = dialect.insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=_KEY,
+        set_={
+            "message_count": table.c.message_count + stmt.excluded.message_count,
+            "credits_deducted_micro": table.c.credits_deducted_micro + stmt.excluded.credits_deducted_micro,
+        },
+    )
+    db.execute(stmt, rows)
+
+def get_aggregates(db: Session, scope: str, owner_id: str, granularity: str, start, end):
+    UsageAggregate = models.UsageAggregate
+    return (
+        db.query(UsageAggregate)
+        .filter(
+            UsageAggregate.scope == scope,
+            UsageAggregate.owner_id == owner_id,
+            UsageAggregate.granularity == granularity,
+            UsageAggregate.bucket_start >= start,
+            UsageAggregate.bucket_start < end,
+        )
+        .order_by(UsageAggregate.bucket_start)
+        .all()
+    )
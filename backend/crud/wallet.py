@@ -0,0 +1,111 @@
+"""Atomic wallet operations.
+
+Every balance change is one UPDATE evaluated by the database:
+
+    UPDATE ... SET balance = balance - :cost WHERE id = :id AND balance >= :cost
+
+Concurrent writers never read-modify-write in Python, so updates cannot be
+lost. RETURNING hands back the new balance; no row back means zero rows
+matched (unknown wallet or insufficient balance). Amounts are micro-credits.
+"""
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+import models
+
+def _returning_one(db: Session, stmt, column):
+    return db.execute(stmt.returning(column).execution_options(synchronize_session=False)).scalar()
+
+def debit_business_user(db: Session, user_id: str, amount: int):
+    """Spend credits. Returns the new remaining balance, or None if it was not covered."""
+    BusinessUser = models.BusinessUser
+    stmt = (
+        update(BusinessUser)
+        .where(BusinessUser.user_id == user_id, BusinessUser.credits_remaining_micro >= amount)
+        .values(
+            credits_remaining_micro=BusinessUser.credits_remaining_micro - amount,
+            credits_used_micro=BusinessUser.credits_used_micro + amount,
+        )
+    )
+    return _returning_one(db, stmt, BusinessUser.credits_remaining_micro)
+
+def refund_business_user(db: Session, user_id: str, amount: int):
+    """Undo a debit (e.g. the gateway rejected the message). Returns the new balance."""
+    BusinessUser = models.BusinessUser
+    stmt = (
+        update(BusinessUser)
+        .where(BusinessUser.user_id == user_id)
+        .values(
+            credits_remaining_micro=BusinessUser.credits_remaining_micro + amount,
+            credits_used_micro=BusinessUser.credits_used_micro - amount,
+        )
+    )
+    return _returning_one(db, stmt, BusinessUser.credits_remaining_micro)
+
+def allocate_to_business_user(db: Session, user_id: str, amount: int):
+    """Top up a business user's wallet. Returns the new remaining balance."""
+    BusinessUser = models.BusinessUser
+    stmt = (
+        update(BusinessUser)
+        .where(BusinessUser.user_id == user_id)
+        .values(
+            credits_allocated_micro=BusinessUser.credits_allocated_micro + amount,
+            credits_remaining_micro=BusinessUser.credits_remaining_micro + amount,
+        )
+    )
+    return _returning_one(db, stmt, BusinessUser.credits_remaining_micro)
+
+def allocate_to_business_users(db: Session, amounts: dict):
+    """Top up many wallets ({user_id: amount}) with one executemany UPDATE."""
+    if not amounts:
+        return
+    # Core table statement: the ORM's bulk-by-primary-key path can't express relative SETs
+    table = models.BusinessUser.__table__
+    stmt = (
+        update(table)
+        .where(table.c.user_id == bindparam("b_user_id"))
+        .values(
+            credits_allocated_micro=table.c.credits_allocated_micro + bindparam("b_amount"),
+            credits_remaining_micro=table.c.credits_remaining_micro + bindparam("b_amount"),
+        )
+    )
+    db.execute(stmt, [{"b_user_id": user_id, "b_amount": amount} for user_id, amount in amounts.items()])
+
+def debit_reseller(db: Session, reseller_id: str, amount: int):
+    """Move credits out of a reseller wallet. Returns the new available balance, or None."""
+    MasterUser = models.MasterUser
+    stmt = (
+        update(MasterUser)
+        .where(MasterUser.user_id == reseller_id, MasterUser.available_credits_micro >= amount)
+        .values(
+            available_credits_micro=MasterUser.available_credits_micro - amount,
+            used_credits_micro=MasterUser.used_credits_micro + amount,
+        )
+    )
+    return _returning_one(db, stmt, MasterUser.available_credits_micro)
+
+def hold_business_user(db: Session, user_id: str, amount: int):
+    """Reserve credits for a CreditHold (remaining -> held). Returns the new remaining balance, or None."""
+    BusinessUser = models.BusinessUser
+    stmt = (
+        update(BusinessUser)
+        .where(BusinessUser.user_id == user_id, BusinessUser.credits_remaining_micro >= amount)
+        .values(
+            credits_remaining_micro=BusinessUser.credits_remaining_micro - amount,
+            credits_held_micro=BusinessUser.credits_held_micro + amount,
+        )
+    )
+    return _returning_one(db, stmt, BusinessUser.credits_remaining_micro)
+
+def settle_business_user_hold(db: Session, user_id: str, consumed: int, released: int = 0):
+    """Book held credits: consumed moves held -> used, released moves held -> remaining."""
+    BusinessUser = models.BusinessUser
+    stmt = (
+        update(BusinessUser)
+        .where(BusinessUser.user_id == user_id)
+        .values(
+            credits_held_micro=BusinessUser.credits_held_micro - consumed - released,
+            credits_used_micro=BusinessUser.credits_used_micro + consumed,
+            credits_remaining_micro=BusinessUser.credits_remaining_micro + released,
+        )
+    )
+    return _returning_one(db, stmt, BusinessUser.credits_remaining_micro)
@@ -1,27 +1,99 @@
+from contextlib import asynccontextmanager
+import os
 from datetime import datetime
 import time
 import secrets
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import APIRouter, FastAPI, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 
-import models, schemas, database
+import metrics, models, profiling, schemas, database
+from migrations import run_migrations
+from pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, keyset_paginate
+from responses import FastJSONResponse
+from crud import projections
+from crud import reseller_stats as crud_reseller_stats
+from services.messages import MessageService
+from services.dispatch import DISPATCH_LEASE_TIMEOUT, dispatcher
+from services.rate_limit import rate_limiter
+from services.holds import CreditHoldService, HOLD_SETTLE_INTERVAL
+from services.background import PeriodicTask
+from services.usage import usage_summary
+from services.session_cache import check_session, session_cache
+from services.sessions import SESSION_SWEEP_INTERVAL, purge_dead_sessions
+from services.archive import ARCHIVE_INTERVAL, ARCHIVE_RETENTION_MONTHS, archive_partitions
+from services.message_bodies import body_store
+from services.templates import template_cache
+from services.idempotency import IDEMPOTENCY_PURGE_INTERVAL, REPLAYED_HEADER, idempotency_store, purge_expired_keys
+from routers import credits, rate_limits, export, imports, templates
+
+# Apply schema migrations in the lifespan (a version check when current); set to
+# false when deploys run `python migrations.py` once instead
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+def settle_credit_holds():
+    db = database.SessionLocal()
+    try:
+        return CreditHoldService(db).settle_pending()
+    finally:
+        db.close()
+
+# Books campaign hold consumption to the wallets in batches
+hold_settler = PeriodicTask("hold-settler", HOLD_SETTLE_INTERVAL, settle_credit_holds)
+
+def sweep_sessions():
+    return purge_dead_sessions(database.SessionLocal)
 
-# Create tables
-models.Base.metadata.create_all(bind=database.engine)
+# Deletes expired/revoked device sessions so the table does not grow unbounded
+session_sweeper = PeriodicTask("session-sweeper", SESSION_SWEEP_INTERVAL, sweep_sessions)
 
-app = FastAPI()
+def purge_idempotency_keys():
+    return purge_expired_keys(database.SessionLocal)
 
-# CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Deletes Idempotency-Key rows past their TTL
+idempotency_purger = PeriodicTask("idempotency-purger", IDEMPOTENCY_PURGE_INTERVAL, purge_idempotency_keys)
+
+def archive_old_partitions():
+    return archive_partitions(database.SessionLocal, ARCHIVE_RETENTION_MONTHS)
+
+# Moves months past the retention window out of messages/usage_logs into gzip NDJSON files
+# (opt-in: runs only when ARCHIVE_RETENTION_MONTHS is set above 0)
+archiver = PeriodicTask("archiver", ARCHIVE_INTERVAL, archive_old_partitions)
+
+# Requeues messages left "sending" by a dispatcher process that died mid-batch
+dispatch_reaper = PeriodicTask("dispatch-reaper", DISPATCH_LEASE_TIMEOUT, dispatcher.requeue_expired)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MIGRATE_ON_STARTUP:
+        run_migrations(database.engine)
+    db = database.SessionLocal()
+    try:
+        rate_limiter.load_overrides(db)
+    finally:
+        db.close()
+    dispatcher.start()
+    dispatch_reaper.start()
+    hold_settler.start()
+    session_sweeper.start()
+    idempotency_purger.start()
+    if ARCHIVE_RETENTION_MONTHS > 0:
+        archiver.start()
+    yield
+    archiver.stop()
+    idempotency_purger.stop()
+    session_sweeper.stop()
+    dispatch_reaper.stop()
+    dispatcher.stop()
+    hold_settler.stop()
+    hold_settler.run_once()
+
+# Core routes; create_app() mounts them with the feature routers
+router = APIRouter()
 
 def get_db():
     db = database.SessionLocal()
@@ -30,6 +102,14 @@ def get_db():
     finally:
         db.close()
 
+# Read-only endpoints: served by the read engine (DATABASE_READ_URL, a replica if configured)
+def get_read_db():
+    db = database.ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 def map_db_to_schema(db_user: models.MasterUser):
     return {
         "user_id": db_user.user_id,
@@ -63,7 +143,7 @@ def map_db_to_schema(db_user: models.MasterUser):
         }
     }
 
-@app.post("/resellers", response_model=schemas.ResellerRead)
+@router.post("/resellers", response_model=schemas.ResellerRead)
 def create_reseller(reseller: schemas.ResellerCreate, db: Session = Depends(get_db)):
     # Check existing
     if db.query(models.MasterUser).filter(models.MasterUser.email == reseller.profile.email).first():
@@ -95,23 +175,25 @@ def create_reseller(reseller: schemas.ResellerCreate, db: Session = Depends(get_
         # Bank
         bank_name=reseller.bank.bank_name,
         # Wallet
-        total_credits=reseller.wallet.total_credits if reseller.wallet else 0.0,
-        available_credits=reseller.wallet.available_credits if reseller.wallet else 0.0,
-        used_credits=reseller.wallet.used_credits if reseller.wallet else 0.0,
+        total_credits_micro=models.to_micro(reseller.wallet.total_credits) if reseller.wallet else 0,
+        available_credits_micro=models.to_micro(reseller.wallet.available_credits) if reseller.wallet else 0,
+        used_credits_micro=models.to_micro(reseller.wallet.used_credits) if reseller.wallet else 0,
     )
     db.add(db_user)
+    db.flush()
+    crud_reseller_stats.create_stats(db, db_user.user_id)
     db.commit()
     db.refresh(db_user)
     
     return map_db_to_schema(db_user)
 
-@app.get("/resellers", response_model=List[schemas.ResellerRead])
-def read_resellers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = db.query(models.MasterUser).offset(skip).limit(limit).all()
-    return [map_db_to_schema(user) for user in users]
+@router.get("/resellers", response_model=List[schemas.ResellerRead])
+def read_resellers(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
+    # Column projection + pre-shaped dicts; FastJSONResponse skips re-validation
+    return FastJSONResponse(projections.list_resellers(db, skip, limit))
 
-@app.get("/resellers/{user_id}", response_model=schemas.ResellerRead)
-def read_reseller(user_id: str, db: Session = Depends(get_db)):
+@router.get("/resellers/{user_id}", response_model=schemas.ResellerRead)
+def read_reseller(user_id: str, db: Session = Depends(get_read_db)):
     user = db.query(models.MasterUser).filter(models.MasterUser.user_id == user_id).first()
     if user is None:
         raise HTTPException(status_code=404, detail="Reseller not found")
@@ -149,20 +231,24 @@ def map_db_business_to_schema(db_user: models.BusinessUser):
             "credits_allocated": db_user.credits_allocated,
             "credits_used": db_user.credits_used,
             "credits_remaining": db_user.credits_remaining,
+            "credits_held": db_user.credits_held,
         }
     }
 
-@app.post("/business-users", response_model=schemas.BusinessUserRead)
+@router.post("/business-users", response_model=schemas.BusinessUserRead)
 def create_business_user(user: schemas.BusinessUserCreate, db: Session = Depends(get_db)):
     # Validate Parent Reseller
     reseller = db.query(models.MasterUser).filter(models.MasterUser.user_id == user.parent_reseller_id).first()
     if not reseller:
         raise HTTPException(status_code=404, detail="Parent Reseller not found")
 
-    # Check duplications
-    if db.query(models.BusinessUser).filter(models.BusinessUser.email == user.profile.email).first():
+    # Check duplications: one query over both unique columns
+    taken = db.query(models.BusinessUser.email, models.BusinessUser.username).filter(
+        or_(models.BusinessUser.email == user.profile.email, models.BusinessUser.username == user.profile.username)
+    ).all()
+    if any(email == user.profile.email for email, _ in taken):
         raise HTTPException(status_code=400, detail="Email already registered")
-    if db.query(models.BusinessUser).filter(models.BusinessUser.username == user.profile.username).first():
+    if taken:
         raise HTTPException(status_code=400, detail="Username already taken")
 
     hashed_pwd = "hashed_" + user.profile.password
@@ -188,36 +274,30 @@ def create_business_user(user: schemas.BusinessUserCreate, db: Session = Depends
         pincode=user.address.pincode,
         country=user.address.country,
         # Wallet
-        credits_allocated=user.wallet.credits_allocated if user.wallet else 0.0,
-        credits_used=user.wallet.credits_used if user.wallet else 0.0,
-        credits_remaining=user.wallet.credits_remaining if user.wallet else 0.0,
+        credits_allocated_micro=models.to_micro(user.wallet.credits_allocated) if user.wallet else 0,
+        credits_used_micro=models.to_micro(user.wallet.credits_used) if user.wallet else 0,
+        credits_remaining_micro=models.to_micro(user.wallet.credits_remaining) if user.wallet else 0,
     )
     db.add(db_user)
+    crud_reseller_stats.add_business_users(db, user.parent_reseller_id, 1, db_user.credits_allocated_micro, db_user.credits_used_micro)
     db.commit()
     db.refresh(db_user)
     
     return map_db_business_to_schema(db_user)
 
-@app.get("/business-users", response_model=List[schemas.BusinessUserRead])
-def read_business_users(reseller_id: str = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    query = db.query(models.BusinessUser)
-    if reseller_id:
-        query = query.filter(models.BusinessUser.parent_reseller_id == reseller_id)
-    
-    users = query.offset(skip).limit(limit).all()
-    return [map_db_business_to_schema(user) for user in users]
+@router.get("/business-users", response_model=List[schemas.BusinessUserRead])
+def read_business_users(reseller_id: str = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
+    return FastJSONResponse(projections.list_business_users(db, reseller_id, skip, limit))
 
-@app.get("/business-users/{user_id}", response_model=schemas.BusinessUserRead)
-def read_business_user(user_id: str, db: Session = Depends(get_db)):
+@router.get("/business-users/{user_id}", response_model=schemas.BusinessUserRead)
+def read_business_user(user_id: str, db: Session = Depends(get_read_db)):
     user = db.query(models.BusinessUser).filter(models.BusinessUser.user_id == user_id).first()
     if user is None:
         raise HTTPException(status_code=404, detail="Business User not found")
     return map_db_business_to_schema(user)
 
 # --- Credit Distribution Routes ---
-# REFACTORED: Moved to routers/credits.py
-from routers import credits
-app.include_router(credits.router)
+# REFACTORED: Moved to routers/credits.py (mounted in create_app)
 
 # --- Message Routes ---
 
@@ -236,68 +316,41 @@ def map_db_message_to_schema(db_msg: models.Message):
         "sent_at": db_msg.sent_at
     }
 
-@app.post("/messages/send", response_model=schemas.MessageRead)
-def send_message(msg: schemas.MessageCreate, db: Session = Depends(get_db)):
-    # 1. Get User to check credits
-    user = db.query(models.BusinessUser).filter(models.BusinessUser.user_id == msg.user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="Business User not found")
-
-    # 2. Determine Cost (Mock Logic)
-    # Official API typically costs money, Unofficial might be a flat fee or subscription.
-    # We will assume: Official = 1 credit, Unofficial = 0.5 credits
-    cost = 1.0 if msg.mode == "official" else 0.5
-    
-    if user.credits_remaining < cost:
-         raise HTTPException(status_code=400, detail=f"Insufficient credits. Required: {cost}, Available: {user.credits_remaining}")
-
-    # 3. Simulate Send (Mock)
-    # In production, this would call WhatsApp API or Unofficial Gateway
-    
-    # 4. Deduct Credits Atomic
-    try:
-        user.credits_remaining -= cost
-        user.credits_used += cost # Track total usage
-
-        # 5. Record Message
-        db_msg = models.Message(
-            user_id=msg.user_id,
-            mode=msg.mode,
-            sender_number=msg.sender_number,
-            receiver_number=msg.receiver_number,
-            message_type=msg.message_type,
-            template_name=msg.template_name,
-            message_body=msg.message_body,
-            status="sent",
-            credits_used=cost
-        )
-        db.add(db_msg)
-        
-        # 6. Usage Log
-        db_log = models.UsageLog(
-            user_id=msg.user_id,
-            message_id=db_msg.message_id,
-            credits_deducted=cost,
-            balance_after=user.credits_remaining
+@router.post("/messages/send", response_model=schemas.MessageRead)
+def send_message(msg: schemas.MessageCreate, idempotency_key: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    service = MessageService(db)
+    if idempotency_key is None:
+        result = map_db_message_to_schema(service.send(msg))
+    else:
+        # A retry with the same Idempotency-Key gets the first response; the wallet is debited once
+        result = idempotency_store.run(
+            db, "POST /messages/send", idempotency_key, msg,
+            lambda: map_db_message_to_schema(service.send(msg, commit=False))
         )
-        db.add(db_log)
-
-        db.commit()
-        db.refresh(db_msg)
-        return map_db_message_to_schema(db_msg)
-
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/messages", response_model=List[schemas.MessageRead])
-def read_messages(user_id: str = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    query = db.query(models.Message)
-    if user_id:
-        query = query.filter(models.Message.user_id == user_id)
-    
-    msgs = query.order_by(models.Message.sent_at.desc()).offset(skip).limit(limit).all()
-    return [map_db_message_to_schema(m) for m in msgs]
+    dispatcher.notify()
+    return result
+
+@router.post("/messages/send-batch", response_model=schemas.MessageBatchRead)
+def send_message_batch(batch: schemas.MessageBatchCreate, db: Session = Depends(get_db)):
+    service = MessageService(db)
+    result = service.send_batch(batch)
+    dispatcher.notify()
+    return result
+
+@router.get("/messages", response_model=List[schemas.MessageRead])
+def read_messages(user_id: str = None, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, db: Session = Depends(get_read_db)):
+    msgs, next_cursor = projections.list_messages(db, user_id, skip, limit, cursor)
+    # Headers go on the returned response; an injected Response is not merged into it
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return FastJSONResponse(msgs, headers=headers)
+
+@router.get("/messages/{message_id}", response_model=schemas.MessageRead)
+def read_message(message_id: str, db: Session = Depends(get_read_db)):
+    # Lets clients poll a queued message until it is sent or failed
+    db_msg = db.query(models.Message).filter(models.Message.message_id == message_id).first()
+    if db_msg is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    return map_db_message_to_schema(db_msg)
 
 # --- Linked Device Routes ---
 
@@ -312,7 +365,7 @@ def map_db_device_to_schema(db_dev: models.LinkedDevice):
         "last_active": db_dev.last_active
     }
 
-@app.post("/devices/connect", response_model=schemas.DeviceRead)
+@router.post("/devices/connect", response_model=schemas.DeviceRead)
 def connect_device(device: schemas.DeviceCreate, db: Session = Depends(get_db)):
     # 1. Simulate Connection delay/check (mock)
     # time.sleep(1) 
@@ -333,8 +386,8 @@ def connect_device(device: schemas.DeviceCreate, db: Session = Depends(get_db)):
     
     return map_db_device_to_schema(db_device)
 
-@app.get("/devices", response_model=List[schemas.DeviceRead])
-def read_devices(user_id: str = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/devices", response_model=List[schemas.DeviceRead])
+def read_devices(user_id: str = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     query = db.query(models.LinkedDevice)
     if user_id:
         query = query.filter(models.LinkedDevice.user_id == user_id)
@@ -342,14 +395,19 @@ def read_devices(user_id: str = None, skip: int = 0, limit: int = 100, db: Sessi
     devices = query.order_by(models.LinkedDevice.last_active.desc()).offset(skip).limit(limit).all()
     return [map_db_device_to_schema(d) for d in devices]
 
-@app.delete("/devices/{device_id}")
+@router.delete("/devices/{device_id}")
 def disconnect_device(device_id: str, db: Session = Depends(get_db)):
     device = db.query(models.LinkedDevice).filter(models.LinkedDevice.device_id == device_id).first()
     if not device:
          raise HTTPException(status_code=404, detail="Device not found")
             
+    # Revoke the device's sessions so tokens stop validating once it is gone
+    db.query(models.DeviceSession).filter(models.DeviceSession.device_id == device_id).update(
+        {models.DeviceSession.is_valid: "false"}, synchronize_session=False
+    )
     db.delete(device)
     db.commit()
+    session_cache.invalidate_device(device_id)
     return {"message": "Device disconnected successfully"}
 
 # --- Session Routes ---
@@ -366,7 +424,7 @@ def map_db_session_to_schema(db_sess: models.DeviceSession):
         "expires_at": db_sess.expires_at
     }
 
-@app.post("/sessions", response_model=schemas.SessionRead)
+@router.post("/sessions", response_model=schemas.SessionRead)
 def create_session(session_data: schemas.SessionCreate, db: Session = Depends(get_db)):
     # 1. Verify Device Exists
     device = db.query(models.LinkedDevice).filter(models.LinkedDevice.device_id == session_data.device_id).first()
@@ -387,22 +445,57 @@ def create_session(session_data: schemas.SessionCreate, db: Session = Depends(ge
     db.add(db_session)
     db.commit()
     db.refresh(db_session)
+    session_cache.invalidate_token(token)
     
     return map_db_session_to_schema(db_session)
 
-@app.get("/sessions/validate")
-def validate_session(token: str, db: Session = Depends(get_db)):
-    session = db.query(models.DeviceSession).filter(models.DeviceSession.session_token == token).first()
-    if not session:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    if session.is_valid != "true":
-         raise HTTPException(status_code=401, detail="Session invalid")
-    
-    if session.expires_at < datetime.utcnow():
-        raise HTTPException(status_code=401, detail="Session expired")
-        
-    return {"status": "valid", "device_id": session.device_id}
+@router.get("/sessions/validate")
+def validate_session(token: str, db: Session = Depends(get_read_db)):
+    entry = session_cache.get(token)
+    if entry is None:
+        # Taken before the read: a revocation committed meanwhile keeps this result out of the cache
+        generation = session_cache.begin()
+        session = db.query(models.DeviceSession).filter(models.DeviceSession.session_token == token).first()
+        if not session and database.READ_REPLICA:
+            # A token created moments ago may not have replicated yet
+            with database.SessionLocal() as write_db:
+                session = write_db.query(models.DeviceSession).filter(models.DeviceSession.session_token == token).first()
+        if not session:
+            session_cache.put_negative(token, generation)
+            raise HTTPException(status_code=401, detail="Invalid token")
+        entry = session_cache.put(token, session.device_id, session.is_valid, session.expires_at, generation)
+    return check_session(entry)
+
+@router.get("/sessions/cache/stats")
+def read_session_cache_stats():
+    return session_cache.stats()
+
+@router.get("/sessions/sweeper/stats")
+def read_session_sweeper_stats():
+    return session_sweeper.stats()
+
+@router.get("/messages/bodies/stats")
+def read_message_body_stats():
+    return body_store.stats()
+
+@router.get("/templates/cache/stats")
+def read_template_cache_stats():
+    return template_cache.stats()
+
+@router.get("/idempotency/stats")
+def read_idempotency_stats():
+    return {**idempotency_store.stats(), "purger": idempotency_purger.stats()}
+
+@router.get("/archive/stats")
+def read_archiver_stats():
+    return archiver.stats()
+
+# --- Metrics ---
+
+@router.get("/metrics", include_in_schema=False)
+def read_metrics():
+    # Prometheus text exposition format; see metrics.py for what is collected
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 # --- Usage Log Routes ---
 
@@ -416,53 +509,73 @@ def map_db_log_to_schema(db_log: models.UsageLog):
         "timestamp": db_log.timestamp
     }
 
-@app.get("/usage/logs", response_model=List[schemas.UsageLogRead])
-def read_usage_logs(user_id: str = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/usage/logs", response_model=List[schemas.UsageLogRead])
+def read_usage_logs(response: Response, user_id: str = None, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, db: Session = Depends(get_read_db)):
     query = db.query(models.UsageLog)
     if user_id:
         query = query.filter(models.UsageLog.user_id == user_id)
     
-    logs = query.order_by(models.UsageLog.timestamp.desc()).offset(skip).limit(limit).all()
+    logs, next_cursor = keyset_paginate(query, models.UsageLog.timestamp, models.UsageLog.usage_id, skip, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return [map_db_log_to_schema(l) for l in logs]
 
+@router.get("/usage/summary", response_model=schemas.UsageSummary)
+def read_usage_summary(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    granularity: str = "day",
+    user_id: str = None,
+    reseller_id: str = None,
+    db: Session = Depends(get_read_db)
+):
+    # Answered from usage_aggregates (hour/day buckets), not by scanning usage_logs
+    return usage_summary(db, user_id, reseller_id, start, end, granularity)
+
 # --- Analytics Routes ---
 
-@app.get("/analytics/reseller/{reseller_id}", response_model=schemas.ResellerAnalytics)
-def get_reseller_analytics(reseller_id: str, db: Session = Depends(get_db)):
+@router.get("/analytics/reseller/{reseller_id}", response_model=schemas.ResellerAnalytics)
+def get_reseller_analytics(reseller_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     # 1. Get Reseller
     reseller = db.query(models.MasterUser).filter(models.MasterUser.user_id == reseller_id).first()
     if not reseller:
         raise HTTPException(status_code=404, detail="Reseller not found")
 
-    # 2. Get Business Users
-    sub_users = db.query(models.BusinessUser).filter(models.BusinessUser.parent_reseller_id == reseller_id).all()
-
-    # 3. Calculate Stats
-    total_distributed = sum(user.credits_allocated for user in sub_users)
-    
-    # Map sub-user stats
-    user_stats = []
-    for user in sub_users:
-        user_stats.append({
-            "user_id": user.user_id,
-            "name": user.name,
-            "credits_allocated": user.credits_allocated,
-            "credits_used": user.credits_used,
-            "credits_remaining": user.credits_remaining
-        })
+    # 2. Totals come from the reseller_stats rollup (one row)
+    stats = crud_reseller_stats.get_stats(db, reseller_id)
+    if stats is None:
+        # Missing rollup row (data from before reseller_stats): build it on the primary
+        with database.SessionLocal() as write_db:
+            stats = crud_reseller_stats.backfill(write_db, reseller_id)
+            write_db.commit()
+            write_db.refresh(stats)
+            write_db.expunge(stats)
+
+    # 3. One page of per-user stats
+    user_stats = [
+        {
+            "user_id": row.user_id,
+            "name": row.name,
+            "credits_allocated": models.from_micro(row.credits_allocated_micro),
+            "credits_used": models.from_micro(row.credits_used_micro),
+            "credits_remaining": models.from_micro(row.credits_remaining_micro)
+        }
+        for row in crud_reseller_stats.get_business_user_stats(db, reseller_id, skip, limit)
+    ]
 
     return {
         "reseller_id": reseller.user_id,
         "total_credits_purchased": reseller.total_credits, # Total loaded into reseller wallet
-        "total_credits_distributed": total_distributed,
+        "total_credits_distributed": models.from_micro(stats.credits_distributed_micro),
+        "total_credits_used": models.from_micro(stats.credits_used_micro),
         "remaining_credits": reseller.available_credits,
-        "active_business_users": len(sub_users),
+        "active_business_users": stats.business_user_count,
         "business_user_stats": user_stats
     }
 
 # --- WhatsApp Official Config Routes ---
 
-@app.post("/whatsapp/official/config", response_model=schemas.WhatsAppConfigRead)
+@router.post("/whatsapp/official/config", response_model=schemas.WhatsAppConfigRead)
 def update_whatsapp_config(config: schemas.WhatsAppConfigCreate, db: Session = Depends(get_db)):
     # 1. Check if user exists
     user = db.query(models.BusinessUser).filter(models.BusinessUser.user_id == config.user_id).first()
@@ -508,8 +621,8 @@ def update_whatsapp_config(config: schemas.WhatsAppConfigCreate, db: Session = D
         "updated_at": db_config.updated_at
     }
 
-@app.get("/whatsapp/official/{user_id}", response_model=schemas.WhatsAppConfigRead)
-def get_whatsapp_config(user_id: str, db: Session = Depends(get_db)):
+@router.get("/whatsapp/official/{user_id}", response_model=schemas.WhatsAppConfigRead)
+def get_whatsapp_config(user_id: str, db: Session = Depends(get_read_db)):
     db_config = db.query(models.WhatsAppOfficialConfig).filter(models.WhatsAppOfficialConfig.user_id == user_id).first()
     if not db_config:
         raise HTTPException(status_code=404, detail="Configuration not found")
@@ -522,3 +635,44 @@ def get_whatsapp_config(user_id: str, db: Session = Depends(get_db)):
         "template_status": db_config.template_status,
         "updated_at": db_config.updated_at
     }
+
+# --- App Factory ---
+
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+
+    # Per-route latency and SQL counts for /metrics
+    if metrics.METRICS_ENABLED:
+        app.add_middleware(metrics.MetricsMiddleware)
+    # Development: per-request SQL log, slow-query EXPLAIN, N+1 warnings (profiling.py)
+    if profiling.PROFILE_SQL:
+        app.add_middleware(profiling.ProfilingMiddleware)
+
+    # CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, profiling.QUERY_COUNT_HEADER, REPLAYED_HEADER],
+    )
+
+    # Async hot routes take precedence over the sync handlers when enabled
+    if database.ASYNC_ROUTES:
+        from routers import async_api
+        app.include_router(async_api.router)
+
+    app.include_router(router)
+    app.include_router(credits.router)
+    # Per-sender send rate (token buckets applied by the dispatcher)
+    app.include_router(rate_limits.router)
+    # Bulk data export (streamed, constant memory)
+    app.include_router(export.router)
+    # CSV onboarding of business users (chunked, set-based duplicate checks)
+    app.include_router(imports.router)
+    # Stored message templates, rendered per recipient at send time
+    app.include_router(templates.router)
+    return app
+
+app = create_app()
@@ -0,0 +1,230 @@
+"""Prometheus metrics, rendered at /metrics in the text exposition format.
+
+Per route: request count and latency, SQL statements and DB time per request.
+Per engine: statement count/time and pool checkout wait. Business counters:
+messages by mode/status and credits deducted/refunded by mode.
+
+Kept dependency-free and cheap enough to leave on: a metric update is a lock,
+a bisect and two additions; per-request SQL totals ride on a ContextVar that the
+cursor hooks bump, so nothing is looked up per statement.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+# Request middleware + SQL/pool hooks; the business counters and /metrics stay on either way
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, [list(s[0]), s[1], s[2]]) for labels, s in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = 'le="' + (bound if bound == "+Inf" else _number(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+# --- Metrics ---
+
+http_requests = Counter("http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency by route template.",
+                         LATENCY_BUCKETS, ("method", "route"))
+request_statements = Histogram("http_request_db_statements", "SQL statements issued per request.",
+                               STATEMENT_BUCKETS, ("method", "route"))
+request_db_time = Histogram("http_request_db_seconds", "Time spent in SQL per request.",
+                            DB_TIME_BUCKETS, ("method", "route"))
+db_statements = Counter("db_statements_total", "SQL statements executed (requests and background work).", ("engine",))
+db_time = Counter("db_statement_seconds_total", "Time spent executing SQL.", ("engine",))
+pool_wait = Histogram("db_pool_checkout_wait_seconds", "Time waiting for a pooled connection.",
+                      POOL_WAIT_BUCKETS, ("engine",))
+messages = Counter("messages_total", "Messages by mode and status (queued on accept, then sent or failed).", ("mode", "status"))
+credits_deducted = Counter("credits_deducted_total", "Credits charged for accepted messages.", ("mode",))
+credits_refunded = Counter("credits_refunded_total", "Credits returned for messages that failed delivery.", ("mode",))
+
+REGISTRY = [
+    http_requests, http_latency, request_statements, request_db_time,
+    db_statements, db_time, pool_wait, messages, credits_deducted, credits_refunded,
+]
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- Business counters ---
+
+def record_messages(mode: str, status: str, count: int = 1, credits: float = 0.0):
+    messages.inc(count, mode, status)
+    if credits and status == "queued":
+        credits_deducted.inc(credits, mode)
+    elif credits and status == "failed":
+        credits_refunded.inc(credits, mode)
+
+# --- Requests ---
+
+# [statements, seconds] for the request being served; None outside a request
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware task hop); labels by route template, not raw path."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_db.reset(token)
+            # Unmatched paths share one label so scanners can't blow up the series count
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc(1, method, route, str(status))
+            http_latency.observe(elapsed, method, route)
+            request_statements.observe(db[0], method, route)
+            request_db_time.observe(db[1], method, route)
+
+# --- Engines ---
+
+class _TimedPool:
+    """Pool mixin: observes how long connect() takes to hand out a connection.
+
+    The pool has no "about to check out" event, so the wait is timed around
+    connect() itself. Pool.recreate() builds the same class, so the timing
+    survives engine.dispose().
+    """
+    metrics_engine = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            pool_wait.observe(time.perf_counter() - start, self.metrics_engine)
+
+def timed_pool_class(url: str, name: str):
+    """The pool class create_engine would pick for `url`, with checkouts timed as `name`.
+
+    Pass it as create_engine(poolclass=...); None (the default pool) when metrics are off.
+    """
+    if not METRICS_ENABLED:
+        return None
+    from sqlalchemy.engine import make_url
+
+    url = make_url(url)
+    base = url.get_dialect().get_pool_class(url)
+    return type(f"Timed{base.__name__}", (_TimedPool, base), {"metrics_engine": name})
+
+def instrument_engine(sync_engine, name: str):
+    """Count statements/DB time (total and per request) on this engine.
+
+    Pool checkout waits are timed by the engine's poolclass, see timed_pool_class().
+    """
+    from sqlalchemy import event
+
+    if not METRICS_ENABLED:
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_start", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        db_statements.inc(1, name)
+        db_time.inc(elapsed, name)
+        current = _request_db.get()
+        if current is not None:
+            current[0] += 1
+            current[1] += elapsed
@@ -0,0 +1,218 @@
+"""Versioned schema migrations.
+
+The applied version lives in the `schema_version` table. Startup reads it with
+one query and returns when it is current, so workers do no schema inspection
+on a normal start. Add a migration by appending to MIGRATIONS; never edit one
+that has shipped.
+
+Run standalone (e.g. once per deploy): python migrations.py
+"""
+import logging
+import time
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, bindparam, func, inspect, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+import models
+
+logger = logging.getLogger(__name__)
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Legacy float wallet columns -> micro-credit columns (see models.CREDIT_SCALE)
+LEGACY_WALLET_COLUMNS = {
+    "master_users": {
+        "total_credits": "total_credits_micro",
+        "available_credits": "available_credits_micro",
+        "used_credits": "used_credits_micro",
+    },
+    "business_users": {
+        "credits_allocated": "credits_allocated_micro",
+        "credits_used": "credits_used_micro",
+        "credits_remaining": "credits_remaining_micro",
+    },
+}
+
+def _add_missing_columns(conn: Connection, table):
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+        default = column.default.arg if column.default is not None and column.default.is_scalar else None
+        if default is not None:
+            ddl += f" DEFAULT {default!r}" if isinstance(default, str) else f" DEFAULT {default}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+        conn.execute(text(ddl))
+        added.append(column.name)
+    return added
+
+def baseline(conn: Connection):
+    """Bring any earlier schema (including the original float-wallet one) up to models.py."""
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    for table in models.Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            table.create(conn)
+            continue
+        added = _add_missing_columns(conn, table)
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+        for legacy, micro in LEGACY_WALLET_COLUMNS.get(table.name, {}).items():
+            if micro in added:
+                conn.execute(text(
+                    f"UPDATE {table.name} SET {micro} = CAST(ROUND(COALESCE({legacy}, 0) * {models.CREDIT_SCALE}) AS BIGINT)"
+                ))
+
+def idempotency_keys(conn: Connection):
+    """Dedupe store for Idempotency-Key requests (already present if baseline built a fresh schema)."""
+    models.IdempotencyKey.__table__.create(conn, checkfirst=True)
+
+def archived_partitions(conn: Connection):
+    """Catalogue of months moved to cold storage by the archiver."""
+    models.ArchivedPartition.__table__.create(conn, checkfirst=True)
+
+# Rows per batch when moving existing message bodies into message_bodies
+BODY_BACKFILL_BATCH = 5000
+
+def message_bodies(conn: Connection):
+    """Content-addressed message bodies: long bodies that repeat move off the messages rows."""
+    models.MessageBody.__table__.create(conn, checkfirst=True)
+    _add_missing_columns(conn, models.Message.__table__)
+    messages = models.Message.__table__
+    dialect = postgresql if conn.dialect.name == "postgresql" else sqlite
+    insert_body = dialect.insert(models.MessageBody.__table__).on_conflict_do_nothing(index_elements=["body_hash"])
+    move_body = (
+        update(messages)
+        .where(messages.c.message_id == bindparam("b_message_id"))
+        .values(body_hash=bindparam("b_body_hash"), message_body=None)
+    )
+    # Only bodies that repeat are shared (one-off bodies stay inline, as on the send path)
+    long_body = func.length(messages.c.message_body) > models.MESSAGE_BODY_INLINE_MAX
+    shared = {
+        body: models.message_body_hash(body)
+        for body, in conn.execute(
+            select(messages.c.message_body).where(long_body)
+            .group_by(messages.c.message_body).having(func.count() > 1)
+        )
+    }
+    if shared:
+        now = datetime.utcnow()
+        conn.execute(insert_body, [{"body_hash": body_hash, "body": body, "created_at": now} for body, body_hash in shared.items()])
+    # Then one pass over the rows in primary-key order
+    last = ""
+    moved = 0
+    while shared:
+        rows = conn.execute(
+            select(messages.c.message_id, messages.c.message_body)
+            .where(messages.c.message_id > last, long_body)
+            .order_by(messages.c.message_id)
+            .limit(BODY_BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            break
+        updates = [{"b_message_id": message_id, "b_body_hash": shared[body]} for message_id, body in rows if body in shared]
+        if updates:
+            conn.execute(move_body, updates)
+        moved += len(updates)
+        last = rows[-1][0]
+    logger.info("Moved %d message bodies to %d message_bodies rows", moved, len(shared))
+
+def message_templates(conn: Connection):
+    """Server-side message templates rendered by the send paths."""
+    models.MessageTemplate.__table__.create(conn, checkfirst=True)
+
+def dispatch_leases(conn: Connection):
+    """messages.claimed_at, so a starting dispatcher requeues only abandoned "sending" rows."""
+    _add_missing_columns(conn, models.Message.__table__)
+
+def dispatch_not_before(conn: Connection):
+    """messages.not_before: rate-limited messages wait in the queue instead of in a worker."""
+    _add_missing_columns(conn, models.Message.__table__)
+
+def credit_hold_consumption(conn: Connection):
+    """credit_holds.consumed_micro: hold draws move from per-process memory to the row.
+
+    Active holds are backfilled from the messages they paid for (failed ones were
+    given back); released holds consumed exactly what they settled.
+    """
+    _add_missing_columns(conn, models.CreditHold.__table__)
+    holds = models.CreditHold.__table__
+    messages = models.Message.__table__
+    conn.execute(update(holds).where(holds.c.status != "active").values(consumed_micro=holds.c.settled_micro))
+    consumed = conn.execute(
+        select(messages.c.hold_id, func.sum(messages.c.credits_used))
+        .where(messages.c.hold_id.in_(select(holds.c.hold_id).where(holds.c.status == "active")), messages.c.status != "failed")
+        .group_by(messages.c.hold_id)
+    ).all()
+    if consumed:
+        conn.execute(
+            update(holds).where(holds.c.hold_id == bindparam("c_hold_id")).values(consumed_micro=bindparam("c_consumed")),
+            [{"c_hold_id": hold_id, "c_consumed": models.to_micro(total or 0)} for hold_id, total in consumed],
+        )
+
+MIGRATIONS = [
+    (1, "baseline", baseline),
+    (2, "idempotency_keys", idempotency_keys),
+    (3, "archived_partitions", archived_partitions),
+    (4, "message_bodies", message_bodies),
+    (5, "message_templates", message_templates),
+    (6, "dispatch_leases", dispatch_leases),
+    (7, "dispatch_not_before", dispatch_not_before),
+    (8, "credit_hold_consumption", credit_hold_consumption),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def current_version(conn: Connection) -> int:
+    # One indexed read; a missing table means nothing has been applied yet
+    try:
+        return conn.execute(
+            select(schema_version.c.version).order_by(schema_version.c.version.desc()).limit(1)
+        ).scalar() or 0
+    except DBAPIError:
+        conn.rollback()
+        return 0
+
+def _lock(conn: Connection):
+    # Serialise workers that start together; the loser re-reads the version afterwards
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(727001)"))
+    elif conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def run_migrations(engine: Engine) -> list:
+    """Apply pending migrations; returns the versions applied (empty when current)."""
+    with engine.connect() as conn:
+        if current_version(conn) >= LATEST_VERSION:
+            return []
+
+    applied = []
+    with engine.connect() as conn:
+        _lock(conn)
+        schema_version.create(conn, checkfirst=True)
+        version = current_version(conn)
+        for number, name, migrate in MIGRATIONS:
+            if number <= version:
+                continue
+            start = time.perf_counter()
+            migrate(conn)
+            conn.execute(schema_version.insert().values(version=number, name=name, applied_at=datetime.utcnow()))
+            logger.info("Applied migration %d %s in %.2fs", number, name, time.perf_counter() - start)
+            applied.append(number)
+        conn.commit()
+    return applied
+
+if __name__ == "__main__":
+    import database
+    logging.basicConfig(level=logging.INFO)
+    print(f"Applied: {run_migrations(database.engine) or 'nothing, schema is current'}")
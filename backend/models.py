@@ -1,9 +1,30 @@
+import hashlib
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Float, Enum, Text
+from sqlalchemy import Column, String, DateTime, Float, Integer, BigInteger, Enum, Text, Index, UniqueConstraint, func, select
+from sqlalchemy.orm import column_property
 # from sqlalchemy.dialects.postgresql import UUID # Removed for SQLite compatibility
 from database import Base
 
+# Wallet balances are stored as integer micro-credits (1 credit = 1,000,000) so
+# debits are exact and can be done as a single conditional UPDATE in SQL.
+# The float properties on the models are read-only views for the API.
+CREDIT_SCALE = 1_000_000
+
+def to_micro(credits: float) -> int:
+    return int(round(credits * CREDIT_SCALE))
+
+def from_micro(micro: int) -> float:
+    return (micro or 0) / CREDIT_SCALE
+
+# Message bodies longer than this are stored once in message_bodies and the row
+# keeps their hash; shorter ones stay on the row, where they cost no more than a hash
+MESSAGE_BODY_INLINE_MAX = 64
+
+def message_body_hash(body: str) -> str:
+    # 128-bit BLAKE2b, hex: 32 characters per message row
+    return hashlib.blake2b(body.encode(), digest_size=16).hexdigest()
+
 class MasterUser(Base):
     __tablename__ = "master_users"
 
@@ -35,13 +56,25 @@ class MasterUser(Base):
     # Bank
     bank_name = Column(String)
     
-    # Wallet
-    total_credits = Column(Float, default=0.0)
-    available_credits = Column(Float, default=0.0)
-    used_credits = Column(Float, default=0.0)
+    # Wallet (micro-credits, see CREDIT_SCALE)
+    total_credits_micro = Column(BigInteger, nullable=False, default=0)
+    available_credits_micro = Column(BigInteger, nullable=False, default=0)
+    used_credits_micro = Column(BigInteger, nullable=False, default=0)
     
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    @property
+    def total_credits(self):
+        return from_micro(self.total_credits_micro)
+
+    @property
+    def available_credits(self):
+        return from_micro(self.available_credits_micro)
+
+    @property
+    def used_credits(self):
+        return from_micro(self.used_credits_micro)
+
 class BusinessUser(Base):
     __tablename__ = "business_users"
 
@@ -68,16 +101,49 @@ class BusinessUser(Base):
     pincode = Column(String)
     country = Column(String)
 
-    # Wallet
-    credits_allocated = Column(Float, default=0.0)
-    credits_used = Column(Float, default=0.0)
-    credits_remaining = Column(Float, default=0.0)
+    # Wallet (micro-credits, see CREDIT_SCALE)
+    # allocated = remaining + held + used; "held" is reserved by CreditHolds
+    credits_allocated_micro = Column(BigInteger, nullable=False, default=0)
+    credits_used_micro = Column(BigInteger, nullable=False, default=0)
+    credits_remaining_micro = Column(BigInteger, nullable=False, default=0)
+    credits_held_micro = Column(BigInteger, nullable=False, default=0)
 
     # WhatsApp Config
     whatsapp_mode = Column(String, default="official") # official | unofficial
 
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_business_users_reseller", "parent_reseller_id", "user_id"),
+    )
+
+    @property
+    def credits_allocated(self):
+        return from_micro(self.credits_allocated_micro)
+
+    @property
+    def credits_used(self):
+        return from_micro(self.credits_used_micro)
+
+    @property
+    def credits_remaining(self):
+        return from_micro(self.credits_remaining_micro)
+
+    @property
+    def credits_held(self):
+        return from_micro(self.credits_held_micro)
+
+class ResellerStats(Base):
+    __tablename__ = "reseller_stats"
+
+    # Rollup kept in step with business_users by the write paths (crud/reseller_stats.py):
+    # count of business users, SUM(credits_allocated) and SUM(credits_used)
+    reseller_id = Column(String, primary_key=True)
+    business_user_count = Column(Integer, nullable=False, default=0)
+    credits_distributed_micro = Column(BigInteger, nullable=False, default=0)
+    credits_used_micro = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class CreditTransaction(Base):
     __tablename__ = "credit_transactions"
 
@@ -87,6 +153,22 @@ class CreditTransaction(Base):
     credits_shared = Column(Float, nullable=False)
     shared_at = Column(DateTime, default=datetime.utcnow)
 
+    # Keyset pagination seeks on (shared_at, distribution_id), see pagination.py
+    __table_args__ = (
+        Index("ix_credit_transactions_shared", "shared_at", "distribution_id"),
+        Index("ix_credit_transactions_reseller_shared", "from_reseller_id", "shared_at", "distribution_id"),
+        Index("ix_credit_transactions_business_shared", "to_business_user_id", "shared_at", "distribution_id"),
+    )
+
+class MessageBody(Base):
+    __tablename__ = "message_bodies"
+
+    # Content-addressed: a template body sent to 50k recipients is one row here.
+    # Rows are written once and never updated.
+    body_hash = Column(String, primary_key=True) # message_body_hash(body)
+    body = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class Message(Base):
     __tablename__ = "messages"
 
@@ -98,11 +180,36 @@ class Message(Base):
     receiver_number = Column(String)
     message_type = Column(String, default="text") # text | template
     template_name = Column(String, nullable=True)
-    message_body = Column(Text)
-    status = Column(String, default="sent")
+    # Storage of the body: inline when short, otherwise body_hash into message_bodies
+    # (see services/message_bodies.py). Read it through message_body.
+    body_inline = Column("message_body", Text)
+    body_hash = Column(String, nullable=True)
+    status = Column(String, default="queued") # queued | sending | sent | failed
+    # Dispatcher lease: when the row moved to "sending". Expired leases are requeued.
+    claimed_at = Column(DateTime, nullable=True)
+    # Set when the sender's rate limit deferred it: not claimed again before this time
+    not_before = Column(DateTime, nullable=True)
     credits_used = Column(Float, default=0.0)
+    hold_id = Column(String, nullable=True) # Set when paid from a CreditHold instead of the wallet
     sent_at = Column(DateTime, default=datetime.utcnow)
 
+    # The body text wherever it is stored. A read-only SQL expression, so ORM
+    # loads, projections and exports all resolve it in the same statement
+    # (one primary-key probe into message_bodies per deduplicated row).
+    message_body = column_property(func.coalesce(
+        body_inline,
+        select(MessageBody.body).where(MessageBody.body_hash == body_hash).scalar_subquery(),
+    ).label("message_body"))
+
+    # Keyset pagination seeks on (sent_at, message_id), see pagination.py.
+    # (status, sent_at) is the dispatcher's queue scan.
+    __table_args__ = (
+        Index("ix_messages_sent", "sent_at", "message_id"),
+        Index("ix_messages_user_sent", "user_id", "sent_at", "message_id"),
+        Index("ix_messages_status_sent", "status", "sent_at"),
+        Index("ix_messages_hold", "hold_id"),
+    )
+
 class LinkedDevice(Base):
     __tablename__ = "linked_devices"
 
@@ -115,15 +222,25 @@ class LinkedDevice(Base):
     ip_address = Column(String, nullable=True)
     last_active = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_linked_devices_last_active", "last_active"),
+        Index("ix_linked_devices_user_last_active", "user_id", "last_active"),
+    )
+
 class DeviceSession(Base):
     __tablename__ = "device_sessions"
 
     session_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    device_id = Column(String, nullable=False)
+    device_id = Column(String, nullable=False, index=True)
     session_token = Column(String, unique=True, nullable=False)
     is_valid = Column(String, default="true") # Using string "true"/"false" for SQLite simplicity
     created_at = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime, default=lambda: datetime.utcnow() + __import__('datetime').timedelta(days=7))
+    expires_at = Column(DateTime, default=lambda: datetime.utcnow() + __import__('datetime').timedelta(days=7), index=True)
+
+    __table_args__ = (
+        # Revoked sessions are rare, so the sweeper's is_valid probe stays cheap
+        Index("ix_device_sessions_is_valid", "is_valid"),
+    )
 
 class UsageLog(Base):
     __tablename__ = "usage_logs"
@@ -135,6 +252,26 @@ class UsageLog(Base):
     balance_after = Column(Float, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    # Keyset pagination seeks on (timestamp, usage_id), see pagination.py
+    __table_args__ = (
+        Index("ix_usage_logs_timestamp", "timestamp", "usage_id"),
+        Index("ix_usage_logs_user_timestamp", "user_id", "timestamp", "usage_id"),
+    )
+
+class UsageAggregate(Base):
+    __tablename__ = "usage_aggregates"
+
+    # Pre-aggregated usage per hour/day bucket, maintained as messages are sent
+    # (services/usage.py). Primary key order serves the range scans of /usage/summary.
+    scope = Column(String, primary_key=True) # user | reseller
+    owner_id = Column(String, primary_key=True)
+    granularity = Column(String, primary_key=True) # hour | day
+    bucket_start = Column(DateTime, primary_key=True)
+    mode = Column(String, primary_key=True)
+    message_type = Column(String, primary_key=True)
+    message_count = Column(BigInteger, nullable=False, default=0)
+    credits_deducted_micro = Column(BigInteger, nullable=False, default=0)
+
 class WhatsAppOfficialConfig(Base):
     __tablename__ = "whatsapp_official_configs"
 
@@ -146,3 +283,86 @@ class WhatsAppOfficialConfig(Base):
     access_token = Column(String)
     template_status = Column(String, default="sandbox") # sandbox | live
     updated_at = Column(DateTime, default=datetime.utcnow)
+
+class RateLimitOverride(Base):
+    __tablename__ = "rate_limit_overrides"
+
+    # Per-user send rate, replaces the mode default for all of the user's sender numbers
+    user_id = Column(String, primary_key=True)
+    rate_per_second = Column(Float, nullable=False)
+    burst = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class CreditHold(Base):
+    __tablename__ = "credit_holds"
+
+    # Credits reserved from a business user's wallet for one campaign.
+    # Sends draw consumed_micro with a conditional UPDATE (like the wallet), and
+    # consumption is booked to the wallet in batches; settled_micro is how much
+    # of it has been booked so far.
+    hold_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, nullable=False)
+    campaign_name = Column(String, nullable=True)
+    reserved_micro = Column(BigInteger, nullable=False)
+    consumed_micro = Column(BigInteger, nullable=False, default=0)
+    settled_micro = Column(BigInteger, nullable=False, default=0)
+    status = Column(String, default="active", index=True) # active | released
+    created_at = Column(DateTime, default=datetime.utcnow)
+    settled_at = Column(DateTime, nullable=True)
+    released_at = Column(DateTime, nullable=True)
+
+class IdempotencyKey(Base):
+    """Stored response for a request sent with an Idempotency-Key header.
+
+    The row is inserted in the same transaction as the request's writes, so a
+    retry either finds it (and gets the stored response) or the work never
+    happened. status_code stays NULL until the response has been recorded.
+    """
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String, primary_key=True) # "POST /messages/send"
+    idempotency_key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False) # sha256 of the request body
+    status_code = Column(Integer)
+    response_body = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # The purge walks expired keys in batches
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+class ArchivedPartition(Base):
+    """One month of messages or usage_logs moved out of the hot tables.
+
+    The rows live in a gzip NDJSON file (services/archive.py); exports read it
+    back when their time window reaches that month.
+    """
+    __tablename__ = "archived_partitions"
+
+    table_name = Column(String, primary_key=True) # messages | usage_logs
+    period_start = Column(DateTime, primary_key=True) # first instant of the month
+    period_end = Column(DateTime, nullable=False) # first instant of the next month
+    path = Column(String, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class MessageTemplate(Base):
+    __tablename__ = "message_templates"
+
+    # A business user's message text with {{variable}} placeholders, rendered
+    # per recipient by the send paths (services/templates.py)
+    template_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, nullable=False)
+    name = Column(String, nullable=False) # what MessageCreate.template_name refers to
+    body = Column(Text, nullable=False)
+    version = Column(Integer, nullable=False, default=1) # bumped on every edit; compiled copies compare it
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    # Also the lookup index for (user_id, name IN ...) in the batch path
+    __table_args__ = (
+        UniqueConstraint("user_id", "name", name="uq_message_templates_user_name"),
+    )
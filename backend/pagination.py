@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Largest `limit` the cursor-paginated listings accept
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(timestamp: datetime, row_id: str) -> str:
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), str(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_paginate(query, time_col, id_col, skip: int = 0, limit: int = 100, cursor: str = None):
+    """Newest-first page of `query` plus the cursor for the next page.
+
+    With a cursor the page is a seek, WHERE (time, id) < (cursor time, cursor id),
+    which an index on (..., time, id) answers without reading skipped rows.
+    Without one, `skip` is honoured for older clients. `limit` must be at least
+    1: the cursor is built from the page's last row.
+    """
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(time_col, id_col) < tuple_(timestamp, row_id))
+    query = query.order_by(time_col.desc(), id_col.desc())
+    if skip and not cursor:
+        query = query.offset(skip)
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(getattr(last, time_col.key), getattr(last, id_col.key))
@@ -0,0 +1,171 @@
+"""SQL profiling: per-request statement log, slow-query EXPLAIN and N+1 flags.
+
+With PROFILE_SQL on, every statement a request issues is recorded with its
+timing. Statements slower than SLOW_QUERY_MS are logged with their EXPLAIN plan,
+and a request that runs the same statement REPEATED_STATEMENT_THRESHOLD times
+or more is flagged as a likely N+1. Each response carries X-Query-Count.
+Meant for development and staging; /metrics (metrics.py) is the always-on view.
+
+assert_max_queries() is the test-side counterpart: it fails a block that issues
+more statements than its budget (see bench/query_budget.py).
+"""
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SQL = os.getenv("PROFILE_SQL", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+REPEATED_STATEMENT_THRESHOLD = int(os.getenv("REPEATED_STATEMENT_THRESHOLD", "5"))
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+EXPLAIN_PREFIX = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+    "mysql": "EXPLAIN ",
+}
+
+class QueryLog:
+    """Statements issued by one request (or one assert_max_queries block)."""
+
+    def __init__(self):
+        self.statements = []  # (statement, parameters, seconds)
+
+    def add(self, statement: str, parameters, seconds: float):
+        self.statements.append((statement, parameters, seconds))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def seconds(self) -> float:
+        return sum(seconds for _, _, seconds in self.statements)
+
+    def repeated(self, threshold: int = REPEATED_STATEMENT_THRESHOLD):
+        """Statements run `threshold` or more times, most repeated first."""
+        counts = Counter(statement for statement, _, _ in self.statements)
+        return [(statement, n) for statement, n in counts.most_common() if n >= threshold]
+
+    def describe(self) -> str:
+        return "\n".join(f"  {seconds * 1000:7.2f} ms  {' '.join(statement.split())}"
+                         for statement, _, seconds in self.statements)
+
+_current: ContextVar[Optional[QueryLog]] = ContextVar("query_log", default=None)
+
+def explain(connection, statement: str, parameters) -> list:
+    """Plan rows for `statement`, run on the same DBAPI connection; [] for unknown dialects."""
+    prefix = EXPLAIN_PREFIX.get(connection.dialect.name)
+    if prefix is None:
+        return []
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [" ".join(str(value) for value in row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+def instrument_engine(sync_engine):
+    """Record statements into the current request's QueryLog and EXPLAIN slow ones."""
+    from sqlalchemy import event
+
+    if not PROFILE_SQL:
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profile_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_profile_start", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        log = _current.get()
+        if log is not None:
+            log.add(statement, parameters, elapsed)
+        if elapsed * 1000 < SLOW_QUERY_MS:
+            return
+        plan = []
+        if not executemany:
+            try:
+                plan = explain(conn, statement, parameters)
+            except Exception as e:
+                plan = [f"EXPLAIN failed: {e}"]
+        logger.warning("Slow query (%.1f ms): %s\n%s", elapsed * 1000, " ".join(statement.split()),
+                       "\n".join(f"  {line}" for line in plan))
+
+class ProfilingMiddleware:
+    """Logs each request's statement count/time, flags repeated statements, sets X-Query-Count."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        log = QueryLog()
+        token = _current.set(log)
+
+        async def send_with_count(message):
+            # Handlers finish before the response starts, so the count is complete here
+            # (streamed bodies issue their queries after it)
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (QUERY_COUNT_HEADER.lower().encode(), str(log.count).encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            logger.info("%s %s: %d statements, %.1f ms in SQL", scope["method"], route, log.count, log.seconds * 1000)
+            for statement, n in log.repeated():
+                logger.warning("Possible N+1 in %s %s: statement ran %d times: %s",
+                               scope["method"], route, n, " ".join(statement.split()))
+
+@contextmanager
+def assert_max_queries(limit: int, engines=None):
+    """Fail if the block issues more than `limit` statements on `engines` (default: the app's sync engines).
+
+    Listens on the engines directly, so it also counts statements run on other
+    threads (TestClient, run_in_threadpool). Yields the QueryLog for inspection.
+    """
+    from sqlalchemy import event
+
+    if engines is None:
+        import database
+        engines = {database.engine, database.read_engine}
+
+    log = QueryLog()
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_budget_start", []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        log.add(statement, parameters, time.perf_counter() - conn.info["_budget_start"].pop())
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before)
+        event.listen(engine, "after_cursor_execute", after)
+    try:
+        yield log
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", before)
+            event.remove(engine, "after_cursor_execute", after)
+
+    if log.count > limit:
+        raise AssertionError(f"{log.count} statements issued, budget is {limit}:\n{log.describe()}")
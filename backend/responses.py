@@ -0,0 +1,27 @@
+import json
+from datetime import datetime
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+class FastJSONResponse(Response):
+    """JSON response for pre-built dicts: no response_model validation, orjson encoding.
+
+    Returning it from an endpoint skips FastAPI's response_model pass, so the
+    content must already match the declared schema.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, default=_default, separators=(",", ":")).encode()
@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, Header, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+import schemas, database
+from crud import projections
+from crud import sessions as crud_sessions
+from pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from responses import FastJSONResponse
+from services.credits import AsyncCreditService
+from services.dispatch import dispatcher
+from services.messages import AsyncMessageService
+from services.session_cache import check_session, session_cache
+
+# Async versions of the hot routes, mounted ahead of the sync handlers when
+# ASYNC_ROUTES is set. Same paths and contracts; the sync handlers stay in the
+# OpenAPI schema, these are hidden from it.
+router = APIRouter(include_in_schema=False)
+
+get_db = database.get_async_db
+get_read_db = database.get_async_read_db
+
+@router.get("/resellers")
+async def read_resellers(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_read_db)):
+    return FastJSONResponse(await db.run_sync(lambda session: projections.list_resellers(session, skip, limit)))
+
+@router.get("/business-users")
+async def read_business_users(reseller_id: str = None, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_read_db)):
+    return FastJSONResponse(
+        await db.run_sync(lambda session: projections.list_business_users(session, reseller_id, skip, limit))
+    )
+
+@router.get("/messages")
+async def read_messages(user_id: str = None, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    msgs, next_cursor = await db.run_sync(
+        lambda session: projections.list_messages(session, user_id, skip, limit, cursor)
+    )
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return FastJSONResponse(msgs, headers=headers)
+
+@router.post("/messages/send", response_model=schemas.MessageRead)
+async def send_message(msg: schemas.MessageCreate, idempotency_key: Optional[str] = Header(None), db: AsyncSession = Depends(get_db)):
+    result = await AsyncMessageService(db).send(msg, idempotency_key)
+    dispatcher.notify()
+    return result
+
+@router.post("/messages/send-batch", response_model=schemas.MessageBatchRead)
+async def send_message_batch(batch: schemas.MessageBatchCreate, db: AsyncSession = Depends(get_db)):
+    result = await AsyncMessageService(db).send_batch(batch)
+    dispatcher.notify()
+    return result
+
+@router.get("/sessions/validate")
+async def validate_session(token: str, db: AsyncSession = Depends(get_read_db)):
+    entry = session_cache.get(token)
+    if entry is None:
+        # Taken before the read: a revocation committed meanwhile keeps this result out of the cache
+        generation = session_cache.begin()
+        session = await crud_sessions.get_session_by_token(db, token)
+        if not session and database.READ_REPLICA:
+            # A token created moments ago may not have replicated yet
+            async with database.AsyncSessionLocal() as write_db:
+                session = await crud_sessions.get_session_by_token(write_db, token)
+        if session:
+            entry = session_cache.put(token, session.device_id, session.is_valid, session.expires_at, generation)
+        else:
+            entry = session_cache.put_negative(token, generation)
+    return check_session(entry)
+
+@router.post("/credits/distribute", response_model=schemas.CreditTransactionRead)
+async def distribute_credits(transaction: schemas.CreditDistributionCreate, idempotency_key: Optional[str] = Header(None), db: AsyncSession = Depends(get_db)):
+    return await AsyncCreditService(db).distribute(transaction, idempotency_key)
+
+@router.get("/credits/history", response_model=List[schemas.CreditTransactionRead])
+async def read_credit_history(
+    reseller_id: str = None,
+    business_user_id: str = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    history, next_cursor = await AsyncCreditService(db).get_history(reseller_id, business_user_id, skip, limit, cursor)
+    rows = [schemas.CreditTransactionRead.model_validate(tx).model_dump(mode="json") for tx in history]
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return FastJSONResponse(rows, headers=headers)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from .. import schemas, database
-from ..services.credits import CreditService
+import schemas, database
+from pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from services.credits import CreditService
+from services.idempotency import idempotency_store
+from services.holds import CreditHoldService
 
 router = APIRouter(
     prefix="/credits",
@@ -17,18 +20,58 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    db = database.ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 @router.post("/distribute", response_model=schemas.CreditTransactionRead)
-def distribute_credits(transaction: schemas.CreditDistributionCreate, db: Session = Depends(get_db)):
+def distribute_credits(transaction: schemas.CreditDistributionCreate, idempotency_key: Optional[str] = Header(None), db: Session = Depends(get_db)):
     service = CreditService(db)
-    return service.distribute(transaction)
+    if idempotency_key is None:
+        return service.distribute(transaction)
+    return idempotency_store.run(
+        db, "POST /credits/distribute", idempotency_key, transaction,
+        lambda: schemas.CreditTransactionRead.model_validate(service.distribute(transaction, commit=False))
+    )
+
+@router.post("/distribute-bulk", response_model=schemas.CreditBulkDistributionRead)
+def distribute_credits_bulk(distribution: schemas.CreditBulkDistributionCreate, db: Session = Depends(get_db)):
+    # Monthly top-ups: one ownership query, one reseller debit, one commit for the whole list
+    service = CreditService(db)
+    return service.distribute_bulk(distribution)
 
 @router.get("/history", response_model=List[schemas.CreditTransactionRead])
 def read_credit_history(
+    response: Response,
     reseller_id: str = None, 
     business_user_id: str = None, 
     skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), 
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
     service = CreditService(db)
-    return service.get_history(reseller_id, business_user_id, skip, limit)
+    history, next_cursor = service.get_history(reseller_id, business_user_id, skip, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return history
+
+# --- Credit Holds (campaign reservations) ---
+
+@router.post("/holds", response_model=schemas.CreditHoldRead)
+def reserve_credits(hold: schemas.CreditHoldCreate, db: Session = Depends(get_db)):
+    service = CreditHoldService(db)
+    return service.reserve(hold)
+
+@router.get("/holds/{hold_id}", response_model=schemas.CreditHoldRead)
+def read_credit_hold(hold_id: str, db: Session = Depends(get_db)):
+    service = CreditHoldService(db)
+    return service.get(hold_id)
+
+@router.post("/holds/{hold_id}/release", response_model=schemas.CreditHoldRead)
+def release_credit_hold(hold_id: str, db: Session = Depends(get_db)):
+    service = CreditHoldService(db)
+    return service.release(hold_id)
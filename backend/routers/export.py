@@ -0,0 +1,62 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+import schemas, database
+from crud import archive as crud_archive
+from crud import export as crud_export
+from services.archive import archived_rows
+from services.export import export_response
+
+router = APIRouter(
+    prefix="/export",
+    tags=["Export"]
+)
+
+def get_read_db():
+    db = database.ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Streams every matching row as NDJSON (default) or CSV; `from`/`to` bound the time range [from, to).
+# Messages and usage logs include months the archiver has moved to cold storage.
+
+@router.get("/messages")
+def export_messages(
+    format: str = "ndjson",
+    user_id: str = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+):
+    archived = lambda keys, chunk_size: archived_rows("messages", keys, user_id, start, end, chunk_size)
+    return export_response(crud_export.messages_statement(user_id, start, end), format, "messages", archived)
+
+@router.get("/usage")
+def export_usage(
+    format: str = "ndjson",
+    user_id: str = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+):
+    archived = lambda keys, chunk_size: archived_rows("usage_logs", keys, user_id, start, end, chunk_size)
+    return export_response(crud_export.usage_statement(user_id, start, end), format, "usage_logs", archived)
+
+@router.get("/credits")
+def export_credits(
+    format: str = "ndjson",
+    reseller_id: str = None,
+    business_user_id: str = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+):
+    return export_response(
+        crud_export.credits_statement(reseller_id, business_user_id, start, end), format, "credit_history"
+    )
+
+@router.get("/archive", response_model=List[schemas.ArchivedPartitionRead])
+def read_archived_partitions(table: str = None, db: Session = Depends(get_read_db)):
+    # Months moved out of messages/usage_logs; the exports above still include them
+    return crud_archive.list_partitions(db, table)
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, File, Form, UploadFile
+from sqlalchemy.orm import Session
+
+import schemas, database
+from services.imports import BusinessUserImportService
+
+router = APIRouter(
+    prefix="/business-users",
+    tags=["Import"]
+)
+
+def get_db():
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@router.post("/import", response_model=schemas.BusinessUserImportReport)
+def import_business_users(
+    parent_reseller_id: str = Form(...),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    # CSV header: name,username,email,password plus any of phone, whatsapp_mode,
+    # business_name, business_description, erp_system, gstin, full_address, pincode, country
+    return BusinessUserImportService(db).import_csv(file.file, parent_reseller_id)
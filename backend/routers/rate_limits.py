@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+
+import schemas, database
+from crud import rate_limits as crud_rate_limits
+from services.rate_limit import rate_limiter
+
+router = APIRouter(
+    prefix="/rate-limits",
+    tags=["Rate Limits"]
+)
+
+def get_db():
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@router.put("/{user_id}", response_model=schemas.RateLimitOverrideRead)
+def set_rate_limit(user_id: str, override: schemas.RateLimitOverrideCreate, db: Session = Depends(get_db)):
+    if not crud_rate_limits.get_business_user(db, user_id):
+        raise HTTPException(status_code=404, detail="Business User not found")
+
+    db_override = crud_rate_limits.upsert_override(db, user_id, override.rate_per_second, override.burst)
+    db.commit()
+    db.refresh(db_override)
+    rate_limiter.set_override(user_id, override.rate_per_second, override.burst)
+    return db_override
+
+@router.get("/buckets", response_model=List[schemas.RateLimitBucketStats])
+def read_buckets():
+    # Current level and wait time per (mode, sender_number), for capacity sizing
+    return rate_limiter.snapshot()
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from typing import List
+
+import schemas, database
+from services.templates import TemplateService, template_read
+
+router = APIRouter(
+    prefix="/templates",
+    tags=["Templates"]
+)
+
+def get_db():
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db():
+    db = database.ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@router.post("/", response_model=schemas.MessageTemplateRead)
+def create_template(template: schemas.MessageTemplateCreate, db: Session = Depends(get_db)):
+    return template_read(TemplateService(db).create(template))
+
+@router.get("/", response_model=List[schemas.MessageTemplateRead])
+def read_templates(user_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
+    return [template_read(t) for t in TemplateService(db).list(user_id, skip, limit)]
+
+@router.get("/{template_id}", response_model=schemas.MessageTemplateRead)
+def read_template(template_id: str, db: Session = Depends(get_read_db)):
+    return template_read(TemplateService(db).get(template_id))
+
+@router.put("/{template_id}", response_model=schemas.MessageTemplateRead)
+def update_template(template_id: str, template: schemas.MessageTemplateUpdate, db: Session = Depends(get_db)):
+    # Bumps the version; workers pick up the new body on their next send
+    return template_read(TemplateService(db).update(template_id, template))
+
+@router.delete("/{template_id}")
+def delete_template(template_id: str, db: Session = Depends(get_db)):
+    TemplateService(db).delete(template_id)
+    return {"message": "Template deleted successfully"}
+
+@router.post("/{template_id}/preview", response_model=schemas.MessageTemplateRendered)
+def preview_template(template_id: str, preview: schemas.MessageTemplatePreview, db: Session = Depends(get_read_db)):
+    return TemplateService(db).preview(template_id, preview)
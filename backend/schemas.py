@@ -2,7 +2,7 @@ from pydantic import BaseModel, Field
 # from pydantic import EmailStr # Commented out to reduce dependency issues if email-validator is missing
 from uuid import UUID
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List, Union
 
 class ProfileBase(BaseModel):
     name: str
@@ -65,6 +65,7 @@ class BusinessWalletBase(BaseModel):
     credits_allocated: float = 0.0
     credits_used: float = 0.0
     credits_remaining: float = 0.0
+    credits_held: float = 0.0
 
 class BusinessUserCreate(BaseModel):
     role: str = "business_owner"
@@ -91,6 +92,18 @@ class BusinessUserRead(BaseModel):
     class Config:
         from_attributes = True
 
+class BusinessUserImportError(BaseModel):
+    row: int # CSV line number (the header is line 1)
+    email: Optional[str] = None
+    error: str
+
+class BusinessUserImportReport(BaseModel):
+    parent_reseller_id: str
+    rows: int
+    imported: int
+    rejected: int
+    errors: List[BusinessUserImportError]
+
 class CreditDistributionCreate(BaseModel):
     from_reseller_id: str
     to_business_user_id: str
@@ -106,6 +119,37 @@ class CreditTransactionRead(BaseModel):
     class Config:
         from_attributes = True
 
+class CreditBulkItem(BaseModel):
+    business_user_id: str
+    credits: float
+
+class CreditBulkDistributionCreate(BaseModel):
+    from_reseller_id: str
+    items: List[CreditBulkItem]
+
+class CreditBulkDistributionRead(BaseModel):
+    from_reseller_id: str
+    distributed: int
+    total_credits: float
+    reseller_available_credits: float
+    transactions: List[CreditTransactionRead]
+
+class CreditHoldCreate(BaseModel):
+    user_id: str
+    credits: float = Field(gt=0)
+    campaign_name: Optional[str] = None
+
+class CreditHoldRead(BaseModel):
+    hold_id: str
+    user_id: str
+    campaign_name: Optional[str] = None
+    status: str
+    credits_reserved: float
+    credits_consumed: float
+    credits_settled: float
+    credits_available: float
+    created_at: datetime
+
 class MessageCreate(BaseModel):
     user_id: str
     mode: str = "official"
@@ -113,7 +157,11 @@ class MessageCreate(BaseModel):
     receiver_number: str
     message_type: str = "text"
     template_name: Optional[str] = None
-    message_body: str
+    # Without message_body, the body is rendered from the user's template_name
+    # with these values for its {{variables}}
+    message_body: Optional[str] = None
+    variables: Optional[Dict[str, Union[str, int, float]]] = None
+    hold_id: Optional[str] = None # Pay from a CreditHold instead of the wallet
 
 class MessageRead(BaseModel):
     message_id: str
@@ -131,6 +179,26 @@ class MessageRead(BaseModel):
     class Config:
         from_attributes = True
 
+class MessageBatchCreate(BaseModel):
+    user_id: str
+    hold_id: Optional[str] = None
+    messages: List[MessageCreate]
+
+class MessageBatchItemResult(BaseModel):
+    index: int
+    status: str # queued | rejected
+    message_id: Optional[str] = None
+    credits_used: float = 0.0
+    error: Optional[str] = None
+
+class MessageBatchRead(BaseModel):
+    user_id: str
+    accepted: int
+    rejected: int
+    total_credits_used: float
+    balance_after: float
+    results: List[MessageBatchItemResult]
+
 class DeviceCreate(BaseModel):
     user_id: str
     device_name: str
@@ -173,6 +241,23 @@ class UsageLogRead(BaseModel):
     class Config:
         from_attributes = True
 
+class UsageBucket(BaseModel):
+    bucket_start: datetime
+    mode: str
+    message_type: str
+    message_count: int
+    credits_deducted: float
+
+class UsageSummary(BaseModel):
+    scope: str # user | reseller
+    owner_id: str
+    granularity: str # hour | day
+    start: datetime
+    end: datetime
+    total_messages: int
+    total_credits_deducted: float
+    buckets: List[UsageBucket]
+
 class BusinessUserStats(BaseModel):
     user_id: str
     name: str
@@ -184,6 +269,7 @@ class ResellerAnalytics(BaseModel):
     reseller_id: str
     total_credits_purchased: float
     total_credits_distributed: float
+    total_credits_used: float = 0.0
     remaining_credits: float
     active_business_users: int
     business_user_stats: List[BusinessUserStats]
@@ -209,3 +295,64 @@ class WhatsAppConfigRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+class RateLimitOverrideCreate(BaseModel):
+    rate_per_second: float = Field(gt=0)
+    burst: int = Field(ge=1)
+
+class RateLimitOverrideRead(BaseModel):
+    user_id: str
+    rate_per_second: float
+    burst: int
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class RateLimitBucketStats(BaseModel):
+    mode: str
+    sender_number: str
+    user_id: Optional[str] = None
+    rate_per_second: float
+    burst: int
+    tokens: float
+    current_wait_seconds: float
+    acquired: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+
+class ArchivedPartitionRead(BaseModel):
+    table_name: str
+    period_start: datetime
+    period_end: datetime
+    path: str
+    row_count: int
+    size_bytes: int
+    archived_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class MessageTemplateCreate(BaseModel):
+    user_id: str
+    name: str
+    body: str
+
+class MessageTemplateUpdate(BaseModel):
+    body: str
+
+class MessageTemplatePreview(BaseModel):
+    variables: Dict[str, Union[str, int, float]] = {}
+
+class MessageTemplateRendered(BaseModel):
+    body: str
+
+class MessageTemplateRead(BaseModel):
+    template_id: str
+    user_id: str
+    name: str
+    body: str
+    variables: List[str]
+    version: int
+    created_at: datetime
+    updated_at: datetime
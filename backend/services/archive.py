@@ -0,0 +1,203 @@
+import gzip
+import heapq
+import json
+import logging
+import os
+import time
+from datetime import datetime
+import database, models
+from crud import archive as crud_archive
+
+logger = logging.getLogger(__name__)
+
+# Whole months older than this many months (counting the current one) leave the hot
+# tables. Archiving removes rows from the database, so it is opt-in: 0 (the
+# default) leaves the archiver off
+ARCHIVE_RETENTION_MONTHS = int(os.getenv("ARCHIVE_RETENTION_MONTHS", "0"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "86400"))
+# Rows per fetch when writing a file, and per DELETE transaction afterwards
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+
+# Table -> (model, time column, id column). Files hold rows in (time, id) order,
+# the same order the exports stream them in.
+ARCHIVED_TABLES = {
+    "messages": (models.Message, "sent_at", "message_id"),
+    "usage_logs": (models.UsageLog, "timestamp", "usage_id"),
+}
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_path(table_name: str, period_start: datetime) -> str:
+    return os.path.join(ARCHIVE_DIR, table_name, f"{period_start:%Y-%m}.ndjson.gz")
+
+def _to_record(row: dict) -> dict:
+    # Same value encoding as the NDJSON export
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+def _read_records(path: str):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+def _key_ranges(rows, time_key: str, id_key: str, ranges: list, batch_size: int):
+    """Pass rows through, appending (first key, last key, rows) to `ranges` per `batch_size` rows."""
+    first = last = None
+    count = 0
+    for row in rows:
+        last = (row[time_key], row[id_key])
+        if first is None:
+            first = last
+        count += 1
+        yield row
+        if count == batch_size:
+            ranges.append((first, last, count))
+            first, count = None, 0
+    if count:
+        ranges.append((first, last, count))
+
+def _write_partition(db, table_name: str, period_start: datetime, period_end: datetime,
+                     batch_size: int = ARCHIVE_BATCH_SIZE):
+    """Write (or rewrite) one month's file and return (path, rows, bytes, ranges).
+
+    A month that already has a file (rows landed there after it was archived, or
+    a previous run stopped before its deletes finished) is merged with the hot
+    rows in key order; rows present in both are written once. `ranges` covers
+    the hot rows that were written, as (first key, last key, rows) batches.
+    """
+    model, time_key, id_key = ARCHIVED_TABLES[table_name]
+    path = partition_path(table_name, period_start)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    sort_key = lambda record: (record[time_key], record[id_key])
+    ranges = []
+    hot = crud_archive.month_rows(db, model, time_key, id_key, period_start, period_end, batch_size)
+    records = map(_to_record, _key_ranges(hot, time_key, id_key, ranges, batch_size))
+    if os.path.exists(path):
+        records = heapq.merge(_read_records(path), records, key=sort_key)
+
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+    tmp = path + ".tmp"
+    count = 0
+    previous = None
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        for record in records:
+            key = sort_key(record)
+            if key == previous:
+                continue
+            previous = key
+            f.write(dumps(record) + "\n")
+            count += 1
+    os.replace(tmp, path)
+    return path, count, os.path.getsize(path), ranges
+
+def archive_month(session_factory, table_name: str, period_start: datetime, batch_size: int = ARCHIVE_BATCH_SIZE):
+    """Move one month of `table_name` to its archive file. Returns rows moved, or None if it must wait.
+
+    Only rows that went into the file are deleted: each batch deletes the key
+    range it wrote and must remove exactly as many rows. A row that landed in
+    the month afterwards is outside every range, or makes its range's count
+    differ, and stays hot until the next run merges it into the file.
+    """
+    model, time_key, id_key = ARCHIVED_TABLES[table_name]
+    period_end = add_months(period_start, 1)
+
+    # 1. File first, then its catalogue row: a crash before the deletes leaves
+    #    rows that are in both places, which the next run merges away
+    db = session_factory()
+    try:
+        if table_name == "messages" and crud_archive.in_flight_messages(db, period_start, period_end):
+            return None
+        path, rows, size, ranges = _write_partition(db, table_name, period_start, period_end, batch_size)
+        crud_archive.record_partition(db, table_name, period_start, period_end, path, rows, size)
+        db.commit()
+    finally:
+        db.close()
+
+    # 2. Drop the archived rows from the hot table in short transactions
+    moved = 0
+    for first, last, expected in ranges:
+        db = session_factory()
+        try:
+            deleted = crud_archive.delete_key_range(db, model, time_key, id_key, first, last)
+            if deleted != expected:
+                db.rollback()
+                logger.warning("Archiving %s %s: %d rows in a range that wrote %d; keeping them hot after %d moved",
+                               table_name, f"{period_start:%Y-%m}", deleted, expected, moved)
+                return None
+            db.commit()
+        finally:
+            db.close()
+        moved += deleted
+    return moved
+
+def archive_partitions(session_factory, retention_months: int, now: datetime = None):
+    """Archive every whole month older than the retention window, oldest first.
+
+    retention_months is always explicit: 0 here means "archive every closed and
+    current month", not "disabled".
+
+    Months are taken in order and a table stops at the first one that still has
+    in-flight messages, so the archive always holds a prefix of the history and
+    exports can stream it ahead of the hot rows.
+    """
+    start = time.perf_counter()
+    cutoff = add_months(month_start(now or datetime.utcnow()), 1 - retention_months)
+    report = {}
+    for table_name, (model, time_key, _) in ARCHIVED_TABLES.items():
+        months = rows = 0
+        while True:
+            db = session_factory()
+            try:
+                oldest = crud_archive.oldest_before(db, model, time_key, cutoff)
+            finally:
+                db.close()
+            if oldest is None:
+                break
+            moved = archive_month(session_factory, table_name, month_start(oldest))
+            if moved is None:
+                logger.info("Archiving %s stopped at %s: rows still in flight or changed since the file was written",
+                            table_name, f"{oldest:%Y-%m}")
+                break
+            months += 1
+            rows += moved
+        report[table_name] = {"months": months, "rows": rows}
+    elapsed = time.perf_counter() - start
+    if any(entry["rows"] for entry in report.values()):
+        logger.info("Archived %s older than %s (%.3fs)", report, f"{cutoff:%Y-%m}", elapsed)
+    return {**report, "cutoff": cutoff.isoformat(), "seconds": round(elapsed, 3)}
+
+def archived_rows(table_name: str, keys: list, user_id: str = None, start: datetime = None, end: datetime = None,
+                  chunk_size: int = ARCHIVE_BATCH_SIZE):
+    """Yield batches of archived rows (tuples in `keys` order) for an export.
+
+    Only files whose month overlaps [start, end) are opened. Values come back as
+    stored: datetimes are ISO strings, exactly as the export would write them.
+    """
+    _, time_key, _ = ARCHIVED_TABLES[table_name]
+    db = database.ReadSessionLocal()
+    try:
+        partitions = [p.path for p in crud_archive.list_partitions(db, table_name, start, end)]
+    finally:
+        db.close()
+    # ISO strings of naive UTC datetimes sort like the datetimes themselves
+    low = start.isoformat() if start is not None else None
+    high = end.isoformat() if end is not None else None
+    batch = []
+    for path in partitions:
+        for record in _read_records(path):
+            if user_id and record["user_id"] != user_id:
+                continue
+            if (low and record[time_key] < low) or (high and record[time_key] >= high):
+                continue
+            batch.append(tuple(record.get(key) for key in keys))
+            if len(batch) >= chunk_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,66 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class PeriodicTask:
+    """Runs `func()` every `interval` seconds on a daemon thread.
+
+    Keeps simple run statistics (count, duration, last result) so callers can
+    report on maintenance work without extra bookkeeping.
+    """
+
+    def __init__(self, name: str, interval: float, func):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.runs = 0
+        self.last_started_at = None
+        self.last_duration_seconds = None
+        self.last_result = None
+        self.last_error = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self):
+        self.last_started_at = time.time()
+        start = time.perf_counter()
+        try:
+            self.last_result = self.func()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.exception("Periodic task %s failed", self.name)
+        finally:
+            self.last_duration_seconds = time.perf_counter() - start
+            self.runs += 1
+        return self.last_result
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "last_started_at": self.last_started_at,
+            "last_duration_seconds": self.last_duration_seconds,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
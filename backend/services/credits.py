@@ -1,13 +1,28 @@
+import os
+import uuid
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from .. import schemas
-from ..crud import credits as crud_credits
+import models, schemas
+from crud import credits as crud_credits
+from crud import wallet as crud_wallet
+from crud import reseller_stats as crud_reseller_stats
+from services.idempotency import idempotency_store
+
+# Upper bound on items accepted by /credits/distribute-bulk in one call
+MAX_BULK_DISTRIBUTION = int(os.getenv("MAX_BULK_DISTRIBUTION", "10000"))
+
+def _id_list(ids, shown: int = 20) -> str:
+    listed = ", ".join(ids[:shown])
+    return listed if len(ids) <= shown else f"{listed} and {len(ids) - shown} more"
 
 class CreditService:
     def __init__(self, db: Session):
         self.db = db
 
-    def distribute(self, data: schemas.CreditDistributionCreate):
+    def distribute(self, data: schemas.CreditDistributionCreate, commit: bool = True):
+        # commit=False flushes and leaves the transaction to the caller
         # 1. Fetch Actors
         reseller = crud_credits.get_reseller(self.db, data.from_reseller_id)
         if not reseller:
@@ -18,24 +33,30 @@ class CreditService:
             raise HTTPException(status_code=404, detail="Business User not found")
 
         # 2. Validation
+        if data.credits <= 0:
+            raise HTTPException(status_code=400, detail="Credits must be positive")
+
         if business_user.parent_reseller_id != reseller.user_id:
             raise HTTPException(status_code=403, detail="Reseller does not own this Business User")
 
-        if reseller.available_credits < data.credits:
+        # 3. Execution (Atomic): the reseller debit is a conditional UPDATE, so two
+        # concurrent distributions can never both spend the same balance
+        amount = models.to_micro(data.credits)
+        if crud_wallet.debit_reseller(self.db, reseller.user_id, amount) is None:
+            self.db.rollback()
             raise HTTPException(status_code=400, detail="Insufficient credits")
 
-        # 3. Execution (Atomic)
         try:
-            reseller.available_credits -= data.credits
-            reseller.used_credits += data.credits
-            
-            business_user.credits_allocated += data.credits
-            business_user.credits_remaining += data.credits
+            crud_wallet.allocate_to_business_user(self.db, business_user.user_id, amount)
+            crud_reseller_stats.add_distributed(self.db, reseller.user_id, amount)
             
             # Create Transaction Record
             db_tx = crud_credits.create_transaction(self.db, data)
             
-            self.db.commit()
+            if commit:
+                self.db.commit()
+            else:
+                self.db.flush()
             self.db.refresh(db_tx)
             return db_tx
             
@@ -43,5 +64,97 @@ class CreditService:
             self.db.rollback()
             raise HTTPException(status_code=500, detail=str(e))
 
-    def get_history(self, reseller_id: str = None, business_user_id: str = None, skip: int = 0, limit: int = 100):
-        return crud_credits.get_history(self.db, reseller_id, business_user_id, skip, limit)
+    def distribute_bulk(self, data: schemas.CreditBulkDistributionCreate):
+        """One reseller to many business users: all items succeed or none do."""
+        if not data.items:
+            raise HTTPException(status_code=400, detail="No items to distribute")
+        if len(data.items) > MAX_BULK_DISTRIBUTION:
+            raise HTTPException(status_code=400, detail=f"Too many items. Maximum: {MAX_BULK_DISTRIBUTION}")
+        if any(item.credits <= 0 for item in data.items):
+            raise HTTPException(status_code=400, detail="Credits must be positive")
+        amounts = {}
+        for item in data.items:
+            if item.business_user_id in amounts:
+                raise HTTPException(status_code=400, detail=f"Duplicate business_user_id: {item.business_user_id}")
+            amounts[item.business_user_id] = models.to_micro(item.credits)
+
+        # 1. Ownership for every recipient in one IN query
+        parents = crud_credits.get_parent_resellers(self.db, amounts.keys())
+        missing = [user_id for user_id in amounts if user_id not in parents]
+        foreign = [user_id for user_id, parent in parents.items() if parent != data.from_reseller_id]
+        # An unknown reseller owns no one: report it before the recipients, as distribute does.
+        # When every recipient is owned the reseller exists, so the success path skips this read.
+        if (missing or foreign) and not crud_credits.get_reseller(self.db, data.from_reseller_id):
+            raise HTTPException(status_code=404, detail="Reseller not found")
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Business User not found: {_id_list(missing)}")
+        if foreign:
+            raise HTTPException(status_code=403, detail=f"Reseller does not own Business User: {_id_list(foreign)}")
+
+        # 2. One conditional debit for the total
+        total = sum(amounts.values())
+        balance = crud_wallet.debit_reseller(self.db, data.from_reseller_id, total)
+        if balance is None:
+            self.db.rollback()
+            if not crud_credits.get_reseller(self.db, data.from_reseller_id):
+                raise HTTPException(status_code=404, detail="Reseller not found")
+            raise HTTPException(status_code=400, detail="Insufficient credits")
+
+        # 3. Wallets, rollup and history rows in bulk, one commit
+        try:
+            now = datetime.utcnow()
+            transactions = [
+                {
+                    "distribution_id": str(uuid.uuid4()),
+                    "from_reseller_id": data.from_reseller_id,
+                    "to_business_user_id": item.business_user_id,
+                    "credits_shared": item.credits,
+                    "shared_at": now,
+                }
+                for item in data.items
+            ]
+            crud_wallet.allocate_to_business_users(self.db, amounts)
+            crud_reseller_stats.add_distributed(self.db, data.from_reseller_id, total)
+            crud_credits.bulk_insert_transactions(self.db, transactions)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+
+        return {
+            "from_reseller_id": data.from_reseller_id,
+            "distributed": len(transactions),
+            "total_credits": models.from_micro(total),
+            "reseller_available_credits": models.from_micro(balance),
+            "transactions": transactions,
+        }
+
+    def get_history(self, reseller_id: str = None, business_user_id: str = None, skip: int = 0, limit: int = 100, cursor: str = None):
+        # Returns (page, next_cursor)
+        return crud_credits.get_history(self.db, reseller_id, business_user_id, skip, limit, cursor)
+
+class AsyncCreditService:
+    """CreditService for async handlers.
+
+    The sync logic runs through AsyncSession.run_sync, so its statements go over
+    the async driver without blocking the event loop and the rules live in one place.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def distribute(self, data: schemas.CreditDistributionCreate, idempotency_key: str = None):
+        def distribute(session):
+            service = CreditService(session)
+            if idempotency_key is None:
+                return schemas.CreditTransactionRead.model_validate(service.distribute(data))
+            return idempotency_store.run(
+                session, "POST /credits/distribute", idempotency_key, data,
+                lambda: schemas.CreditTransactionRead.model_validate(service.distribute(data, commit=False))
+            )
+        return await self.db.run_sync(distribute)
+
+    async def get_history(self, reseller_id: str = None, business_user_id: str = None, skip: int = 0, limit: int = 100, cursor: str = None):
+        return await self.db.run_sync(
+            lambda session: CreditService(session).get_history(reseller_id, business_user_id, skip, limit, cursor)
+        )
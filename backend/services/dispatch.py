@@ -0,0 +1,157 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+import metrics, models, database
+from crud import dispatch as crud_dispatch
+from crud import holds as crud_holds
+from services.gateway import GatewayError, send_via_gateway
+from services.rate_limit import rate_limiter
+from services.usage import record_usage
+
+logger = logging.getLogger(__name__)
+
+# Worker pool sizing; override per deployment through the environment
+DISPATCH_WORKERS = int(os.getenv("DISPATCH_WORKERS", "4"))
+DISPATCH_BATCH_SIZE = int(os.getenv("DISPATCH_BATCH_SIZE", "50"))
+DISPATCH_POLL_INTERVAL = float(os.getenv("DISPATCH_POLL_INTERVAL", "1.0"))
+# A "sending" row claimed longer ago than this belongs to a dead process and is
+# requeued; keep it well above the time one batch takes to deliver
+DISPATCH_LEASE_TIMEOUT = float(os.getenv("DISPATCH_LEASE_TIMEOUT", "300"))
+
+class Dispatcher:
+    """Drains the outbound queue (messages with status "queued").
+
+    Each worker claims a batch (queued -> sending, stamped with a lease), hands
+    each message whose sender has a rate-limit token to the gateway, then records
+    the outcome (sending -> sent | failed, or back to queued with a not-before
+    time when throttled) in one commit. Workers never sleep on a rate limit.
+    Failed messages are refunded to their credit hold, or to the wallet.
+    """
+
+    def __init__(self, session_factory, gateway=send_via_gateway, limiter=None, workers: int = DISPATCH_WORKERS,
+                 batch_size: int = DISPATCH_BATCH_SIZE, poll_interval: float = DISPATCH_POLL_INTERVAL,
+                 lease_timeout: float = DISPATCH_LEASE_TIMEOUT):
+        self.session_factory = session_factory
+        self.gateway = gateway
+        self.limiter = limiter
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+        self._threads = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Condition()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        self.requeue_expired()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"dispatch-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def requeue_expired(self):
+        """Return "sending" rows whose lease has expired to the queue. Returns the count."""
+        db = self.session_factory()
+        try:
+            recovered = crud_dispatch.requeue_expired(db, datetime.utcnow() - timedelta(seconds=self.lease_timeout))
+            db.commit()
+        finally:
+            db.close()
+        if recovered:
+            logger.info("Dispatcher requeued %d messages with expired leases", recovered)
+            self.notify()
+        return recovered
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self.notify()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        # Called after new rows are queued so idle workers don't wait for the next poll
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def drain(self):
+        """Process batches until the queue is empty. Returns the number of messages handled."""
+        handled = 0
+        while True:
+            count = self._process_batch()
+            if not count:
+                return handled
+            handled += count
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                count = self._process_batch()
+            except Exception:
+                logger.exception("Dispatcher batch failed")
+                count = 0
+            if not count:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+
+    def _process_batch(self):
+        db = self.session_factory()
+        try:
+            claimed = crud_dispatch.claim_queued(db, self.batch_size)
+            db.commit()
+            if not claimed:
+                return 0
+
+            # Messages whose sender is out of tokens go back to the queue with a
+            # not-before time instead of holding this worker; each later one from
+            # the same sender is spaced one token interval further out
+            now = datetime.utcnow()
+            sent, failed, deferred = [], [], []
+            backlog = {}
+            for message in claimed:
+                if self.limiter is not None:
+                    wait = self.limiter.try_acquire(message["mode"], message["sender_number"], message["user_id"])
+                    if wait:
+                        key = (message["mode"], message["sender_number"])
+                        position = backlog[key] = backlog.get(key, -1) + 1
+                        wait += position / self.limiter.rate(message["mode"], message["user_id"])
+                        deferred.append((message["message_id"], now + timedelta(seconds=wait)))
+                        continue
+                try:
+                    self.gateway(message)
+                    sent.append(message)
+                except GatewayError as e:
+                    logger.warning("Message %s failed: %s", message["message_id"], e)
+                    failed.append(message)
+                except Exception:
+                    logger.exception("Gateway error for message %s", message["message_id"])
+                    failed.append(message)
+
+            crud_dispatch.defer(db, deferred)
+            crud_dispatch.mark_status(db, [m["message_id"] for m in sent], "sent")
+            crud_dispatch.mark_status(db, [m["message_id"] for m in failed], "failed")
+            for message in failed:
+                record_usage(db, message["user_id"], [
+                    (message["sent_at"], message["mode"], message["message_type"], -models.to_micro(message["credits_used"]), -1)
+                ])
+                if message["hold_id"] and crud_holds.give_back(db, message["hold_id"], models.to_micro(message["credits_used"])):
+                    continue
+                crud_dispatch.refund(db, message["user_id"], message["message_id"], message["credits_used"])
+            db.commit()
+            for message in sent:
+                metrics.record_messages(message["mode"], "sent")
+            for message in failed:
+                metrics.record_messages(message["mode"], "failed", 1, message["credits_used"])
+            return len(claimed)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+# Outbound queue workers (queued -> sending -> sent/failed), started by the app lifespan
+dispatcher = Dispatcher(database.SessionLocal, limiter=rate_limiter)
@@ -0,0 +1,71 @@
+import csv
+import io
+import itertools
+import json
+import os
+from datetime import datetime
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+import database
+
+# Rows fetched per round trip (server-side cursor on PostgreSQL)
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _ndjson_chunks(keys, partitions):
+    dumps = json.JSONEncoder(default=_json_default, separators=(",", ":")).encode
+    for rows in partitions:
+        yield "".join(dumps(dict(zip(keys, row))) + "\n" for row in rows)
+
+def _csv_chunks(keys, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(keys)
+    for rows in partitions:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def stream_rows(statement, fmt: str, chunk_size: int = EXPORT_CHUNK_SIZE, archived=None):
+    """Yield the statement's rows as NDJSON or CSV text, one chunk per fetched batch.
+
+    Uses its own read-engine session: the response body is produced after the
+    request's dependencies have been torn down. `archived(keys, chunk_size)`, if
+    given, yields row batches from cold storage; they are older than anything
+    left in the table, so they stream first.
+    """
+    db = database.ReadSessionLocal()
+    try:
+        result = db.execute(statement, execution_options={"yield_per": chunk_size})
+        keys = list(result.keys())
+        partitions = result.partitions()
+        if archived is not None:
+            partitions = itertools.chain(archived(keys, chunk_size), partitions)
+        chunks = _csv_chunks if fmt == "csv" else _ndjson_chunks
+        yield from chunks(keys, partitions)
+    finally:
+        db.close()
+
+def export_response(statement, fmt: str, name: str, archived=None):
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{fmt}' (use ndjson or csv)")
+    return StreamingResponse(
+        stream_rows(statement, fmt, archived=archived),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
@@ -0,0 +1,14 @@
+import os
+import time
+
+# Simulated provider round trip, to exercise the dispatcher under realistic latency
+GATEWAY_LATENCY_MS = float(os.getenv("GATEWAY_LATENCY_MS", "0"))
+
+class GatewayError(Exception):
+    """Raised when the WhatsApp API / Unofficial Gateway rejects a message."""
+
+def send_via_gateway(message: dict):
+    # In production, this would call WhatsApp API (official) or the Unofficial Gateway,
+    # picked by message["mode"]. Raise GatewayError on a permanent failure.
+    if GATEWAY_LATENCY_MS:
+        time.sleep(GATEWAY_LATENCY_MS / 1000.0)
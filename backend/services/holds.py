@@ -0,0 +1,125 @@
+import os
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+import models, schemas
+from crud import holds as crud_holds
+from crud import wallet as crud_wallet
+from crud import reseller_stats as crud_reseller_stats
+
+# How often consumed hold credits are booked to the wallet (seconds)
+HOLD_SETTLE_INTERVAL = float(os.getenv("HOLD_SETTLE_INTERVAL", "5"))
+
+def draw_hold(db: Session, hold_id: str, user_id: str, amount: int) -> int:
+    """Take `amount` from the hold in the caller's transaction. Returns the credits left in it.
+
+    One conditional UPDATE on the credit_holds row, like a wallet debit, so every
+    process sees the same balance and a rollback gives the credits back.
+    """
+    remaining = crud_holds.draw(db, hold_id, user_id, amount)
+    if remaining is not None:
+        return remaining
+    db.rollback()
+    db_hold = crud_holds.get_hold(db, hold_id)
+    if db_hold is None or db_hold.status != "active":
+        raise HTTPException(status_code=404, detail="Credit hold not found or already released")
+    if db_hold.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Credit hold belongs to another user")
+    available = db_hold.reserved_micro - db_hold.consumed_micro
+    raise HTTPException(status_code=400, detail=f"Insufficient credits in hold. Required: {models.from_micro(amount)}, Available: {models.from_micro(available)}")
+
+class CreditHoldService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def reserve(self, data: schemas.CreditHoldCreate):
+        # One wallet write for the whole campaign
+        amount = models.to_micro(data.credits)
+        if crud_wallet.hold_business_user(self.db, data.user_id, amount) is None:
+            self.db.rollback()
+            user = crud_holds.get_business_user(self.db, data.user_id)
+            if not user:
+                raise HTTPException(status_code=404, detail="Business User not found")
+            raise HTTPException(status_code=400, detail=f"Insufficient credits. Required: {data.credits}, Available: {user.credits_remaining}")
+
+        try:
+            db_hold = crud_holds.create_hold(self.db, data.user_id, amount, data.campaign_name)
+            self.db.commit()
+            self.db.refresh(db_hold)
+        except Exception as e:
+            self.db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+
+        return self.to_schema(db_hold)
+
+    def get(self, hold_id: str):
+        db_hold = crud_holds.get_hold(self.db, hold_id)
+        if not db_hold:
+            raise HTTPException(status_code=404, detail="Credit hold not found")
+        return self.to_schema(db_hold)
+
+    def release(self, hold_id: str):
+        """Book what the hold consumed and return the unused credits to the wallet."""
+        try:
+            # Closing is conditional on status = 'active', so a hold is released once
+            # and no draw or settlement can land after it
+            closed = crud_holds.close_hold(self.db, hold_id)
+            if closed is None:
+                self.db.rollback()
+                if not crud_holds.get_hold(self.db, hold_id):
+                    raise HTTPException(status_code=404, detail="Credit hold not found")
+                raise HTTPException(status_code=400, detail="Credit hold already released")
+            user_id, reserved, consumed, settled = closed
+            balance = crud_wallet.settle_business_user_hold(self.db, user_id, consumed - settled, reserved - consumed)
+            if consumed != settled:
+                self._log_settlement(user_id, consumed - settled, balance)
+                crud_reseller_stats.add_usage(self.db, user_id, consumed - settled)
+            crud_holds.mark_settled(self.db, hold_id, consumed)
+            self.db.commit()
+        except HTTPException:
+            raise
+        except Exception as e:
+            self.db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+
+        return self.get(hold_id)
+
+    def settle_pending(self):
+        """Book consumption of every active hold to its wallet in one transaction."""
+        settled = 0
+        try:
+            for hold_id, user_id, consumed, already in crud_holds.unsettled_holds(self.db):
+                # Another process settled this hold since the read: leave it to them
+                if not crud_holds.claim_settlement(self.db, hold_id, already, consumed):
+                    continue
+                balance = crud_wallet.settle_business_user_hold(self.db, user_id, consumed - already)
+                self._log_settlement(user_id, consumed - already, balance)
+                crud_reseller_stats.add_usage(self.db, user_id, consumed - already)
+                settled += 1
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return settled
+
+    def _log_settlement(self, user_id: str, amount: int, balance: int):
+        # One UsageLog per settlement instead of one per message
+        self.db.add(models.UsageLog(
+            user_id=user_id,
+            message_id=None,
+            credits_deducted=models.from_micro(amount),
+            balance_after=models.from_micro(balance),
+        ))
+
+    def to_schema(self, db_hold: models.CreditHold):
+        active = db_hold.status == "active"
+        return {
+            "hold_id": db_hold.hold_id,
+            "user_id": db_hold.user_id,
+            "campaign_name": db_hold.campaign_name,
+            "status": db_hold.status,
+            "credits_reserved": models.from_micro(db_hold.reserved_micro),
+            "credits_consumed": models.from_micro(db_hold.consumed_micro),
+            "credits_settled": models.from_micro(db_hold.settled_micro),
+            "credits_available": models.from_micro(db_hold.reserved_micro - db_hold.consumed_micro) if active else 0.0,
+            "created_at": db_hold.created_at,
+        }
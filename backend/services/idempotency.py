@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from crud import idempotency as crud_idempotency
+from responses import FastJSONResponse
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+# How long a key (and its stored response) is honoured
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# Completed responses kept in memory so a retry storm doesn't reach the database
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+# Claim attempts when the key's row keeps vanishing between the INSERT and the re-read
+IDEMPOTENCY_CLAIM_ATTEMPTS = 3
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "600"))
+# Rows per transaction; keeps each write lock short on SQLite
+IDEMPOTENCY_PURGE_BATCH_SIZE = int(os.getenv("IDEMPOTENCY_PURGE_BATCH_SIZE", "5000"))
+
+class StoredResponse:
+    __slots__ = ("request_hash", "status_code", "body", "expires_at")
+
+    def __init__(self, request_hash, status_code, body, expires_at):
+        self.request_hash = request_hash
+        self.status_code = status_code # None while the first request is still running
+        self.body = body
+        self.expires_at = expires_at
+
+def request_hash(payload: BaseModel) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+class IdempotencyStore:
+    """Runs a write at most once per (scope, Idempotency-Key).
+
+    The key row is claimed inside the request's own transaction, before the
+    wallet is touched, and the response is written to it before the single
+    commit, so the claim, the work and the response land together or not at
+    all. A retry finds it (front cache first, then idempotency_keys) and gets
+    the stored response; a concurrent duplicate fails on the primary key and
+    does the same. Failed requests are not stored, so the client can retry them.
+    """
+
+    def __init__(self, maxsize: int = IDEMPOTENCY_CACHE_SIZE, ttl: float = IDEMPOTENCY_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.db_hits = 0
+        self.executions = 0
+        self.conflicts = 0
+
+    def run(self, db: Session, scope: str, key: str, payload: BaseModel, work) -> Response:
+        """Return the stored response for this key, or call work() and commit its result with the key.
+
+        work() must flush rather than commit, leaving the transaction open.
+        """
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_KEY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+        digest = request_hash(payload)
+
+        stored = self._cached(scope, key)
+        if stored is not None:
+            self.cache_hits += 1
+            return self._replay(stored, digest)
+
+        now = datetime.utcnow()
+        for _ in range(IDEMPOTENCY_CLAIM_ATTEMPTS):
+            row = crud_idempotency.get_key(db, scope, key)
+            if row is not None and row.expires_at <= now:
+                # Expired but not purged yet: the key is free again
+                crud_idempotency.delete_key(db, scope, key)
+                row = None
+            if row is not None:
+                self.db_hits += 1
+                stored = StoredResponse(row.request_hash, row.status_code, row.response_body, row.expires_at)
+                if stored.status_code is not None:
+                    self._remember(scope, key, stored)
+                return self._replay(stored, digest)
+            try:
+                crud_idempotency.claim(db, scope, key, digest, now + timedelta(seconds=self.ttl))
+                break
+            except IntegrityError:
+                # Another request claimed the key first; answer from its row on the next
+                # pass, or claim again if that request rolled back or the row was purged
+                db.rollback()
+                self.conflicts += 1
+        else:
+            # Never run the work without holding the claim
+            raise HTTPException(status_code=409, detail=f"A request with this {IDEMPOTENCY_KEY_HEADER} is still in progress")
+
+        try:
+            result = work()
+        except Exception:
+            # Services roll back on their own errors; make sure the claim goes with them
+            db.rollback()
+            raise
+        self.executions += 1
+        response = FastJSONResponse(jsonable_encoder(result), headers={REPLAYED_HEADER: "false"})
+        body = response.body.decode()
+        if not crud_idempotency.store_response(db, scope, key, response.status_code, body):
+            # The claim row is gone, so the response could not be kept: undo the work
+            db.rollback()
+            raise HTTPException(status_code=409, detail=f"{IDEMPOTENCY_KEY_HEADER} claim was lost; retry the request")
+        db.commit()
+        self._remember(scope, key, StoredResponse(digest, response.status_code, body, now + timedelta(seconds=self.ttl)))
+        return response
+
+    def _replay(self, stored: StoredResponse, digest: str) -> Response:
+        if stored.request_hash != digest:
+            raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_KEY_HEADER} was already used with a different request body")
+        if stored.status_code is None:
+            raise HTTPException(status_code=409, detail=f"A request with this {IDEMPOTENCY_KEY_HEADER} is still in progress")
+        return Response(stored.body, status_code=stored.status_code, media_type="application/json",
+                        headers={REPLAYED_HEADER: "true"})
+
+    def _cached(self, scope: str, key: str):
+        with self._lock:
+            stored = self._entries.get((scope, key))
+            if stored is None:
+                return None
+            if stored.expires_at <= datetime.utcnow():
+                del self._entries[(scope, key)]
+                return None
+            self._entries.move_to_end((scope, key))
+            return stored
+
+    def _remember(self, scope: str, key: str, stored: StoredResponse):
+        with self._lock:
+            self._entries[(scope, key)] = stored
+            self._entries.move_to_end((scope, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "max_size": self.maxsize,
+            "cache_hits": self.cache_hits,
+            "db_hits": self.db_hits,
+            "executions": self.executions,
+            "conflicts": self.conflicts,
+        }
+
+idempotency_store = IdempotencyStore()
+
+def purge_expired_keys(session_factory, batch_size: int = IDEMPOTENCY_PURGE_BATCH_SIZE):
+    """Delete expired idempotency keys in batches, committing after each."""
+    start = time.perf_counter()
+    now = datetime.utcnow()
+    purged = 0
+    batches = 0
+    while True:
+        db = session_factory()
+        try:
+            deleted = crud_idempotency.delete_expired(db, now, batch_size)
+            db.commit()
+        finally:
+            db.close()
+        if not deleted:
+            break
+        purged += deleted
+        batches += 1
+        if deleted < batch_size:
+            break
+    elapsed = time.perf_counter() - start
+    if purged:
+        logger.info("Purged %d expired idempotency keys in %d batches (%.3fs)", purged, batches, elapsed)
+    return {"rows_purged": purged, "batches": batches, "seconds": round(elapsed, 3)}
@@ -0,0 +1,165 @@
+import csv
+import io
+import os
+import uuid
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import models
+from crud import business_users as crud_business_users
+from crud import reseller_stats as crud_reseller_stats
+
+# Rows validated, duplicate-checked and inserted per transaction
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Upper bound on data rows accepted by one /business-users/import upload
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "100000"))
+
+REQUIRED_COLUMNS = ("name", "username", "email", "password")
+OPTIONAL_COLUMNS = (
+    "phone", "whatsapp_mode", "business_name", "business_description", "erp_system", "gstin",
+    "full_address", "pincode", "country",
+)
+WHATSAPP_MODES = ("official", "unofficial")
+
+class BusinessUserImportService:
+    """CSV onboarding: reads the upload in chunks, checks each chunk's emails and
+    usernames with one IN query each, bulk-inserts the valid rows and commits per
+    chunk. Rows that fail are reported by CSV line and skipped; the rest import."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def import_csv(self, stream, parent_reseller_id: str):
+        reseller = self.db.query(models.MasterUser.user_id).filter(models.MasterUser.user_id == parent_reseller_id).first()
+        if not reseller:
+            raise HTTPException(status_code=404, detail="Parent Reseller not found")
+
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        try:
+            reader = csv.DictReader(text)
+            missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+            if missing:
+                raise HTTPException(status_code=400, detail=f"Missing CSV columns: {', '.join(missing)}")
+
+            report = {"parent_reseller_id": parent_reseller_id, "rows": 0, "imported": 0, "rejected": 0, "errors": []}
+            # email/username -> CSV line of the row that claimed it earlier in this file
+            seen_emails, seen_usernames = {}, {}
+            chunk = []
+            for row in reader:
+                report["rows"] += 1
+                if report["rows"] > IMPORT_MAX_ROWS:
+                    # Earlier chunks are already committed; say so rather than pretend nothing happened
+                    raise HTTPException(status_code=400, detail=(
+                        f"Too many rows. Maximum: {IMPORT_MAX_ROWS}; "
+                        f"{report['imported']} rows before the limit were imported"
+                    ))
+                chunk.append((reader.line_num, row))
+                if len(chunk) >= IMPORT_CHUNK_SIZE:
+                    self._import_chunk(parent_reseller_id, chunk, seen_emails, seen_usernames, report)
+                    chunk = []
+            if chunk:
+                self._import_chunk(parent_reseller_id, chunk, seen_emails, seen_usernames, report)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+        except csv.Error as e:
+            raise HTTPException(status_code=400, detail=f"Malformed CSV: {e}")
+        finally:
+            # The upload owns the underlying file
+            text.detach()
+
+        report["rejected"] = report["rows"] - report["imported"]
+        return report
+
+    def _import_chunk(self, reseller_id: str, chunk, seen_emails: dict, seen_usernames: dict, report: dict):
+        # A concurrent signup can take an email between the check and the insert;
+        # the retry sees it in the IN query and reports that row instead
+        for attempt in range(2):
+            errors, rows, claimed = [], [], []
+            valid = []
+            for line, raw in chunk:
+                values, error = self._clean(raw)
+                if error:
+                    errors.append({"row": line, "email": (raw.get("email") or "").strip() or None, "error": error})
+                else:
+                    valid.append((line, values))
+
+            emails = crud_business_users.taken_emails(self.db, {values["email"] for _, values in valid})
+            usernames = crud_business_users.taken_usernames(self.db, {values["username"] for _, values in valid})
+            now = datetime.utcnow()
+            for line, values in valid:
+                error = None
+                if values["email"] in seen_emails:
+                    error = f"Duplicate email in file (row {seen_emails[values['email']]})"
+                elif values["username"] in seen_usernames:
+                    error = f"Duplicate username in file (row {seen_usernames[values['username']]})"
+                elif values["email"] in emails:
+                    error = "Email already registered"
+                elif values["username"] in usernames:
+                    error = "Username already taken"
+                if error:
+                    errors.append({"row": line, "email": values["email"], "error": error})
+                    continue
+                seen_emails[values["email"]] = line
+                seen_usernames[values["username"]] = line
+                claimed.append((line, values))
+                rows.append(self._row(reseller_id, values, now))
+
+            try:
+                crud_business_users.bulk_insert_business_users(self.db, rows)
+                if rows:
+                    crud_reseller_stats.add_business_users(self.db, reseller_id, len(rows))
+                self.db.commit()
+            except IntegrityError:
+                self.db.rollback()
+                for _, values in claimed:
+                    seen_emails.pop(values["email"], None)
+                    seen_usernames.pop(values["username"], None)
+                if attempt == 0:
+                    continue
+                errors.extend({"row": line, "email": values["email"], "error": "Conflicting concurrent signup; retry this row"}
+                              for line, values in claimed)
+                rows = []
+            break
+
+        report["imported"] += len(rows)
+        report["errors"].extend(sorted(errors, key=lambda error: error["row"]))
+
+    def _clean(self, raw: dict):
+        values = {}
+        for column in REQUIRED_COLUMNS:
+            value = (raw.get(column) or "").strip()
+            if not value:
+                return None, f"Missing {column}"
+            values[column] = value
+        for column in OPTIONAL_COLUMNS:
+            value = (raw.get(column) or "").strip()
+            values[column] = value or None
+        if "@" not in values["email"]:
+            return None, "Invalid email"
+        values["whatsapp_mode"] = values["whatsapp_mode"] or "official"
+        if values["whatsapp_mode"] not in WHATSAPP_MODES:
+            return None, f"Invalid whatsapp_mode: {values['whatsapp_mode']}"
+        return values, None
+
+    def _row(self, reseller_id: str, values: dict, now: datetime) -> dict:
+        return {
+            "user_id": str(uuid.uuid4()),
+            "parent_reseller_id": reseller_id,
+            "role": "business_owner",
+            "status": "active",
+            "whatsapp_mode": values["whatsapp_mode"],
+            "name": values["name"],
+            "username": values["username"],
+            "email": values["email"],
+            "phone": values["phone"],
+            "password_hash": "hashed_" + values["password"],
+            "business_name": values["business_name"],
+            "business_description": values["business_description"],
+            "erp_system": values["erp_system"],
+            "gstin": values["gstin"],
+            "full_address": values["full_address"],
+            "pincode": values["pincode"],
+            "country": values["country"],
+            "created_at": now,
+        }
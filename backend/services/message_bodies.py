@@ -0,0 +1,82 @@
+import os
+import threading
+from collections import Counter, OrderedDict
+from sqlalchemy.orm import Session
+import models
+from crud import message_bodies as crud_message_bodies
+
+# Recently seen body hashes; decides what is shared and skips inserts of stored ones
+MESSAGE_BODY_CACHE_SIZE = int(os.getenv("MESSAGE_BODY_CACHE_SIZE", "10000"))
+
+class MessageBodyStore:
+    """Maps message bodies to the (body_inline, body_hash) columns of a Message row.
+
+    A body over models.MESSAGE_BODY_INLINE_MAX characters is stored once in
+    message_bodies when it repeats: several times in one batch, or already seen
+    by this process. A first sighting stays inline, so one-off bodies cost no
+    hash or extra row. The LRU remembers hashes as "seen" (inline) or "stored";
+    a stored hit skips the insert. Entries are remembered only after the caller
+    commits, and message_bodies rows are never deleted, so a stored entry is
+    always backed by its row.
+    """
+
+    def __init__(self, maxsize: int = MESSAGE_BODY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._known = OrderedDict() # body_hash -> True (stored) | False (seen inline)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def prepare(self, db: Session, bodies: list):
+        """Return ([(body_inline, body_hash)] in input order, pending) and insert new shared bodies.
+
+        Pass `pending` to remember() once the caller has committed.
+        """
+        counts = Counter(body for body in bodies if body is not None and len(body) > models.MESSAGE_BODY_INLINE_MAX)
+        placement = {} # body -> (body_inline, body_hash), decided once per distinct body
+        new = {}
+        seen = []
+        for body, count in counts.items():
+            body_hash = models.message_body_hash(body)
+            state = self._state(body_hash)
+            if state is True:
+                self.hits += 1
+            elif count > 1 or state is False:
+                self.misses += 1
+                new[body_hash] = body
+            else:
+                placement[body] = (body, None)
+                seen.append(body_hash)
+                continue
+            placement[body] = (None, body_hash)
+        crud_message_bodies.insert_missing(db, new)
+        columns = [placement.get(body, (body, None)) for body in bodies]
+        return columns, (list(new), seen)
+
+    def remember(self, pending):
+        stored, seen = pending
+        with self._lock:
+            for body_hash in seen:
+                self._known.setdefault(body_hash, False)
+                self._known.move_to_end(body_hash)
+            for body_hash in stored:
+                self._known[body_hash] = True
+                self._known.move_to_end(body_hash)
+            while len(self._known) > self.maxsize:
+                self._known.popitem(last=False)
+
+    def _state(self, body_hash: str):
+        with self._lock:
+            state = self._known.get(body_hash)
+            if state is not None:
+                self._known.move_to_end(body_hash)
+            return state
+
+    def clear(self):
+        with self._lock:
+            self._known.clear()
+
+    def stats(self):
+        return {"size": len(self._known), "max_size": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+body_store = MessageBodyStore()
@@ -0,0 +1,223 @@
+import uuid
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+import metrics, models, schemas
+from crud import messages as crud_messages
+from crud import wallet as crud_wallet
+from crud import reseller_stats as crud_reseller_stats
+from services.holds import draw_hold
+from services.idempotency import idempotency_store
+from services.message_bodies import body_store
+from services.templates import TemplateNotFound, render_messages
+from services.usage import record_usage
+
+# Upper bound on items accepted by /messages/send-batch in one call
+MAX_BATCH_SIZE = 1000
+
+def message_cost(mode: str) -> float:
+    # Official API typically costs money, Unofficial might be a flat fee or subscription.
+    # We will assume: Official = 1 credit, Unofficial = 0.5 credits
+    return 1.0 if mode == "official" else 0.5
+
+class MessageService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def send(self, msg: schemas.MessageCreate, commit: bool = True):
+        # commit=False flushes and leaves the transaction to the caller (idempotent
+        # requests commit the work together with the stored response)
+        # 0. Render the stored template when no literal body is given, before any charge
+        [(body, error)] = render_messages(self.db, msg.user_id, [msg])
+        if error:
+            raise HTTPException(status_code=404 if isinstance(error, TemplateNotFound) else 400, detail=str(error))
+
+        # 1. Determine Cost (Mock Logic)
+        cost = message_cost(msg.mode)
+
+        # 2. Deduct Credits Atomic: one conditional UPDATE, no balance read first.
+        # Campaign messages draw from their CreditHold row the same way.
+        if msg.hold_id:
+            balance = None
+            draw_hold(self.db, msg.hold_id, msg.user_id, models.to_micro(cost))
+        else:
+            balance = crud_wallet.debit_business_user(self.db, msg.user_id, models.to_micro(cost))
+            if balance is None:
+                self._raise_not_covered(msg.user_id, cost)
+
+        # 3. Queue the message; the Dispatcher (services/dispatch.py) makes the
+        # provider call off the request path
+        try:
+            # 4. Record Message (status queued)
+            [(body_inline, body_hash)], bodies = body_store.prepare(self.db, [body])
+            db_msg = models.Message(
+                message_id=str(uuid.uuid4()),
+                user_id=msg.user_id,
+                mode=msg.mode,
+                sender_number=msg.sender_number,
+                receiver_number=msg.receiver_number,
+                message_type=msg.message_type,
+                template_name=msg.template_name,
+                body_inline=body_inline,
+                body_hash=body_hash,
+                status="queued",
+                credits_used=cost,
+                hold_id=msg.hold_id,
+                sent_at=datetime.utcnow()
+            )
+            self.db.add(db_msg)
+            record_usage(self.db, msg.user_id, [(db_msg.sent_at, msg.mode, msg.message_type, models.to_micro(cost), 1)])
+
+            # 5. Usage Log + reseller rollup (hold usage is booked when the hold settles)
+            if not msg.hold_id:
+                crud_reseller_stats.add_usage(self.db, msg.user_id, models.to_micro(cost))
+                db_log = models.UsageLog(
+                    user_id=msg.user_id,
+                    message_id=db_msg.message_id,
+                    credits_deducted=cost,
+                    balance_after=models.from_micro(balance)
+                )
+                self.db.add(db_log)
+
+            if commit:
+                self.db.commit()
+                body_store.remember(bodies)
+            else:
+                # Not remembered: the bodies are only backed once the caller commits
+                self.db.flush()
+            metrics.record_messages(msg.mode, "queued", 1, cost)
+            self.db.refresh(db_msg)
+            return db_msg
+
+        except Exception as e:
+            self.db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+
+    def _raise_not_covered(self, user_id: str, cost: float):
+        # The debit matched no row: either the user is missing or the balance is short
+        self.db.rollback()
+        user = crud_messages.get_business_user(self.db, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="Business User not found")
+        raise HTTPException(status_code=400, detail=f"Insufficient credits. Required: {cost}, Available: {user.credits_remaining}")
+
+    def send_batch(self, batch: schemas.MessageBatchCreate):
+        if not batch.messages:
+            raise HTTPException(status_code=400, detail="Batch is empty")
+        if len(batch.messages) > MAX_BATCH_SIZE:
+            raise HTTPException(status_code=400, detail=f"Batch too large. Maximum: {MAX_BATCH_SIZE}")
+
+        # 1. Per-item validation; rejected items are reported, not charged
+        # Templates are resolved once per batch and rendered per recipient
+        results = []
+        accepted = []
+        rendered = render_messages(self.db, batch.user_id, batch.messages)
+        for index, (item, (body, error)) in enumerate(zip(batch.messages, rendered)):
+            if item.user_id != batch.user_id:
+                results.append({"index": index, "status": "rejected", "error": "user_id does not match batch user_id"})
+                continue
+            if error:
+                results.append({"index": index, "status": "rejected", "error": str(error)})
+                continue
+            cost = message_cost(item.mode)
+            result = {"index": index, "status": "queued", "message_id": str(uuid.uuid4()), "credits_used": cost}
+            results.append(result)
+            accepted.append((item, result, body))
+
+        total_cost = sum(result["credits_used"] for _, result, _ in accepted)
+
+        # 2. Deduct the total once (from the campaign's CreditHold if given)
+        if batch.hold_id:
+            balance = draw_hold(self.db, batch.hold_id, batch.user_id, models.to_micro(total_cost))
+        else:
+            balance = crud_wallet.debit_business_user(self.db, batch.user_id, models.to_micro(total_cost))
+            if balance is None:
+                self._raise_not_covered(batch.user_id, total_cost)
+
+        # 3. Insert every row, commit once
+        try:
+            now = datetime.utcnow()
+            running = balance + models.to_micro(total_cost)
+            message_rows = []
+            log_rows = []
+            # A campaign's shared template body is hashed and stored once
+            body_columns, bodies = body_store.prepare(self.db, [body for _, _, body in accepted])
+            for (item, result, _), (body_inline, body_hash) in zip(accepted, body_columns):
+                running -= models.to_micro(result["credits_used"])
+                message_rows.append({
+                    "message_id": result["message_id"],
+                    "user_id": batch.user_id,
+                    "mode": item.mode,
+                    "sender_number": item.sender_number,
+                    "receiver_number": item.receiver_number,
+                    "message_type": item.message_type,
+                    "template_name": item.template_name,
+                    "body_inline": body_inline,
+                    "body_hash": body_hash,
+                    "status": "queued",
+                    "credits_used": result["credits_used"],
+                    "hold_id": batch.hold_id,
+                    "sent_at": now,
+                })
+                if batch.hold_id:
+                    continue
+                log_rows.append({
+                    "usage_id": str(uuid.uuid4()),
+                    "user_id": batch.user_id,
+                    "message_id": result["message_id"],
+                    "credits_deducted": result["credits_used"],
+                    "balance_after": models.from_micro(running),
+                    "timestamp": now,
+                })
+
+            crud_messages.bulk_insert_messages(self.db, message_rows)
+            crud_messages.bulk_insert_usage_logs(self.db, log_rows)
+            record_usage(self.db, batch.user_id, [
+                (now, row["mode"], row["message_type"], models.to_micro(row["credits_used"]), 1) for row in message_rows
+            ])
+            if not batch.hold_id:
+                crud_reseller_stats.add_usage(self.db, batch.user_id, models.to_micro(total_cost))
+
+            self.db.commit()
+            body_store.remember(bodies)
+        except Exception as e:
+            self.db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+
+        by_mode = {}
+        for row in message_rows:
+            tally = by_mode.setdefault(row["mode"], [0, 0.0])
+            tally[0] += 1
+            tally[1] += row["credits_used"]
+        for mode, (count, credits) in by_mode.items():
+            metrics.record_messages(mode, "queued", count, credits)
+
+        return {
+            "user_id": batch.user_id,
+            "accepted": len(accepted),
+            "rejected": len(results) - len(accepted),
+            "total_credits_used": total_cost,
+            "balance_after": models.from_micro(balance),
+            "results": results,
+        }
+
+class AsyncMessageService:
+    """MessageService for async handlers, run over the async driver via run_sync."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def send(self, msg: schemas.MessageCreate, idempotency_key: str = None):
+        def send(session):
+            service = MessageService(session)
+            if idempotency_key is None:
+                return schemas.MessageRead.model_validate(service.send(msg))
+            return idempotency_store.run(
+                session, "POST /messages/send", idempotency_key, msg,
+                lambda: schemas.MessageRead.model_validate(service.send(msg, commit=False))
+            )
+        return await self.db.run_sync(send)
+
+    async def send_batch(self, batch: schemas.MessageBatchCreate):
+        return await self.db.run_sync(lambda session: MessageService(session).send_batch(batch))
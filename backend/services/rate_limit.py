@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import models
+
+# Per-mode defaults (messages/second, burst size). Official Cloud API numbers
+# tolerate sustained throughput; WhatsApp Web sessions get banned when they burst.
+MODE_DEFAULTS = {
+    "official": (float(os.getenv("OFFICIAL_RATE_PER_SEC", "80")), int(os.getenv("OFFICIAL_BURST", "80"))),
+    "unofficial": (float(os.getenv("UNOFFICIAL_RATE_PER_SEC", "0.2")), int(os.getenv("UNOFFICIAL_BURST", "3"))),
+}
+# Buckets kept in memory; the least recently used (by then usually refilled) are dropped
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+class TokenBucket:
+    __slots__ = ("user_id", "rate", "burst", "tokens", "updated", "acquired", "total_wait", "max_wait")
+
+    def __init__(self, user_id: str, rate: float, burst: int, now: float):
+        self.user_id = user_id
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.acquired += 1
+            return 0.0
+        wait = (1 - self.tokens) / self.rate
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return wait
+
+class RateLimiter:
+    """In-process token buckets keyed by (mode, sender_number), LRU-bounded."""
+
+    def __init__(self, defaults: dict = None, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.defaults = dict(defaults or MODE_DEFAULTS)
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._overrides = {}
+        self._lock = threading.Lock()
+
+    def _limits(self, mode: str, user_id: str):
+        if user_id in self._overrides:
+            return self._overrides[user_id]
+        return self.defaults.get(mode, self.defaults["official"])
+
+    def load_overrides(self, db):
+        rows = db.query(models.RateLimitOverride).all()
+        with self._lock:
+            self._overrides = {row.user_id: (row.rate_per_second, row.burst) for row in rows}
+
+    def set_override(self, user_id: str, rate: float, burst: int):
+        with self._lock:
+            self._overrides[user_id] = (rate, burst)
+            for bucket in self._buckets.values():
+                if bucket.user_id == user_id:
+                    bucket.rate, bucket.burst = rate, burst
+                    bucket.tokens = min(bucket.tokens, burst)
+
+    def rate(self, mode: str, user_id: str = None) -> float:
+        with self._lock:
+            return self._limits(mode, user_id)[0]
+
+    def try_acquire(self, mode: str, sender_number: str, user_id: str = None) -> float:
+        """Take one token and return 0, or return how many seconds until the sender has one.
+
+        Never blocks: a caller that gets a wait back defers the send rather than sleeping.
+        """
+        now = time.monotonic()
+        key = (mode, sender_number)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate, burst = self._limits(mode, user_id)
+                bucket = self._buckets[key] = TokenBucket(user_id, rate, burst, now)
+                while len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(now)
+
+    def snapshot(self):
+        now = time.monotonic()
+        stats = []
+        with self._lock:
+            for (mode, sender_number), bucket in self._buckets.items():
+                bucket.refill(now)
+                stats.append({
+                    "mode": mode,
+                    "sender_number": sender_number,
+                    "user_id": bucket.user_id,
+                    "rate_per_second": bucket.rate,
+                    "burst": bucket.burst,
+                    "tokens": round(bucket.tokens, 3),
+                    "current_wait_seconds": round(max(0.0, 1 - bucket.tokens) / bucket.rate, 3),
+                    "acquired": bucket.acquired,
+                    "total_wait_seconds": round(bucket.total_wait, 3),
+                    "max_wait_seconds": round(bucket.max_wait, 3),
+                })
+        return stats
+
+rate_limiter = RateLimiter()
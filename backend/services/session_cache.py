@@ -0,0 +1,178 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from fastapi import HTTPException
+
+# Bounded LRU in front of /sessions/validate. Positive entries are trusted for at
+# most SESSION_CACHE_TTL seconds (and never past the session's own expiry), so
+# revocations made by another process are picked up within that window.
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "50000"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "60"))
+# Unknown tokens are remembered briefly to absorb brute-force floods
+SESSION_NEGATIVE_TTL = float(os.getenv("SESSION_NEGATIVE_TTL", "5"))
+
+class CachedSession:
+    __slots__ = ("device_id", "is_valid", "expires_at", "deadline")
+
+    def __init__(self, device_id, is_valid, expires_at, deadline):
+        self.device_id = device_id
+        self.is_valid = is_valid
+        self.expires_at = expires_at
+        self.deadline = deadline
+
+    @property
+    def found(self):
+        return self.device_id is not None
+
+class SessionCache:
+    """Token-hash LRU with per-device and per-token invalidation.
+
+    Invalidations bump a generation counter and record it against the device or
+    token. A lookup takes begin() before reading the database and passes it to
+    put(): if the device or token was invalidated since, the row it read may
+    predate the revocation, so the result is returned but not cached.
+    """
+
+    def __init__(self, maxsize: int = SESSION_CACHE_SIZE, ttl: float = SESSION_CACHE_TTL,
+                 negative_ttl: float = SESSION_NEGATIVE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._by_device = {}
+        self._generation = 0
+        # device_id or token key -> generation of its last invalidation (bounded like
+        # the entries; a lookup older than anything forgotten is not cached)
+        self._invalidated = OrderedDict()
+        self._forgotten = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    @staticmethod
+    def key(token: str) -> str:
+        # Raw tokens are never kept in memory
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str):
+        """Cached entry for the token, or None on a miss. Check `.found` for negative entries."""
+        key = self.key(token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.deadline <= now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if entry.found:
+                self.hits += 1
+            else:
+                self.negative_hits += 1
+            return entry
+
+    def begin(self) -> int:
+        """Generation to pass to put()/put_negative() for a lookup starting now."""
+        with self._lock:
+            return self._generation
+
+    def put(self, token: str, device_id: str, is_valid: str, expires_at: datetime, generation: int = None):
+        remaining = (expires_at - datetime.utcnow()).total_seconds()
+        entry = CachedSession(device_id, is_valid, expires_at, time.monotonic() + max(0.0, min(self.ttl, remaining)))
+        self._store(self.key(token), entry, generation)
+        return entry
+
+    def put_negative(self, token: str, generation: int = None):
+        entry = CachedSession(None, None, None, time.monotonic() + self.negative_ttl)
+        self._store(self.key(token), entry, generation)
+        return entry
+
+    def invalidate_token(self, token: str):
+        key = self.key(token)
+        with self._lock:
+            self._bump(key)
+            if self._drop(key):
+                self.invalidations += 1
+
+    def invalidate_device(self, device_id: str):
+        with self._lock:
+            self._bump(device_id)
+            for key in list(self._by_device.get(device_id, ())):
+                self._drop(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_device.clear()
+
+    def stats(self):
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.maxsize,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts,
+        }
+
+    def _bump(self, name: str):
+        self._generation += 1
+        self._invalidated[name] = self._generation
+        self._invalidated.move_to_end(name)
+        while len(self._invalidated) > self.maxsize:
+            _, generation = self._invalidated.popitem(last=False)
+            self._forgotten = generation
+
+    def _invalidated_since(self, generation: int, key: str, device_id: str) -> bool:
+        if generation < self._forgotten:
+            return True
+        return any(self._invalidated.get(name, 0) > generation for name in (key, device_id) if name is not None)
+
+    def _store(self, key: str, entry: CachedSession, generation: int = None):
+        with self._lock:
+            if generation is not None and self._invalidated_since(generation, key, entry.device_id):
+                self.stale_puts += 1
+                return
+            self._drop(key)
+            self._entries[key] = entry
+            if entry.found:
+                self._by_device.setdefault(entry.device_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry.found:
+            keys = self._by_device.get(entry.device_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_device[entry.device_id]
+        return entry is not None
+
+session_cache = SessionCache()
+
+def check_session(entry: CachedSession):
+    """Validation result for a cached entry; raises 401 like the uncached lookup did."""
+    if not entry.found:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if entry.is_valid != "true":
+        raise HTTPException(status_code=401, detail="Session invalid")
+    if entry.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=401, detail="Session expired")
+    return {"status": "valid", "device_id": entry.device_id}
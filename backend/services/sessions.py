@@ -0,0 +1,35 @@
+import logging
+import os
+import time
+from datetime import datetime
+from crud import sessions as crud_sessions
+
+logger = logging.getLogger(__name__)
+
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "300"))
+# Rows per transaction; keeps each write lock short on SQLite
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "5000"))
+
+def purge_dead_sessions(session_factory, batch_size: int = SESSION_SWEEP_BATCH_SIZE):
+    """Delete expired and invalidated device sessions in batches, committing after each."""
+    start = time.perf_counter()
+    now = datetime.utcnow()
+    purged = 0
+    batches = 0
+    while True:
+        db = session_factory()
+        try:
+            deleted = crud_sessions.delete_dead_sessions(db, now, batch_size)
+            db.commit()
+        finally:
+            db.close()
+        if not deleted:
+            break
+        purged += deleted
+        batches += 1
+        if deleted < batch_size:
+            break
+    elapsed = time.perf_counter() - start
+    if purged:
+        logger.info("Purged %d dead sessions in %d batches (%.3fs)", purged, batches, elapsed)
+    return {"rows_purged": purged, "batches": batches, "seconds": round(elapsed, 3)}
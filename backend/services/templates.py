@@ -0,0 +1,222 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import schemas
+from crud import templates as crud_templates
+
+# Compiled templates kept per process; each entry is a few hundred bytes
+TEMPLATE_CACHE_SIZE = int(os.getenv("TEMPLATE_CACHE_SIZE", "10000"))
+# WhatsApp's limit for a text message body
+MAX_TEMPLATE_LENGTH = 4096
+
+PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+class TemplateError(ValueError):
+    pass
+
+class TemplateNotFound(TemplateError):
+    pass
+
+class CompiledTemplate:
+    """A template body parsed once into a str.format string.
+
+    Literal braces are escaped and each {{name}} becomes {name}, so rendering
+    is a single format_map call in C. Names are plain identifiers: no
+    attribute or index lookups can reach the format machinery.
+    """
+    __slots__ = ("template_id", "version", "variables", "_format")
+
+    def __init__(self, body: str, version: int = 0, template_id: str = None):
+        parts = []
+        variables = []
+        position = 0
+        for match in PLACEHOLDER.finditer(body):
+            parts.append(self._literal(body[position:match.start()]))
+            name = match.group(1)
+            parts.append("{" + name + "}")
+            if name not in variables:
+                variables.append(name)
+            position = match.end()
+        parts.append(self._literal(body[position:]))
+        self.template_id = template_id
+        self.version = version
+        self.variables = tuple(variables)
+        self._format = "".join(parts).format_map
+
+    @staticmethod
+    def _literal(text: str) -> str:
+        # A "{{" that did not parse as a placeholder is a typo, not literal text
+        if "{{" in text:
+            raise TemplateError("Malformed placeholder: use {{name}} with letters, digits and underscores")
+        return text.replace("{", "{{").replace("}", "}}")
+
+    def render(self, values: dict) -> str:
+        try:
+            return self._format(values)
+        except KeyError as e:
+            raise TemplateError(f"Missing template variable '{e.args[0]}'")
+
+class TemplateCache:
+    """Compiled templates per (user_id, name), LRU-bounded.
+
+    Every lookup checks the stored (template_id, version) with one indexed
+    query, so an edit, or a delete and re-create under the same name, made
+    through any worker takes effect on the next send; only changed or unseen
+    templates are read and compiled.
+    """
+
+    def __init__(self, maxsize: int = TEMPLATE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.compiles = 0
+
+    def resolve(self, db: Session, user_id: str, names) -> dict:
+        """{name: CompiledTemplate} for the user's templates among `names`; unknown names are absent."""
+        names = set(names)
+        if not names:
+            return {}
+        current = crud_templates.versions(db, user_id, names)
+        found = {}
+        with self._lock:
+            for name, (template_id, version) in current.items():
+                entry = self._entries.get((user_id, name))
+                if entry is not None and entry.template_id == template_id and entry.version == version:
+                    self._entries.move_to_end((user_id, name))
+                    found[name] = entry
+                    self.hits += 1
+        stale = [name for name in current if name not in found]
+        if stale:
+            for name, template_id, version, body in crud_templates.bodies(db, user_id, stale):
+                found[name] = self.put(user_id, name, CompiledTemplate(body, version, template_id))
+        return found
+
+    def put(self, user_id: str, name: str, compiled: CompiledTemplate) -> CompiledTemplate:
+        with self._lock:
+            self.compiles += 1
+            self._entries[(user_id, name)] = compiled
+            self._entries.move_to_end((user_id, name))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def invalidate(self, user_id: str, name: str):
+        with self._lock:
+            self._entries.pop((user_id, name), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"size": len(self._entries), "max_size": self.maxsize, "hits": self.hits, "compiles": self.compiles}
+
+template_cache = TemplateCache()
+
+def render_messages(db: Session, user_id: str, messages: list) -> list:
+    """(body, error) per MessageCreate, in order.
+
+    A message with a message_body keeps it. One without is rendered from the
+    user's template_name with its variables; error is a TemplateError when that
+    is not possible.
+    """
+    templates = template_cache.resolve(db, user_id, {
+        msg.template_name for msg in messages if msg.message_body is None and msg.template_name
+    })
+    rendered = []
+    for msg in messages:
+        if msg.message_body is not None:
+            rendered.append((msg.message_body, None))
+        elif not msg.template_name:
+            rendered.append((None, TemplateError("message_body or template_name is required")))
+        elif msg.template_name not in templates:
+            rendered.append((None, TemplateNotFound(f"Template not found: {msg.template_name}")))
+        else:
+            try:
+                rendered.append((templates[msg.template_name].render(msg.variables or {}), None))
+            except TemplateError as e:
+                rendered.append((None, e))
+    return rendered
+
+def template_read(db_template) -> dict:
+    return {
+        "template_id": db_template.template_id,
+        "user_id": db_template.user_id,
+        "name": db_template.name,
+        "body": db_template.body,
+        "variables": list(CompiledTemplate(db_template.body).variables),
+        "version": db_template.version,
+        "created_at": db_template.created_at,
+        "updated_at": db_template.updated_at,
+    }
+
+class TemplateService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _compile(self, body: str) -> CompiledTemplate:
+        if not body:
+            raise HTTPException(status_code=400, detail="Template body is empty")
+        if len(body) > MAX_TEMPLATE_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Template too long. Maximum: {MAX_TEMPLATE_LENGTH} characters")
+        try:
+            return CompiledTemplate(body)
+        except TemplateError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    def _get(self, template_id: str):
+        db_template = crud_templates.get_template(self.db, template_id)
+        if not db_template:
+            raise HTTPException(status_code=404, detail="Template not found")
+        return db_template
+
+    def create(self, data: schemas.MessageTemplateCreate):
+        self._compile(data.body)
+        if not crud_templates.get_business_user(self.db, data.user_id):
+            raise HTTPException(status_code=404, detail="Business User not found")
+        if crud_templates.get_template_by_name(self.db, data.user_id, data.name):
+            raise HTTPException(status_code=400, detail="Template name already exists")
+        db_template = crud_templates.create_template(self.db, data.user_id, data.name, data.body)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # A concurrent create of the same name won the unique constraint
+            self.db.rollback()
+            raise HTTPException(status_code=400, detail="Template name already exists")
+        self.db.refresh(db_template)
+        return db_template
+
+    def update(self, template_id: str, data: schemas.MessageTemplateUpdate):
+        self._compile(data.body)
+        db_template = self._get(template_id)
+        key = (db_template.user_id, db_template.name)
+        crud_templates.update_body(self.db, template_id, data.body)
+        self.db.commit()
+        template_cache.invalidate(*key)
+        self.db.refresh(db_template)
+        return db_template
+
+    def delete(self, template_id: str):
+        db_template = self._get(template_id)
+        key = (db_template.user_id, db_template.name)
+        crud_templates.delete_template(self.db, template_id)
+        self.db.commit()
+        template_cache.invalidate(*key)
+
+    def get(self, template_id: str):
+        return self._get(template_id)
+
+    def list(self, user_id: str, skip: int = 0, limit: int = 100):
+        return crud_templates.list_templates(self.db, user_id, skip, limit)
+
+    def preview(self, template_id: str, data: schemas.MessageTemplatePreview):
+        db_template = self._get(template_id)
+        try:
+            return {"body": CompiledTemplate(db_template.body).render(data.variables)}
+        except TemplateError as e:
+            raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,116 @@
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+import models
+from crud import usage as crud_usage
+
+GRANULARITIES = ("hour", "day")
+
+# Business user -> parent reseller entries kept per process for the rollups
+PARENT_CACHE_SIZE = int(os.getenv("USAGE_PARENT_CACHE_SIZE", "100000"))
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+class ParentResellerCache:
+    """business user_id -> parent_reseller_id, LRU-bounded.
+
+    Nothing reassigns a business user today; code that does must call
+    invalidate() after its commit, or the rollups keep crediting the old reseller.
+    """
+
+    def __init__(self, maxsize: int = PARENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: str):
+        with self._lock:
+            reseller_id = self._entries.get(user_id)
+            if reseller_id is not None:
+                self._entries.move_to_end(user_id)
+                return reseller_id
+        reseller_id = crud_usage.get_parent_reseller_id(db, user_id)
+        if reseller_id is not None:
+            with self._lock:
+                self._entries[user_id] = reseller_id
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return reseller_id
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+parent_resellers = ParentResellerCache()
+
+def record_usage(db: Session, user_id: str, entries):
+    """Add messages to the hourly/daily aggregates of the user and its reseller.
+
+    `entries` is an iterable of (sent_at, mode, message_type, credits_micro, count);
+    use negative credits/count to take back a refunded message. Runs inside the
+    caller's transaction.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for sent_at, mode, message_type, credits, count in entries:
+        for granularity in GRANULARITIES:
+            total = totals[(granularity, bucket_start(sent_at, granularity), mode or "official", message_type or "text")]
+            total[0] += count
+            total[1] += credits
+    if not totals:
+        return
+
+    owners = [("user", user_id)]
+    reseller_id = parent_resellers.get(db, user_id)
+    if reseller_id is not None:
+        owners.append(("reseller", reseller_id))
+
+    crud_usage.upsert_aggregates(db, [
+        {
+            "scope": scope, "owner_id": owner_id, "granularity": granularity, "bucket_start": start,
+            "mode": mode, "message_type": message_type, "message_count": count, "credits_deducted_micro": credits,
+        }
+        for scope, owner_id in owners
+        for (granularity, start, mode, message_type), (count, credits) in totals.items()
+    ])
+
+def usage_summary(db: Session, user_id: str, reseller_id: str, start: datetime, end: datetime, granularity: str):
+    if bool(user_id) == bool(reseller_id):
+        raise HTTPException(status_code=400, detail="Pass exactly one of user_id or reseller_id")
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail="granularity must be 'hour' or 'day'")
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+
+    scope, owner_id = ("user", user_id) if user_id else ("reseller", reseller_id)
+    rows = crud_usage.get_aggregates(db, scope, owner_id, granularity, bucket_start(start, granularity), end)
+    buckets = [
+        {
+            "bucket_start": row.bucket_start,
+            "mode": row.mode,
+            "message_type": row.message_type,
+            "message_count": row.message_count,
+            "credits_deducted": models.from_micro(row.credits_deducted_micro),
+        }
+        for row in rows
+    ]
+    return {
+        "scope": scope,
+        "owner_id": owner_id,
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "total_messages": sum(row.message_count for row in rows),
+        "total_credits_deducted": models.from_micro(sum(row.credits_deducted_micro for row in rows)),
+        "buckets": buckets,
+    }